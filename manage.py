@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import typer
 import subprocess
+from typing import Optional
 
 app = typer.Typer(help="Magento AI Assistant - Command Line Tool")
 
@@ -54,5 +55,21 @@ def embed_products():
     embedder = ProductEmbedder()
     embedder.generate_embeddings()
 
+@app.command("build-index")
+def build_index(index_type: Optional[str] = None):
+    """Build the FAISS index (flat | hnsw | ivf | sq8 | pq; FAISS_INDEX_TYPE when omitted) and search bundle."""
+    cmd = ["python", "-m", "src.search.build_faiss_index"]
+    if index_type:
+        cmd += ["--index-type", index_type]
+    subprocess.run(cmd)
+
+@app.command("tune-index")
+def tune_index(k: int = 10, queries: int = 500, target_recall: float = 0.0):
+    """Sweep efSearch/nprobe against exact search; persist the cheapest setting reaching --target-recall."""
+    cmd = ["python", "-m", "src.search.tune_index", "--k", str(k), "--queries", str(queries)]
+    if target_recall:
+        cmd += ["--target-recall", str(target_recall)]
+    subprocess.run(cmd)
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,17 @@
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from src.core.config import ADMIN_TOKEN
+
+router = APIRouter()
+
+
+@router.post("/admin/reload")
+async def reload_index(request: Request, force: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    """Load, warm and swap in the published search bundles now (force: even if the versions are unchanged)."""
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints need a matching X-Admin-Token (ADMIN_TOKEN)")
+
+    reloader = request.app.state.reloader
+    reloaded = await reloader.reload(force=force)
+    return {"reloaded": reloaded, "index_version": request.app.state.searcher.index_version, **reloader.stats}
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Request, Response
+
+from src.api.routes.search import cached_search
+from src.api.schemas.chat_request import ChatRequest
+from src.search.result_cache import render_response
+
+router = APIRouter()
+
+
+@router.post("/chat")
+async def chat(body: ChatRequest, request: Request):
+    """Retrieve the product context for a chat turn (query encoding shares the search micro-batcher)."""
+    products = await cached_search(request.app.state, body.message, body.top_k)
+    return Response(render_response({"message": body.message}, "products", products), media_type="application/json")
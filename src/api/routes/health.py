@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Request
+
+from src.core.model_registry import registry_stats
+
+router = APIRouter()
+
+
+@router.get("/health")
+def health(request: Request):
+    encoder = getattr(request.app.state, "encoder", None)
+    searcher = getattr(request.app.state, "searcher", None)
+    reloader = getattr(request.app.state, "reloader", None)
+    return {
+        "status": "ok",
+        "encoder": encoder.metrics.snapshot() if encoder is not None else None,
+        "query_cache": searcher.query_cache.stats() if searcher is not None else None,
+        "result_cache": searcher.result_cache.stats() if searcher is not None else None,
+        "index_version": searcher.index_version if searcher is not None else None,
+        "index_reload": reloader.stats if reloader is not None else None,
+        "reranker": searcher.reranker.stats() if searcher is not None and searcher.reranker is not None else None,
+        "models": registry_stats(),
+    }
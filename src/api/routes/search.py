@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from src.api.schemas.product_model import SearchResponse
+from src.api.schemas.search_request import SearchRequest
+from src.search.result_cache import render_response
+
+router = APIRouter()
+
+
+async def filtered_search(searcher, query, top_k, encoder, filters=None, language=None):
+    """Search with explicit filters, or with filters inferred from the query (dropped if they match nothing)."""
+    if filters is not None:
+        return await searcher.asearch(query, top_k=top_k, encoder=encoder, filters=filters, language=language)
+
+    inferred = searcher.infer_filters(query)
+    if inferred:
+        results = await searcher.asearch(query, top_k=top_k, encoder=encoder, filters=inferred, language=language)
+        if results:
+            return results
+    return await searcher.asearch(query, top_k=top_k, encoder=encoder, language=language)
+
+
+async def cached_search(state, query, top_k, filters=None, language=None):
+    """Serialized results, served from the result cache for the current index version when possible."""
+    searcher = state.searcher
+    cache = searcher.result_cache
+    key = cache.key(searcher.index_version, query, filters, top_k, language)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    results = await filtered_search(searcher, query, top_k, state.encoder, filters, language)
+    return cache.put(key, results)
+
+
+@router.post("/search", response_model=SearchResponse)
+async def search(body: SearchRequest, request: Request):
+    filters = body.filters.model_dump(exclude_none=True) if body.filters else None
+    if filters and "corrosion_resistant" in filters:
+        filters["corrosion_resistant"] = str(filters["corrosion_resistant"]).lower()
+
+    try:
+        results = await cached_search(request.app.state, body.query, body.top_k, filters, body.language)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(render_response({"query": body.query}, "results", results), media_type="application/json")
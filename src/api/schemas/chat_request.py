@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(..., min_length=1)
+    top_k: int = Field(5, ge=1, le=20)
@@ -0,0 +1,22 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class VariantHit(BaseModel):
+    sku: str
+    length_mm: Optional[float] = None
+
+
+class ProductHit(BaseModel):
+    rank: int
+    score: float
+    sku: str
+    name: str
+    rerank_score: Optional[float] = None
+    highlight: Optional[str] = None  # PDF spec passage the product matched through
+    variants: Optional[List[VariantHit]] = None  # lengths behind a collapsed hit (COLLAPSE_VARIANTS)
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[ProductHit]
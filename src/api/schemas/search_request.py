@@ -0,0 +1,23 @@
+from typing import List, Optional, Union
+from pydantic import BaseModel, Field
+
+
+class SearchFilters(BaseModel):
+    material: Optional[Union[str, List[str]]] = None
+    category_id: Optional[Union[str, List[str]]] = None
+    corrosion_resistant: Optional[bool] = None
+    min_length_mm: Optional[float] = None
+    max_length_mm: Optional[float] = None
+    min_capacity_kg: Optional[float] = None
+    max_capacity_kg: Optional[float] = None
+    min_weight_kg: Optional[float] = None
+    max_weight_kg: Optional[float] = None
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(..., min_length=1)
+    top_k: int = Field(10, ge=1, le=100)
+    # None → filters are inferred from the query text ("over 400mm", "holds 300kg")
+    filters: Optional[SearchFilters] = None
+    # None → detected from the query; routes to that language's bundle when one was built
+    language: Optional[str] = Field(None, pattern=r"^[a-z]{2}$")
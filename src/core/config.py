@@ -0,0 +1,84 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Embedding model
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Micro-batching query encoder (src/search/batch_encoder.py)
+ENCODER_MAX_BATCH_SIZE = int(os.getenv("ENCODER_MAX_BATCH_SIZE", "32"))
+ENCODER_MAX_WAIT_MS = float(os.getenv("ENCODER_MAX_WAIT_MS", "3"))
+
+# Bulk catalog embedding (src/embeddings/bulk_encoder.py); 0 workers → one per physical core
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "0"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_CHUNK_SIZE = int(os.getenv("EMBED_CHUNK_SIZE", "8192"))  # rows per checkpoint of generate_embeddings
+
+# Hub revision (branch, tag or commit) EMBEDDING_MODEL is loaded at; embedding caches key on
+# the commit it resolves to (src/embeddings/onnx_encoder.py:resolved_revision), so new weights invalidate cached vectors
+EMBEDDING_MODEL_REVISION = os.getenv("EMBEDDING_MODEL_REVISION", "main")
+
+# Redis (src/storage/redis_cache.py); empty → in-memory stand-in
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+# Query-embedding cache (src/search/query_cache.py)
+QUERY_CACHE_LRU_SIZE = int(os.getenv("QUERY_CACHE_LRU_SIZE", "10000"))
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "86400"))
+
+# FAISS index type built by src/search/build_faiss_index.py: flat | hnsw | ivf | sq8 | pq
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 → derived from catalog size
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+PQ_M = int(os.getenv("PQ_M", "96"))  # sub-quantizers; must divide the embedding dimension
+PQ_NBITS = int(os.getenv("PQ_NBITS", "8"))
+# One vector per configurable product, variants resolved after retrieval (src/search/variants.py)
+COLLAPSE_VARIANTS = os.getenv("COLLAPSE_VARIANTS", "0") == "1"
+
+# Exact float re-rank of compressed-index candidates: fetch top_k * factor, 0 disables
+RERANK_FACTOR = int(os.getenv("RERANK_FACTOR", "0"))
+
+# Hybrid BM25 + vector retrieval (src/embeddings/ranker.py), fused with reciprocal-rank fusion
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Cross-encoder second stage (src/embeddings/ranker.py); empty model disables it
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "40"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "50000"))
+
+# Ranked-result cache (src/search/result_cache.py), keyed on the bundle's index version
+RESULT_CACHE_LRU_SIZE = int(os.getenv("RESULT_CACHE_LRU_SIZE", "5000"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+
+# Per-language bundles (search_bundle_<lang>) built from the PDF spec extractions
+SEARCH_LANGUAGES = [lang.strip() for lang in os.getenv("SEARCH_LANGUAGES", "en,fr,de").split(",") if lang.strip()]
+LANGUAGE_EMBEDDING_MODEL = os.getenv("LANGUAGE_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+# Share of products that need spec text in a language before it gets a bundle; below it, queries use the primary one
+LANGUAGE_BUNDLE_MIN_COVERAGE = float(os.getenv("LANGUAGE_BUNDLE_MIN_COVERAGE", "0.2"))
+
+# Embedding inference backend: torch (sentence-transformers) | onnx (src/embeddings/onnx_encoder.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")  # torch device; ONNX Runtime always runs on CPU
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "data/models/onnx")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "1") == "1"  # serve the int8 graph
+ONNX_MIN_COSINE = float(os.getenv("ONNX_MIN_COSINE", "0.99"))  # export fails below this agreement with torch
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 → ONNX Runtime default
+
+# Vector store behind SemanticSearcher (src/embeddings/vector_store.py): faiss (bundle index) | qdrant (embedded, on disk)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "faiss")
+QDRANT_PATH = os.getenv("QDRANT_PATH", "data/qdrant")
+QDRANT_URL = os.getenv("QDRANT_URL", "")  # set to use a Qdrant server instead of the embedded store
+QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION", "products")
+QDRANT_UPSERT_BATCH = int(os.getenv("QDRANT_UPSERT_BATCH", "512"))
+
+# Index hot reload in the API (src/search/hot_reload.py); 0 disables polling for new bundle versions
+INDEX_WATCH_INTERVAL = float(os.getenv("INDEX_WATCH_INTERVAL", "5"))
+INDEX_WARMUP_QUERIES = int(os.getenv("INDEX_WARMUP_QUERIES", "20"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # required by POST /admin/reload; empty disables the endpoint
@@ -0,0 +1,129 @@
+"""
+Process-wide registry of embedding models.
+
+Every component asks `get_encoder(model_name)` instead of constructing its own
+model, so a process holds one copy of each (model, backend, device) no matter
+how many searchers, embedders or retrievers it runs. Models load lazily on
+first request; concurrent first requests for the same key wait for a single
+load instead of racing.
+
+The returned SharedEncoder is safe to call from several threads: torch
+models are serialized behind a lock, ONNX Runtime sessions run concurrently.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+from src.core.config import EMBEDDING_BACKEND, EMBEDDING_DEVICE
+
+
+def _rss_bytes():
+    """Resident set size of this process (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _weights_bytes(encoder):
+    """Parameter bytes of a torch model, or the graph file size of an ONNX one."""
+    parameters = getattr(encoder, "parameters", None)
+    if callable(parameters):
+        return sum(p.numel() * p.element_size() for p in parameters())
+    model_dir, model_file = getattr(encoder, "model_dir", None), getattr(encoder, "model_file", None)
+    if model_dir is not None and model_file is not None:
+        return (Path(model_dir) / model_file).stat().st_size
+    return None
+
+
+class SharedEncoder:
+    """Thread-safe handle on a registry model; exposes encode() and passes other attributes through."""
+
+    def __init__(self, encoder, key):
+        self.encoder = encoder
+        self.key = key
+        self._lock = threading.Lock() if key[1] == "torch" else None
+        self.calls = 0
+        self.texts = 0
+
+    def encode(self, sentences, *args, **kwargs):
+        self.calls += 1
+        self.texts += 1 if isinstance(sentences, str) else len(sentences)
+        if self._lock is None:
+            return self.encoder.encode(sentences, *args, **kwargs)
+        with self._lock:
+            return self.encoder.encode(sentences, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.encoder, name)
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._loading = {}  # key → lock held while that model loads
+
+    def get(self, model_name, backend=EMBEDDING_BACKEND, device=EMBEDDING_DEVICE):
+        key = (model_name, backend, device)
+        shared = self._models.get(key)
+        if shared is not None:
+            return shared
+
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Per-key lock: other models can load in parallel
+        with load_lock:
+            if key not in self._models:
+                self._models[key] = self._load(key)
+        return self._models[key]
+
+    def _load(self, key):
+        from src.embeddings.onnx_encoder import load_encoder
+
+        model_name, backend, device = key
+        print(f"📚 Loading shared model {model_name} (backend={backend}, device={device})")
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        encoder = load_encoder(model_name, backend, device)
+        load_sec = time.perf_counter() - started
+        rss_after = _rss_bytes()
+
+        self._stats[key] = {
+            "load_sec": load_sec,
+            "weights_mb": (_weights_bytes(encoder) or 0) / 1e6,
+            "rss_delta_mb": (rss_after - rss_before) / 1e6 if rss_before is not None and rss_after is not None else None,
+        }
+        print(f"📚 {model_name} ready in {load_sec:.1f}s")
+        return SharedEncoder(encoder, key)
+
+    def stats(self):
+        models = []
+        for key, shared in list(self._models.items()):
+            model_name, backend, device = key
+            models.append({
+                "model": model_name,
+                "backend": backend,
+                "device": device,
+                **self._stats.get(key, {}),
+                "calls": shared.calls,
+                "texts": shared.texts,
+            })
+        return {"loaded": len(models), "rss_mb": (_rss_bytes() or 0) / 1e6, "models": models}
+
+
+_registry = ModelRegistry()
+
+
+def get_encoder(model_name, backend=EMBEDDING_BACKEND, device=EMBEDDING_DEVICE):
+    """Shared encoder for (model, backend, device), loaded on first use."""
+    return _registry.get(model_name, backend, device)
+
+
+def registry_stats():
+    return _registry.stats()
@@ -0,0 +1,145 @@
+"""
+Bulk embedding for catalog builds.
+
+    1. dedup     identical texts are encoded once (variants copy their parent's text)
+    2. bucket    unique texts are sorted by token length and cut into batches,
+                 so each batch pads to roughly its own length instead of the longest description
+    3. encode    batches are spread over a process pool sized to the physical cores,
+                 longest first so the pool drains evenly; each worker runs single-threaded
+    4. reorder   vectors are scattered back to the input order
+
+Throughput is reported per stage in products (input texts) per second.
+"""
+
+import os
+import time
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core.config import EMBED_BATCH_SIZE, EMBED_WORKERS, EMBEDDING_BACKEND, EMBEDDING_DEVICE
+
+# Below this many unique texts a pool costs more to start than it saves
+MIN_POOL_TEXTS = 2000
+
+# Beyond this every text costs the same (the model truncates)
+MAX_TOKENS = 512
+
+_worker_encoder = None
+
+
+def physical_cores():
+    """Physical cores from /proc/cpuinfo (hyper-threads don't speed up matmuls); os.cpu_count() elsewhere."""
+    try:
+        cores = set()
+        physical_id = core_id = None
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                key = key.strip()
+                if key == "physical id":
+                    physical_id = value.strip()
+                elif key == "core id":
+                    core_id = value.strip()
+                elif not key and core_id is not None:
+                    cores.add((physical_id, core_id))
+                    physical_id = core_id = None
+        if core_id is not None:
+            cores.add((physical_id, core_id))
+        if cores:
+            return len(cores)
+    except OSError:
+        pass
+    return os.cpu_count() or 1
+
+
+def token_lengths(texts, model_name, backend=EMBEDDING_BACKEND):
+    """Token count per text with the model's tokenizer only (no weights); word count when it is unavailable."""
+    try:
+        if backend == "onnx":
+            from tokenizers import Tokenizer
+            from src.embeddings.onnx_encoder import TOKENIZER_FILE, onnx_model_dir
+            tokenizer = Tokenizer.from_file(str(onnx_model_dir(model_name) / TOKENIZER_FILE))
+            tokenizer.enable_truncation(max_length=MAX_TOKENS)
+            return np.array([len(e.ids) for e in tokenizer.encode_batch(texts)])
+
+        from transformers import AutoTokenizer
+        from src.embeddings.onnx_encoder import resolved_revision
+        # The tokenizer of the commit the encoder loads
+        tokenizer = AutoTokenizer.from_pretrained(model_name, revision=resolved_revision(model_name, backend))
+        encoded = tokenizer(texts, truncation=True, max_length=MAX_TOKENS)["input_ids"]
+        return np.array([len(ids) for ids in encoded])
+    except (ImportError, OSError) as e:
+        print(f"⚠️ Tokenizer unavailable ({e}); bucketing by word count")
+        return np.array([min(len(t.split()), MAX_TOKENS) for t in texts])
+
+
+def _init_worker(model_name, backend, device, threads):
+    global _worker_encoder
+    # One model per worker process, each pinned to its share of the cores
+    if backend == "onnx":
+        from src.embeddings.onnx_encoder import OnnxEncoder, onnx_model_dir
+        _worker_encoder = OnnxEncoder(onnx_model_dir(model_name), threads=threads)
+    else:
+        import torch
+        torch.set_num_threads(threads)
+        from src.embeddings.onnx_encoder import load_encoder
+        _worker_encoder = load_encoder(model_name, backend, device)
+
+
+def _encode_batch(texts):
+    return np.asarray(_worker_encoder.encode(texts, batch_size=len(texts)), dtype="float32")
+
+
+def _report(stage, seconds, n_products):
+    rate = n_products / seconds if seconds > 0 else float("inf")
+    print(f"⏱️ {stage:<8} {seconds:7.2f}s  {rate:10.0f} products/s")
+
+
+def bulk_encode(texts, model_name, backend=EMBEDDING_BACKEND, device=EMBEDDING_DEVICE,
+                workers=EMBED_WORKERS, batch_size=EMBED_BATCH_SIZE):
+    """float32 vectors for `texts`, in input order."""
+    n = len(texts)
+    if n == 0:
+        return np.empty((0, 0), dtype="float32")
+
+    started = time.perf_counter()
+    unique, inverse = np.unique(np.array(texts, dtype=object), return_inverse=True)
+    unique = unique.tolist()
+    _report("dedup", time.perf_counter() - started, n)
+    print(f"🧬 {n} texts → {len(unique)} unique")
+
+    started = time.perf_counter()
+    lengths = token_lengths(unique, model_name, backend)
+    order = np.argsort(-lengths, kind="stable")  # longest first
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    _report("bucket", time.perf_counter() - started, n)
+
+    workers = workers or physical_cores()
+    # GPUs and small runs encode in-process with the shared model
+    if device != "cpu" or len(unique) < MIN_POOL_TEXTS:
+        workers = 1
+
+    started = time.perf_counter()
+    texts_of = [[unique[i] for i in rows] for rows in batches]
+    if workers == 1:
+        from src.core.model_registry import get_encoder
+        encoder = get_encoder(model_name, backend, device)
+        results = [np.asarray(encoder.encode(batch, batch_size=len(batch)), dtype="float32") for batch in texts_of]
+    else:
+        threads = max(1, physical_cores() // workers)
+        print(f"🧵 Encoding {len(batches)} batches on {workers} processes × {threads} thread(s)")
+        # spawn: forking a parent that touched torch/OpenMP can deadlock the children
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(model_name, backend, device, threads)) as pool:
+            results = list(pool.map(_encode_batch, texts_of))
+    _report("encode", time.perf_counter() - started, n)
+
+    started = time.perf_counter()
+    unique_vectors = np.empty((len(unique), results[0].shape[1]), dtype="float32")
+    for rows, vectors in zip(batches, results):
+        unique_vectors[rows] = vectors
+    vectors = unique_vectors[inverse.ravel()]
+    _report("reorder", time.perf_counter() - started, n)
+    return vectors
@@ -1,9 +1,17 @@
+import os
 import json
+import time
+import hashlib
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from datetime import datetime
 
+from src.core.config import EMBED_CHUNK_SIZE
+from src.embeddings.embedding_cache import EmbeddingCache
+from src.core.model_registry import get_encoder
+from src.embeddings.bulk_encoder import bulk_encode
+from src.embeddings.onnx_encoder import encoder_id, resolved_revision
+
 # Use today's processed folder
 today = datetime.now().strftime("%Y-%m-%d")
 PROCESSED_FILE = Path(f"data/processed/magento_products_cleaned.json")
@@ -14,12 +22,66 @@ EMBEDDING_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_FILE = EMBEDDING_DIR / "product_embeddings.npy"
 META_FILE = EMBEDDING_DIR / "product_metadata.json"
 
+# In-progress run: vectors and metadata are renamed over the outputs once complete
+PARTIAL_FILE = EMBEDDING_DIR / "product_embeddings.partial.npy"
+PARTIAL_META_FILE = EMBEDDING_DIR / "product_metadata.partial.json"
+CHECKPOINT_FILE = EMBEDDING_DIR / "embedding_checkpoint.json"
+
+
+def build_product_text(p):
+    """Combine product fields into a text blob for embedding."""
+    parts = [
+        p.get("name", ""),
+        p.get("description", ""),
+        p.get("features", ""),
+        str(p.get("dimensions", "")),
+        str(p.get("capacity", "")),
+    ]
+    return ". ".join([part for part in parts if part]).strip()
+
+
+def content_hash(text):
+    """Short fingerprint of the embedded text; a change means the vector is stale."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def run_fingerprint(model_id, metadata):
+    """Identifies the catalog + model a partial run belongs to; any change restarts from scratch."""
+    digest = hashlib.sha1(model_id.encode("utf-8"))
+    for row in metadata:
+        digest.update(f"\0{row['sku']}\0{row['content_hash']}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def read_checkpoint(fingerprint):
+    """The saved progress of an interrupted run over the same catalog, or None."""
+    if not (CHECKPOINT_FILE.exists() and PARTIAL_FILE.exists() and PARTIAL_META_FILE.exists()):
+        return None
+    with open(CHECKPOINT_FILE, "r") as f:
+        checkpoint = json.load(f)
+    return checkpoint if checkpoint.get("fingerprint") == fingerprint else None
+
+
+def write_checkpoint(checkpoint):
+    tmp = CHECKPOINT_FILE.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, CHECKPOINT_FILE)
+
 
 class ProductEmbedder:
 
     def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
-        print(f"🧠 Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self._model = None
+
+    @property
+    def model(self):
+        # Loaded on first use: a rebuild served entirely from the cache never needs it
+        if self._model is None:
+            print(f"🧠 Loading embedding model: {self.model_name}")
+            self._model = get_encoder(self.model_name)
+        return self._model
 
     def load_products(self):
         if not PROCESSED_FILE.exists():
@@ -30,42 +92,132 @@ class ProductEmbedder:
 
     def build_text(self, p):
         """Combine product fields into a text blob for embedding."""
-        parts = [
-            p.get("name", ""),
-            p.get("description", ""),
-            p.get("features", ""),
-            str(p.get("dimensions", "")),
-            str(p.get("capacity", "")),
-        ]
-        return ". ".join([part for part in parts if part]).strip()
-
-    def generate_embeddings(self):
+        return build_product_text(p)
+
+    def model_key(self):
+        """Backend variant and resolved commit of the model: cached vectors and checkpoints are only valid for it."""
+        return f"{encoder_id(self.model_name)}@{resolved_revision(self.model_name)}"
+
+    def encode_with_cache(self, texts):
+        """Encode only texts the persistent cache has not seen for this model."""
+        cache = EmbeddingCache(self.model_key())
+        keys = [cache.key(t) for t in texts]
+        found = cache.get_many(set(keys))
+        cached = len(found)  # distinct texts the cache answered; within-run duplicates aren't cache savings
+
+        # Unique misses only — variants often repeat their parent's text
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        hits = sum(1 for key in keys if key in found)
+        print(f"🗃️ Embedding cache: {hits}/{len(texts)} hits ({hits / max(len(texts), 1):.1%}), {len(missing)} texts to encode")
+
+        encode_sec = 0.0
+        if missing:
+            print("🧠 Generating embeddings...")
+            started = time.perf_counter()
+            vectors = bulk_encode(list(missing.values()), self.model_name)
+            encode_sec = time.perf_counter() - started
+            cache.put_many(list(missing.keys()), vectors)
+            cache.record_encode_cost(encode_sec / len(missing))
+            found.update(zip(missing.keys(), np.asarray(vectors, dtype="float32")))
+
+        sec_per_text = cache.encode_cost()
+        if sec_per_text:
+            saved = cached * sec_per_text
+            print(f"⏱️ Encoded in {encode_sec:.1f}s, ~{saved:.1f}s saved by the cache")
+        cache.close()
+
+        return np.stack([found[key] for key in keys]) if keys else np.empty((0, 0), dtype="float32")
+
+    def generate_embeddings(self, chunk_size=EMBED_CHUNK_SIZE):
         products = self.load_products()
         print(f"📦 Loaded {len(products)} products")
 
+        started = time.perf_counter()
         texts = [self.build_text(p) for p in products]
-        print("🧠 Generating embeddings...")
-
-        embeddings = self.model.encode(texts, show_progress_bar=True)
-
-        print("💾 Saving embeddings & metadata...")
-        np.save(OUTPUT_FILE, embeddings)
+        text_sec = time.perf_counter() - started
+        print(f"⏱️ texts    {text_sec:7.2f}s  {len(products) / max(text_sec, 1e-9):10.0f} products/s")
 
         metadata = [
             {
                 "product_id": p["product_id"],
                 "sku": p["sku"],
                 "name": p["name"],
+                "content_hash": content_hash(text),
             }
-            for p in products
+            for p, text in zip(products, texts)
         ]
 
-        with open(META_FILE, "w") as f:
-            json.dump(metadata, f, indent=2)
+        started = time.perf_counter()
+        self.write_embeddings(texts, metadata, chunk_size)
+        embed_sec = time.perf_counter() - started
+        print(f"⏱️ embed    {embed_sec:7.2f}s  {len(products) / max(embed_sec, 1e-9):10.0f} products/s (cache + encode + write)")
 
         print(f"✅ Saved {len(products)} embeddings → {OUTPUT_FILE}")
         print(f"📘 Metadata saved to → {META_FILE}")
 
+    def write_embeddings(self, texts, metadata, chunk_size=EMBED_CHUNK_SIZE):
+        """
+        Stream vectors chunk by chunk into a preallocated .npy memmap and the
+        metadata rows into a JSON list, checkpointing after every chunk. A
+        crashed run over the same catalog resumes after the last checkpoint;
+        only one chunk of vectors is ever held in memory.
+        """
+        n = len(texts)
+        fingerprint = run_fingerprint(self.model_key(), metadata)
+        checkpoint = read_checkpoint(fingerprint)
+
+        out = None
+        if checkpoint is not None:
+            done = checkpoint["rows_done"]
+            print(f"↩️ Resuming interrupted run at row {done}/{n}")
+            out = np.load(PARTIAL_FILE, mmap_mode="r+")
+            meta_file = open(PARTIAL_META_FILE, "r+b")
+            # Drop rows written after the last checkpoint
+            meta_file.truncate(checkpoint["metadata_bytes"])
+            meta_file.seek(checkpoint["metadata_bytes"])
+        else:
+            done = 0
+            meta_file = open(PARTIAL_META_FILE, "wb")
+            meta_file.write(b"[")
+
+        try:
+            for start in range(done, n, chunk_size):
+                end = min(start + chunk_size, n)
+                started = time.perf_counter()
+                vectors = self.encode_with_cache(texts[start:end])
+
+                if out is None:
+                    out = np.lib.format.open_memmap(PARTIAL_FILE, mode="w+", dtype="float32", shape=(n, vectors.shape[1]))
+                out[start:end] = vectors
+                out.flush()
+
+                rows = ",".join("\n  " + json.dumps(row) for row in metadata[start:end])
+                meta_file.write(("," if start else "").encode("utf-8") + rows.encode("utf-8"))
+                meta_file.flush()
+                os.fsync(meta_file.fileno())
+
+                # Written last: it only ever points at rows that are on disk
+                write_checkpoint({"fingerprint": fingerprint, "rows_done": end, "rows": n, "metadata_bytes": meta_file.tell()})
+                elapsed = time.perf_counter() - started
+                print(f"💾 {end}/{n} rows written ({(end - start) / max(elapsed, 1e-9):.0f} products/s)")
+
+            meta_file.write(b"\n]\n")
+        finally:
+            meta_file.close()
+
+        if out is None:
+            # Empty catalog: nothing was encoded, so the dimension is unknown
+            out = np.lib.format.open_memmap(PARTIAL_FILE, mode="w+", dtype="float32", shape=(0, 0))
+        del out
+
+        os.replace(PARTIAL_FILE, OUTPUT_FILE)
+        os.replace(PARTIAL_META_FILE, META_FILE)
+        CHECKPOINT_FILE.unlink(missing_ok=True)
+
 
 if __name__ == "__main__":
     embedder = ProductEmbedder()
@@ -0,0 +1,67 @@
+"""
+Persistent, content-addressed embedding cache (SQLite).
+
+Vectors are keyed on hash(model id + text), so an unchanged product text is
+never encoded twice — across runs, and regardless of SKU or row order.
+"""
+
+import hashlib
+import sqlite3
+import numpy as np
+from pathlib import Path
+
+EMBEDDING_DIR = Path("data/embeddings")
+CACHE_FILE = EMBEDDING_DIR / "embedding_cache.sqlite"
+
+_BATCH = 500  # stays below SQLite's bound-parameter limit
+
+
+class EmbeddingCache:
+    def __init__(self, model_id, path=CACHE_FILE):
+        self.model_id = model_id
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS stats (model_id TEXT PRIMARY KEY, sec_per_text REAL)")
+        self.conn.commit()
+
+    def key(self, text):
+        return hashlib.blake2b(f"{self.model_id}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+    def get_many(self, keys):
+        """Return {key: float32 vector} for the keys present in the cache."""
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), _BATCH):
+            chunk = keys[start:start + _BATCH]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk)
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype="float32")
+        return found
+
+    def put_many(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype="float32")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            ((key, vec.tobytes()) for key, vec in zip(keys, vectors)),
+        )
+        self.conn.commit()
+
+    def encode_cost(self):
+        """Last measured encode time per text for this model (seconds), or None."""
+        row = self.conn.execute("SELECT sec_per_text FROM stats WHERE model_id = ?", (self.model_id,)).fetchone()
+        return row[0] if row else None
+
+    def record_encode_cost(self, sec_per_text):
+        self.conn.execute("INSERT OR REPLACE INTO stats (model_id, sec_per_text) VALUES (?, ?)", (self.model_id, sec_per_text))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,135 @@
+"""
+FAISS implementation of VectorStore (src/embeddings/vector_store.py).
+
+Wraps an IndexIDMap2, normally the search bundle's own index. Keyword payloads
+are kept in memory as postings (field → value → ids), which play the role of
+Qdrant's payload indexes. Filters and allowed-id sets compile into an
+IDSelectorBatch, so FAISS skips non-matching ids during the search itself.
+"""
+
+import json
+import os
+import faiss
+import numpy as np
+from pathlib import Path
+
+from src.embeddings.vector_store import PAYLOAD_FIELDS, VectorStore, bundle_payloads, filter_values
+from src.search.index_bundle import BUNDLE_DIR, load_bundle, read_index, search_parameters
+from src.search.semantic_search import PQ_FILTER_OVERFETCH
+
+INDEX_NAME = "index.faiss"
+PAYLOADS_NAME = "payloads.json"
+
+
+class FaissVectorStore(VectorStore):
+    def __init__(self, index, path=None):
+        if not isinstance(index, faiss.IndexIDMap2):
+            raise ValueError("❌ FaissVectorStore needs an IndexIDMap2 (stable ids)")
+        self.index = index
+        self.path = Path(path) if path is not None else None
+        self.payloads = {}
+        self.postings = {field: {} for field in PAYLOAD_FIELDS}
+
+    @classmethod
+    def create(cls, dim, path=None):
+        """Empty exact (flat inner-product) store."""
+        return cls(faiss.IndexIDMap2(faiss.IndexFlatIP(dim)), path)
+
+    @classmethod
+    def from_bundle(cls, bundle_dir=BUNDLE_DIR):
+        """In-memory copy of a bundle's index (writable, unlike the serving mmap) with its payloads."""
+        bundle = load_bundle(bundle_dir, mmap=False)
+        store = cls(bundle.index)
+        store._index_payloads(*bundle_payloads(bundle))
+        return store
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        store = cls(read_index(path / INDEX_NAME, mmap=False), path)
+        with open(path / PAYLOADS_NAME, "r") as f:
+            payloads = json.load(f)
+        store._index_payloads(np.array([int(i) for i in payloads], dtype="int64"), list(payloads.values()))
+        return store
+
+    def _unindex(self, ids):
+        for faiss_id in ids:
+            payload = self.payloads.pop(faiss_id, None)
+            if payload is None:
+                continue
+            for field in PAYLOAD_FIELDS:
+                posting = self.postings[field].get(payload.get(field))
+                if posting is not None:
+                    posting.discard(faiss_id)
+
+    def _index_payloads(self, ids, payloads):
+        ids = [int(i) for i in ids]
+        self._unindex(ids)
+        for faiss_id, payload in zip(ids, payloads):
+            self.payloads[faiss_id] = payload
+            for field in PAYLOAD_FIELDS:
+                value = payload.get(field)
+                if value is not None:
+                    self.postings[field].setdefault(value, set()).add(faiss_id)
+
+    def upsert(self, ids, vectors, payloads=None):
+        ids = np.asarray(ids, dtype="int64")
+        try:
+            self.index.remove_ids(faiss.IDSelectorBatch(ids))
+        except RuntimeError as e:
+            # e.g. HNSW cannot delete in place
+            raise ValueError(f"❌ This FAISS index type cannot update points in place; rebuild it instead ({e})")
+        self.index.add_with_ids(np.ascontiguousarray(vectors, dtype="float32"), ids)
+        self._index_payloads(ids, payloads or [{} for _ in ids])
+
+    def delete(self, ids):
+        ids = np.asarray(ids, dtype="int64")
+        self.index.remove_ids(faiss.IDSelectorBatch(ids))
+        self._unindex(ids.tolist())
+
+    def allowed_ids(self, filters=None, ids=None):
+        """Sorted ids passing the filters and the id set; None when nothing restricts the search."""
+        allowed = None
+        for field, values in filter_values(filters).items():
+            matched = set().union(*(self.postings[field].get(value, set()) for value in values))
+            allowed = matched if allowed is None else allowed & matched
+        if ids is not None:
+            ids = set(np.asarray(ids, dtype="int64").tolist())
+            allowed = ids if allowed is None else allowed & ids
+        if allowed is None:
+            return None
+        return np.array(sorted(allowed), dtype="int64")
+
+    def search(self, queries, k, filters=None, ids=None):
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype="float32")
+        allowed = self.allowed_ids(filters, ids)
+        if allowed is None:
+            return self.index.search(queries, k)
+        if not len(allowed):
+            return np.full((len(queries), k), -np.inf, dtype="float32"), np.full((len(queries), k), -1, dtype="int64")
+
+        selector = faiss.IDSelectorBatch(len(allowed), faiss.swig_ptr(allowed))
+        params = search_parameters(self.index, selector)
+        if params is not None:
+            return self.index.search(queries, k, params=params)
+
+        distances, indices = self.index.search(queries, k * PQ_FILTER_OVERFETCH)
+        keep = np.isin(indices, allowed)
+        order = np.argsort(~keep, axis=1, kind="stable")[:, :k]
+        distances = np.take_along_axis(distances, order, axis=1)
+        indices = np.where(np.take_along_axis(keep, order, axis=1), np.take_along_axis(indices, order, axis=1), -1)
+        return distances, indices
+
+    def count(self):
+        return int(self.index.ntotal)
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(self.index, str(self.path / (INDEX_NAME + ".tmp")))
+        os.replace(self.path / (INDEX_NAME + ".tmp"), self.path / INDEX_NAME)
+        with open(self.path / (PAYLOADS_NAME + ".tmp"), "w") as f:
+            json.dump({str(i): payload for i, payload in self.payloads.items()}, f)
+        os.replace(self.path / (PAYLOADS_NAME + ".tmp"), self.path / PAYLOADS_NAME)
+        print(f"💾 FAISS store saved → {self.path}")
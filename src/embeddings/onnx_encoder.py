@@ -0,0 +1,303 @@
+"""
+ONNX Runtime embedding backend for CPU serving.
+
+`python -m src.embeddings.onnx_encoder --model <name>` exports a
+sentence-transformers model once into data/models/onnx/<model>/:
+
+    model.onnx        fp32 graph (input ids → last_hidden_state)
+    model.int8.onnx   the same graph with dynamic int8 weight quantization
+    tokenizer.json    fast tokenizer, run with the `tokenizers` package
+    config.json       pooling, normalization, padding and the validation report
+
+The export compares both graphs against the torch model and refuses to write
+config.json when they drift below ONNX_MIN_COSINE, so a directory without it
+is never served. At serving time OnnxEncoder needs only onnxruntime,
+tokenizers and numpy — torch is never imported.
+
+EMBEDDING_BACKEND=onnx switches every model served by
+src/core/model_registry.py over; ONNX_QUANTIZE picks the int8 or the fp32
+graph.
+"""
+
+import argparse
+import json
+import re
+import time
+import numpy as np
+from functools import lru_cache
+from pathlib import Path
+
+from src.core.config import (
+    EMBEDDING_BACKEND, EMBEDDING_DEVICE, EMBEDDING_MODEL, EMBEDDING_MODEL_REVISION, ONNX_MIN_COSINE, ONNX_MODEL_DIR, ONNX_QUANTIZE, ONNX_THREADS,
+)
+
+BACKENDS = ("torch", "onnx")
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "config.json"
+
+# Used for the torch-vs-onnx check when the processed catalog is not around
+VALIDATION_TEXTS = [
+    "heavy duty drawer slide",
+    "stainless steel telescopic slide 500mm",
+    "DZ4180-080-035-U",
+    "locking slide for a 300kg drawer",
+    "Full Extension Telescopic Slide with Lock-in Hold-out. Temperature range: -30 °C to 70 °C",
+]
+PRODUCTS_FILE = Path("data/processed/magento_products_cleaned.json")
+
+_COMMIT_RE = re.compile(r"[0-9a-f]{40}")
+
+
+def onnx_model_dir(model_name):
+    return Path(ONNX_MODEL_DIR) / model_name.replace("/", "__")
+
+
+def encoder_id(model_name, backend=EMBEDDING_BACKEND):
+    """Model name plus backend variant, for cache keys: int8 vectors differ slightly from torch ones."""
+    if backend == "onnx":
+        return f"{model_name}+onnx-{'int8' if ONNX_QUANTIZE else 'fp32'}"
+    return model_name
+
+
+def model_revision(model_name):
+    """Hub revision to load: EMBEDDING_MODEL_REVISION pins the catalog model, other models track their default branch."""
+    return EMBEDDING_MODEL_REVISION if model_name == EMBEDDING_MODEL else None
+
+
+def resolved_revision(model_name, backend=EMBEDDING_BACKEND):
+    """
+    Commit hash of the weights the backend loads, for cache and checkpoint keys
+    (a branch like "main" moves on). An ONNX export records the commit it was
+    exported from; torch resolves the revision like SentenceTransformer does,
+    from the Hub or, offline, the local cache. Falls back to the revision name.
+    """
+    return _resolved_revision(model_name, backend)
+
+
+@lru_cache(maxsize=None)
+def _resolved_revision(model_name, backend):
+    # Resolved once per process and (model, backend)
+    revision = model_revision(model_name)
+    if backend == "onnx":
+        config_path = onnx_model_dir(model_name) / CONFIG_FILE
+        if config_path.exists():
+            with open(config_path, "r") as f:
+                revision = json.load(f).get("revision") or revision
+        return revision or "main"
+    if (revision and _COMMIT_RE.fullmatch(revision)) or Path(model_name).is_dir():
+        return revision or "main"
+    try:
+        from huggingface_hub import hf_hub_download
+        # Files are cached under snapshots/<commit>/
+        return Path(hf_hub_download(model_name, "config.json", revision=revision)).parent.name
+    except (ImportError, OSError, ValueError) as e:
+        print(f"⚠️ Could not resolve the commit of {model_name}@{revision or 'main'} ({e}); keying caches on the revision name")
+        return revision or "main"
+
+
+def load_encoder(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND, device=EMBEDDING_DEVICE):
+    """
+    Object with a SentenceTransformer-compatible encode() for the backend.
+    Loads a new copy; go through src.core.model_registry.get_encoder to share it.
+    """
+    if backend == "onnx":
+        return OnnxEncoder(onnx_model_dir(model_name))
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        # The resolved commit, so the weights always match the cache keys
+        return SentenceTransformer(model_name, device=device, revision=resolved_revision(model_name, "torch"))
+    raise ValueError(f"❌ Unknown embedding backend '{backend}' (expected one of {BACKENDS})")
+
+
+class OnnxEncoder:
+    """Tokenize + ONNX forward pass + pooling; mirrors SentenceTransformer.encode."""
+
+    def __init__(self, model_dir, quantized=ONNX_QUANTIZE, threads=ONNX_THREADS, config=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = Path(model_dir)
+        if config is None:
+            config_path = self.model_dir / CONFIG_FILE
+            if not config_path.exists():
+                raise FileNotFoundError(
+                    f"❌ No validated ONNX export in {self.model_dir}; run python -m src.embeddings.onnx_encoder first"
+                )
+            with open(config_path, "r") as f:
+                config = json.load(f)
+        self.config = config
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.model_file = INT8_FILE if quantized else FP32_FILE
+        self.session = ort.InferenceSession(
+            str(self.model_dir / self.model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.pooling = self.config["pooling"]
+        self.normalize = self.config["normalize"]
+        print(f"⚙️ ONNX Runtime encoder ready: {self.model_dir / self.model_file}")
+
+    def get_sentence_embedding_dimension(self):
+        return self.config["dim"]
+
+    def _forward(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype="int64")
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype="int64"),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype="int64"),
+        }
+        hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+
+        if self.pooling == "cls":
+            return hidden[:, 0]
+        weights = mask[:, :, None].astype("float32")
+        return (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, normalize_embeddings=False,
+               show_progress_bar=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, self.config["dim"]), dtype="float32")
+
+        # Similar lengths per batch keep padding (and wasted compute) down
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        vectors = np.empty((len(texts), self.config["dim"]), dtype="float32")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            vectors[rows] = self._forward([texts[i] for i in rows])
+
+        if self.normalize or normalize_embeddings:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors[0] if single else vectors
+
+
+def _validation_texts(limit=64):
+    if not PRODUCTS_FILE.exists():
+        return VALIDATION_TEXTS
+
+    from src.embeddings.embedder import build_product_text
+    with open(PRODUCTS_FILE, "r") as f:
+        products = json.load(f)
+    return VALIDATION_TEXTS + [build_product_text(p) for p in products[:limit]]
+
+
+def _query_latency_ms(model, texts, repeats=3):
+    latencies = []
+    for _ in range(repeats):
+        for text in texts:
+            started = time.perf_counter()
+            model.encode([text])
+            latencies.append((time.perf_counter() - started) * 1000)
+    return float(np.percentile(latencies, 50))
+
+
+def export_onnx(model_name=EMBEDDING_MODEL, out_dir=None, min_cosine=ONNX_MIN_COSINE, opset=17):
+    """Export, quantize and validate; config.json is written last, only when both graphs pass."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    out_dir = Path(out_dir or onnx_model_dir(model_name))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / CONFIG_FILE).unlink(missing_ok=True)
+
+    print(f"🧠 Loading torch model: {model_name}")
+    model = SentenceTransformer(model_name, device="cpu", revision=resolved_revision(model_name, "torch"))
+    transformer = model[0]
+    auto_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    tokenizer.save_pretrained(str(out_dir))
+
+    pooling = next((m for m in model if type(m).__name__ == "Pooling"), None)
+    pooling_mode = pooling.get_pooling_mode_str() if pooling is not None else "mean"
+    if pooling_mode not in ("mean", "cls"):
+        raise ValueError(f"❌ Pooling mode '{pooling_mode}' is not supported by the ONNX backend")
+
+    sample = tokenizer(["warm-up text for the export"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = auto_model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    print(f"📤 Exporting ONNX graph → {out_dir / FP32_FILE}")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(), tuple(sample[name] for name in input_names), str(out_dir / FP32_FILE),
+            input_names=input_names, output_names=["last_hidden_state"], dynamic_axes=dynamic_axes,
+            opset_version=opset, dynamo=False,
+        )
+
+    print(f"🗜️ Quantizing weights to int8 → {out_dir / INT8_FILE}")
+    quantize_dynamic(str(out_dir / FP32_FILE), str(out_dir / INT8_FILE), weight_type=QuantType.QInt8)
+
+    config = {
+        "model": model_name,
+        "revision": resolved_revision(model_name, "torch"),
+        "input_names": input_names,
+        "pooling": pooling_mode,
+        "normalize": any(type(m).__name__ == "Normalize" for m in model),
+        "max_seq_length": int(model.max_seq_length),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": int(tokenizer.pad_token_id),
+        "dim": int(model.get_sentence_embedding_dimension()),
+    }
+
+    # Validate against torch before anything can load the export
+    texts = _validation_texts()
+    expected = model.encode(texts, normalize_embeddings=True)
+
+    report = {"texts": len(texts), "torch_p50_ms": _query_latency_ms(model, texts[:20])}
+    for name, quantized in (("fp32", False), ("int8", True)):
+        staged = OnnxEncoder(out_dir, quantized=quantized, config=config)
+        got = staged.encode(texts, normalize_embeddings=True)
+        cosine = np.sum(expected * got, axis=1)
+        report[name] = {
+            "file": staged.model_file,
+            "min_cosine": float(cosine.min()),
+            "mean_cosine": float(cosine.mean()),
+            "p50_ms": _query_latency_ms(staged, texts[:20]),
+            "size_mb": (out_dir / staged.model_file).stat().st_size / 1e6,
+        }
+        print(f"   {name}: min cos={cosine.min():.4f} mean cos={cosine.mean():.4f} "
+              f"p50={report[name]['p50_ms']:.2f}ms ({report[name]['size_mb']:.1f} MB) vs torch {report['torch_p50_ms']:.2f}ms")
+
+    failed = [name for name in ("fp32", "int8") if report[name]["min_cosine"] < min_cosine]
+    if failed:
+        raise ValueError(f"❌ ONNX export drifted from torch ({', '.join(failed)} min cosine < {min_cosine}); not enabling it")
+
+    config["validation"] = {"min_cosine_required": min_cosine, **report}
+    with open(out_dir / (CONFIG_FILE + ".tmp"), "w") as f:
+        json.dump(config, f, indent=2)
+    (out_dir / (CONFIG_FILE + ".tmp")).replace(out_dir / CONFIG_FILE)
+
+    print(f"✅ ONNX export validated → {out_dir}")
+    return config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export an embedding model to ONNX (fp32 + int8) and validate it against torch")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--out-dir", default=None)
+    parser.add_argument("--min-cosine", type=float, default=ONNX_MIN_COSINE,
+                        help="Minimum per-text cosine similarity to the torch embedding")
+    args = parser.parse_args()
+    export_onnx(args.model, args.out_dir, args.min_cosine)
@@ -0,0 +1,101 @@
+"""
+Qdrant implementation of VectorStore (src/embeddings/vector_store.py).
+
+By default Qdrant runs embedded: QdrantClient(path=QDRANT_PATH) keeps the
+collection on local disk and needs no server process. QDRANT_URL switches to
+a server that uses the same collection layout:
+
+    vectors          cosine distance, keyed by the search bundle's ids
+    payload indexes  keyword indexes on PAYLOAD_FIELDS
+
+Upserts go out in batches of QDRANT_UPSERT_BATCH points and overwrite
+existing points in place, so catalog refreshes never need a rebuild. Each
+search call sends one batched query.
+
+The embedded mode filters by scanning: it accepts the payload index
+definitions without using them. The indexes take effect when the collection
+lives on a server. An embedded collection can only be opened by one process
+at a time, so multi-worker deployments should point QDRANT_URL at a server.
+"""
+
+import warnings
+import numpy as np
+
+from src.core.config import QDRANT_COLLECTION, QDRANT_PATH, QDRANT_UPSERT_BATCH, QDRANT_URL
+from src.embeddings.vector_store import PAYLOAD_FIELDS, VectorStore, filter_values
+
+
+class QdrantVectorStore(VectorStore):
+    def __init__(self, path=QDRANT_PATH, collection=QDRANT_COLLECTION, dim=None, recreate=False,
+                 url=QDRANT_URL, batch_size=QDRANT_UPSERT_BATCH):
+        from qdrant_client import QdrantClient, models
+
+        self.models = models
+        self.collection = collection
+        self.batch_size = batch_size
+        self.client = QdrantClient(url=url) if url else QdrantClient(path=str(path))
+
+        if recreate and self.client.collection_exists(collection):
+            self.client.delete_collection(collection)
+        if not self.client.collection_exists(collection):
+            if dim is None:
+                raise FileNotFoundError(
+                    f"❌ Qdrant collection '{collection}' missing; run python -m src.embeddings.vector_store build"
+                )
+            self.client.create_collection(
+                collection, vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE, on_disk=True),
+            )
+            with warnings.catch_warnings():
+                # Embedded mode warns that the indexes are inert (see module docstring)
+                warnings.simplefilter("ignore", UserWarning)
+                for field in PAYLOAD_FIELDS:
+                    self.client.create_payload_index(collection, field, field_schema=models.PayloadSchemaType.KEYWORD)
+        print(f"🗄️ Qdrant collection '{collection}' ready ({url or path})")
+
+    def upsert(self, ids, vectors, payloads=None):
+        ids = np.asarray(ids, dtype="int64")
+        vectors = np.asarray(vectors, dtype="float32")
+        payloads = payloads or [{} for _ in range(len(ids))]
+        for start in range(0, len(ids), self.batch_size):
+            end = start + self.batch_size
+            self.client.upsert(self.collection, points=self.models.Batch(
+                ids=ids[start:end].tolist(), vectors=vectors[start:end].tolist(), payloads=list(payloads[start:end]),
+            ))
+
+    def delete(self, ids):
+        ids = np.asarray(ids, dtype="int64").tolist()
+        if ids:
+            self.client.delete(self.collection, points_selector=self.models.PointIdsList(points=ids))
+
+    def _filter(self, filters=None, ids=None):
+        models = self.models
+        must = [
+            models.FieldCondition(key=field, match=models.MatchAny(any=values))
+            for field, values in filter_values(filters).items()
+        ]
+        if ids is not None:
+            must.append(models.HasIdCondition(has_id=np.asarray(ids, dtype="int64").tolist()))
+        return models.Filter(must=must) if must else None
+
+    def search(self, queries, k, filters=None, ids=None):
+        queries = np.atleast_2d(np.asarray(queries, dtype="float32"))
+        query_filter = self._filter(filters, ids)
+        requests = [
+            self.models.QueryRequest(query=q.tolist(), filter=query_filter, limit=k, with_payload=False)
+            for q in queries
+        ]
+        responses = self.client.query_batch_points(self.collection, requests=requests)
+
+        scores = np.full((len(queries), k), -np.inf, dtype="float32")
+        found = np.full((len(queries), k), -1, dtype="int64")
+        for row, response in enumerate(responses):
+            for col, point in enumerate(response.points):
+                scores[row, col] = point.score
+                found[row, col] = point.id
+        return scores, found
+
+    def count(self):
+        return self.client.count(self.collection, exact=True).count
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,280 @@
+"""
+Lexical ranking and rank fusion.
+
+BM25Index is an inverted index over product name / description / features /
+SKU. Postings are stored CSR-style as flat numpy arrays (memory-mapped when
+loaded from a bundle, terms looked up by binary search), and the
+BM25 weight of every posting is precomputed at build time, so scoring a
+query is a handful of vectorized scatter-adds.
+
+Postings are impact-ordered (highest weight first) and each query term
+contributes at most `max_postings` documents, which bounds the work for very
+common terms ("slide", "steel") regardless of catalog size.
+
+CrossEncoderReranker is the optional second stage: it re-scores the first
+few candidates with a small cross-encoder, under a per-request time budget.
+"""
+
+import re
+import threading
+import time
+import numpy as np
+
+from src.core.config import RERANK_BATCH_SIZE, RERANK_BUDGET_MS, RERANK_CACHE_SIZE, RERANK_CANDIDATES, RERANKER_MODEL
+from src.search.query_cache import normalize_query
+from src.storage.array_dir import load_arrays, save_arrays
+from src.storage.redis_cache import LRUCache
+
+# Unicode letters too, so French / German spec text ("glissière", "länge") tokenizes whole
+TOKEN_RE = re.compile(r"[^\W_]+(?:[-.][^\W_]+)*")
+# "80 kg" / "400 mm" → "80kg" / "400mm" so spec tokens match however they are written
+UNIT_RE = re.compile(r"(\d)\s+(kg|mm|cm|lbs|%)\b")
+
+
+def tokenize(text):
+    """Lowercased tokens; hyphenated part numbers also emit their segments."""
+    text = UNIT_RE.sub(r"\1\2", (text or "").lower())
+    tokens = []
+    for token in TOKEN_RE.findall(text):
+        tokens.append(token)
+        if "-" in token:
+            tokens.extend(part for part in token.split("-") if part)
+    return tokens
+
+
+def lexical_text(p):
+    parts = [p.get("sku", ""), p.get("name", ""), p.get("description", ""), p.get("features", "")]
+    return " ".join(part for part in parts if part)
+
+
+class TermVocab:
+    """term → term id over sorted term arrays; the dict.get of a loaded index without building a dict."""
+
+    def __init__(self, terms, term_ids):
+        self.terms = terms          # sorted terms
+        self.term_ids = term_ids    # term id of each
+
+    def get(self, term):
+        pos = int(np.searchsorted(self.terms, term))
+        if pos < len(self.terms) and self.terms[pos] == term:
+            return int(self.term_ids[pos])
+        return None
+
+    def __len__(self):
+        return len(self.terms)
+
+
+class BM25Index:
+    def __init__(self, vocab, indptr, doc_rows, weights, ids, max_postings=4096):
+        self.vocab = vocab          # term → term id (dict, or TermVocab when loaded)
+        self.indptr = indptr        # int64[n_terms + 1]
+        self.doc_rows = doc_rows    # int32[n_postings], row numbers, impact-ordered per term
+        self.weights = weights      # float32[n_postings], precomputed BM25 impact
+        self.ids = ids              # int64[n_docs], FAISS id of each row
+        self.max_postings = max_postings
+        self._local = threading.local()
+
+    def _scratch(self):
+        # Per-thread score accumulator; only touched rows are reset after each query
+        scratch = getattr(self._local, "scores", None)
+        if scratch is None:
+            scratch = self._local.scores = np.zeros(len(self.ids), dtype="float32")
+        return scratch
+
+    @classmethod
+    def build(cls, texts, ids, k1=1.2, b=0.75):
+        vocab = {}
+        term_rows, term_tfs = [], []
+        doc_len = np.zeros(len(texts), dtype="float32")
+
+        for row, text in enumerate(texts):
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            doc_len[row] = sum(counts.values())
+            for token, tf in counts.items():
+                tid = vocab.setdefault(token, len(vocab))
+                if tid == len(term_rows):
+                    term_rows.append([])
+                    term_tfs.append([])
+                term_rows[tid].append(row)
+                term_tfs[tid].append(tf)
+
+        n_docs = len(texts)
+        avgdl = float(doc_len.mean()) if n_docs else 0.0
+        norm = k1 * (1 - b + b * doc_len / max(avgdl, 1e-9))
+
+        indptr = np.zeros(len(vocab) + 1, dtype="int64")
+        indptr[1:] = np.cumsum([len(r) for r in term_rows])
+        doc_rows = np.fromiter((r for rows in term_rows for r in rows), dtype="int32", count=int(indptr[-1]))
+        tfs = np.fromiter((t for tf in term_tfs for t in tf), dtype="float32", count=int(indptr[-1]))
+
+        df = np.diff(indptr).astype("float32")
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        term_of = np.repeat(np.arange(len(vocab)), np.diff(indptr))
+        weights = (idf[term_of] * tfs * (k1 + 1) / (tfs + norm[doc_rows])).astype("float32")
+
+        # Impact order: within each term, highest weight first
+        order = np.lexsort((-weights, term_of))
+        return cls(vocab, indptr, doc_rows[order], weights[order], np.asarray(ids, dtype="int64"))
+
+    def search(self, query, top_k=50, id_filter=None):
+        """Returns (ids, scores) of the best-matching documents, best first (restricted to id_filter when given)."""
+        scores = self._scratch()
+        touched = []
+        for token in set(tokenize(query)):
+            tid = self.vocab.get(token)
+            if tid is None:
+                continue
+            start = self.indptr[tid]
+            end = min(self.indptr[tid + 1], start + self.max_postings)
+            rows = self.doc_rows[start:end]
+            scores[rows] += self.weights[start:end]
+            touched.append(rows)
+
+        if not touched:
+            return self.ids[:0], np.empty(0, dtype="float32")
+
+        rows = np.concatenate(touched)
+        row_scores = scores[rows]
+        scores[rows] = 0
+
+        if id_filter is not None:
+            keep = id_filter.contains(self.ids[rows])
+            rows, row_scores = rows[keep], row_scores[keep]
+            if len(rows) == 0:
+                return self.ids[:0], np.empty(0, dtype="float32")
+
+        # A row appears once per matching term, so over-select before de-duplicating
+        limit = top_k * len(touched)
+        if len(rows) > limit:
+            keep = np.argpartition(-row_scores, limit)[:limit]
+            rows, row_scores = rows[keep], row_scores[keep]
+        rows, first = np.unique(rows, return_index=True)
+        row_scores = row_scores[first]
+
+        order = np.argsort(-row_scores)[:top_k]
+        return self.ids[rows[order]], row_scores[order]
+
+    def save(self, path):
+        if isinstance(self.vocab, TermVocab):
+            terms, term_ids = self.vocab.terms, self.vocab.term_ids
+        else:
+            terms = np.array(sorted(self.vocab), dtype="U")
+            term_ids = np.array([self.vocab[term] for term in terms.tolist()], dtype="int64")
+        save_arrays(path, terms=terms, term_ids=term_ids, indptr=self.indptr, doc_rows=self.doc_rows, weights=self.weights,
+                    ids=self.ids)
+
+    @classmethod
+    def load(cls, path, max_postings=4096):
+        data = load_arrays(path)
+        vocab = TermVocab(data["terms"], data["term_ids"])
+        return cls(vocab, data["indptr"], data["doc_rows"], data["weights"], data["ids"], max_postings)
+
+
+def reciprocal_rank_fusion(rankings, k=60, top_k=None):
+    """Fuse ranked id lists: score(id) = Σ 1 / (k + rank). Returns [(id, score)] best first."""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[int(doc_id)] = fused.get(int(doc_id), 0.0) + 1.0 / (k + rank + 1)
+
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return ordered[:top_k] if top_k else ordered
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores the top `max_candidates` first-stage results with a cross-encoder.
+
+    Scores are cached per (normalized query, SKU, product text), so a repeated
+    query never touches the model. Missing pairs are scored in batches against
+    a deadline: if the measured cost says the budget can't be met, or the
+    deadline passes mid-way, the first-stage order is returned unchanged (the
+    pairs scored so far stay cached for the next request).
+    """
+
+    def __init__(self, model_name=RERANKER_MODEL, max_candidates=RERANK_CANDIDATES, batch_size=RERANK_BATCH_SIZE,
+                 budget_ms=RERANK_BUDGET_MS, cache_size=RERANK_CACHE_SIZE):
+        # Imported here so BM25-only users of this module don't pull in torch
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name)
+        self.model.predict([("warm-up", "warm-up")])  # first call is slow; keep it out of the cost estimate
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.cache = LRUCache(cache_size)
+
+        self.sec_per_pair = None  # moving average of the measured model cost
+        self.reranked = 0
+        self.over_budget = 0
+        self.cache_hits = 0
+        self.scored_pairs = 0
+
+    @staticmethod
+    def passage(result):
+        passage = f"{result['name']} ({result['sku']})"
+        if result.get("highlight"):
+            passage += f". {result['highlight']}"
+        return passage
+
+    def rerank(self, query, results, budget_ms=None):
+        """Re-ordered results with a rerank_score per candidate, or the input order (rerank_score None) when over budget."""
+        started = time.perf_counter()
+        deadline = started + (self.budget_ms if budget_ms is None else budget_ms) / 1000
+
+        head, tail = results[:self.max_candidates], results[self.max_candidates:]
+        if len(head) < 2:
+            return results
+
+        normalized = normalize_query(query)
+        keys = [(normalized, r["sku"], self.passage(r)) for r in head]
+        scores = [self.cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        self.cache_hits += len(head) - len(missing)
+
+        if missing and self.sec_per_pair is not None and started + len(missing) * self.sec_per_pair > deadline:
+            return self._first_stage(head, tail)
+
+        for start in range(0, len(missing), self.batch_size):
+            if time.perf_counter() > deadline:
+                return self._first_stage(head, tail)
+
+            rows = missing[start:start + self.batch_size]
+            batch_started = time.perf_counter()
+            batch_scores = self.model.predict([(query, keys[i][2]) for i in rows], batch_size=self.batch_size)
+            cost = (time.perf_counter() - batch_started) / len(rows)
+            self.sec_per_pair = cost if self.sec_per_pair is None else 0.8 * self.sec_per_pair + 0.2 * cost
+            self.scored_pairs += len(rows)
+
+            for i, score in zip(rows, batch_scores):
+                scores[i] = float(score)
+                self.cache.put(keys[i], scores[i])
+
+        if time.perf_counter() > deadline:
+            return self._first_stage(head, tail)
+
+        order = sorted(range(len(head)), key=lambda i: scores[i], reverse=True)
+        reranked = [{**head[i], "rerank_score": scores[i]} for i in order] + tail
+        for rank, result in enumerate(reranked):
+            result["rank"] = rank + 1
+
+        self.reranked += 1
+        return reranked
+
+    def _first_stage(self, head, tail):
+        """First-stage order; rerank_score None marks the candidates the budget left unscored."""
+        self.over_budget += 1
+        return [{**r, "rerank_score": None} for r in head] + tail
+
+    def stats(self):
+        return {
+            "model": self.model_name,
+            "reranked": self.reranked,
+            "over_budget": self.over_budget,
+            "cache_hits": self.cache_hits,
+            "scored_pairs": self.scored_pairs,
+            "ms_per_pair": self.sec_per_pair * 1000 if self.sec_per_pair is not None else None,
+        }
@@ -0,0 +1,213 @@
+"""
+Vector store abstraction for product (and spec chunk) vectors.
+
+    FaissVectorStore   src/embeddings/faiss_indexer.py   FAISS IndexIDMap2 in process
+    QdrantVectorStore  src/embeddings/qdrant_indexer.py  Qdrant embedded on disk (no server), or QDRANT_URL
+
+Points are keyed by the search bundle's int64 ids (products from 0, spec
+chunks from CHUNK_ID_BASE) and hold L2-normalized vectors, so scores are cosine
+similarities. Each point has a payload with the keyword fields in PAYLOAD_FIELDS,
+and searches can filter on those fields, on a set of allowed ids, or on both:
+
+    store.search(q, 10, filters={"material": "aluminium", "category_id": ["61", "62"]})
+    store.search(q, 10, ids=id_filter.ids())
+
+Each field takes one value or a list of values (OR). Fields are ANDed.
+
+    python -m src.embeddings.vector_store build      # load the current bundle into Qdrant
+    python -m src.embeddings.vector_store compare    # FAISS vs Qdrant latency and recall, offline
+"""
+
+import argparse
+import time
+import numpy as np
+from abc import ABC, abstractmethod
+
+from src.core.config import EMBEDDING_MODEL, VECTOR_STORE
+from src.search.attribute_store import product_attributes
+from src.search.build_faiss_index import ADD_CHUNK_ROWS, EMBED_FILE, load_products, normalized_rows
+from src.search.index_bundle import BUNDLE_DIR, load_bundle
+from src.search.vector_segments import VectorSegments
+
+VECTOR_STORES = ("faiss", "qdrant")
+
+PAYLOAD_FIELDS = ("sku", "parent_sku", "category_id", "material")
+
+# Stored lower-cased by product_attributes; filters on them are matched the same way
+_CASE_FOLDED = ("category_id", "material")
+
+
+class VectorStore(ABC):
+    """id-keyed vectors with keyword payloads; see the module docstring."""
+
+    @abstractmethod
+    def upsert(self, ids, vectors, payloads=None):
+        """Insert or overwrite points; vectors are normalized by the caller."""
+
+    @abstractmethod
+    def delete(self, ids):
+        """Remove points (unknown ids are ignored)."""
+
+    @abstractmethod
+    def search(self, queries, k, filters=None, ids=None):
+        """(scores, ids), each (len(queries), k), best first; ids are -1 where fewer points match."""
+
+    @abstractmethod
+    def count(self):
+        """Number of points."""
+
+    def save(self):
+        """Persist pending changes (no-op for stores that write through)."""
+
+
+def filter_values(filters):
+    """{field: [values]} from a filters dict; fields without a payload index are rejected."""
+    if not filters:
+        return {}
+    unknown = sorted(set(filters) - set(PAYLOAD_FIELDS))
+    if unknown:
+        raise ValueError(f"❌ No payload index on {unknown} (filterable: {', '.join(PAYLOAD_FIELDS)})")
+
+    values = {}
+    for field, value in filters.items():
+        value = value if isinstance(value, (list, tuple, set)) else [value]
+        values[field] = [str(v).strip().lower() if field in _CASE_FOLDED else str(v) for v in value]
+    return values
+
+
+def product_payload(product):
+    attributes = product_attributes(product)
+    return {
+        "sku": product.get("sku"),
+        "parent_sku": product.get("parent_sku") or None,
+        "category_id": attributes["category_id"],
+        "material": attributes["material"],
+    }
+
+
+def bundle_payloads(bundle):
+    """(ids, payloads) for every point of a bundle; spec chunks carry their product's payload."""
+    by_sku = {p["sku"]: p for p in load_products()}
+    ids = bundle.product_ids()
+    skus = (bundle.metadata.get_by_id(int(i))["sku"] for i in ids)
+    payloads = [product_payload(by_sku.get(sku, {"sku": sku})) for sku in skus]
+
+    if bundle.chunks is not None and len(bundle.chunks):
+        of_product = dict(zip(ids.tolist(), payloads))
+        ids = np.concatenate([ids, bundle.chunks.ids])
+        payloads += [of_product[pid] for pid in bundle.chunks.product_ids.tolist()]
+    return ids, payloads
+
+
+def bundle_vectors(bundle):
+    """Exact vectors of a bundle version (bundles from before they were linked in: the embedder's file)."""
+    return bundle.vectors if bundle.vectors is not None else VectorSegments(EMBED_FILE)
+
+
+def bundle_points(bundle_dir=BUNDLE_DIR, batch_rows=ADD_CHUNK_ROWS):
+    """(ids, normalized vectors, payloads) batches covering a bundle: products, then spec chunks."""
+    bundle = load_bundle(bundle_dir)
+    ids, payloads = bundle_payloads(bundle)
+    n_products = len(bundle.product_ids())
+    embeddings = bundle_vectors(bundle)
+
+    for start in range(0, n_products, batch_rows):
+        end = min(start + batch_rows, n_products)
+        yield ids[start:end], normalized_rows(embeddings, ids[start:end]), payloads[start:end]
+    if len(ids) > n_products:
+        yield ids[n_products:], bundle.chunks.vectors, payloads[n_products:]
+
+
+def open_vector_store(backend=VECTOR_STORE, bundle_dir=BUNDLE_DIR):
+    """The store serving `bundle_dir`: its own FAISS index, or the Qdrant collection loaded from it."""
+    if backend == "faiss":
+        from src.embeddings.faiss_indexer import FaissVectorStore
+        return FaissVectorStore.from_bundle(bundle_dir)
+    if backend == "qdrant":
+        from src.embeddings.qdrant_indexer import QdrantVectorStore
+        return QdrantVectorStore()
+    raise ValueError(f"❌ Unknown vector store '{backend}' (expected one of {VECTOR_STORES})")
+
+
+def build_qdrant(bundle_dir=BUNDLE_DIR):
+    """(Re)create the Qdrant collection from a bundle with batched upserts."""
+    from src.embeddings.qdrant_indexer import QdrantVectorStore
+
+    store = None
+    started = time.perf_counter()
+    for ids, vectors, payloads in bundle_points(bundle_dir):
+        if store is None:
+            store = QdrantVectorStore(dim=vectors.shape[1], recreate=True)
+        store.upsert(ids, vectors, payloads)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Qdrant collection loaded: {store.count()} points in {elapsed:.1f}s ({store.count() / elapsed:.0f} points/s)")
+    return store
+
+
+def compare_stores(bundle_dir=BUNDLE_DIR, n_queries=200, k=10):
+    """Head-to-head latency and recall@k vs exact search of both stores, unfiltered and filtered."""
+    from src.search.benchmark import percentiles
+    from src.search.tune_index import exact_neighbours, recall_at_k, tuning_queries
+
+    stores = {backend: open_vector_store(backend, bundle_dir) for backend in VECTOR_STORES}
+
+    # Exact reference over the same points
+    bundle = load_bundle(bundle_dir)
+    ids, payloads = bundle_payloads(bundle)
+    vectors = normalized_rows(bundle_vectors(bundle), bundle.product_ids())
+    if bundle.chunks is not None and len(bundle.chunks):
+        vectors = np.vstack([vectors, bundle.chunks.vectors])
+    queries = tuning_queries(bundle.metadata, n_queries, bundle.manifest.get("model", EMBEDDING_MODEL))
+
+    # The most common material makes a selective but non-empty filter
+    materials = [p["material"] for p in payloads if p["material"]]
+    material = max(set(materials), key=materials.count)
+    matching = np.array([p["material"] == material for p in payloads])
+
+    exact = ids[exact_neighbours(vectors, queries, k)]
+    exact_filtered = ids[matching][exact_neighbours(vectors[matching], queries, min(k, int(matching.sum())))]
+
+    print(f"\n⚖️ {len(ids)} points, {len(queries)} queries, k={k}, filter material={material} ({matching.sum()} points)")
+    print(f"{'store':<8} {'p50 ms':>8} {'p99 ms':>8} {'batch qps':>10} {'recall':>8} {'filt p50':>9} {'filt p99':>9} {'filt recall':>12}")
+    report = {}
+    for backend, store in stores.items():
+        latencies, filtered_latencies, found, found_filtered = [], [], [], []
+        for q in queries:
+            started = time.perf_counter()
+            found.append(store.search(q[None], k)[1][0])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            found_filtered.append(store.search(q[None], k, filters={"material": material})[1][0])
+            filtered_latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        store.search(queries, k)
+        batch_qps = len(queries) / (time.perf_counter() - started)
+
+        row = {
+            "latency_ms": percentiles(latencies),
+            "batch_qps": round(batch_qps, 1),
+            "recall": round(recall_at_k(np.array(found), exact, k), 4),
+            "filtered_latency_ms": percentiles(filtered_latencies),
+            "filtered_recall": round(recall_at_k(np.array(found_filtered)[:, :exact_filtered.shape[1]], exact_filtered, exact_filtered.shape[1]), 4),
+        }
+        report[backend] = row
+        print(f"{backend:<8} {row['latency_ms']['p50']:>8.3f} {row['latency_ms']['p99']:>8.3f} {row['batch_qps']:>10.1f} "
+              f"{row['recall']:>8.4f} {row['filtered_latency_ms']['p50']:>9.3f} {row['filtered_latency_ms']['p99']:>9.3f} "
+              f"{row['filtered_recall']:>12.4f}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load and compare the vector store backends")
+    parser.add_argument("command", choices=["build", "compare"])
+    parser.add_argument("--bundle-dir", default=str(BUNDLE_DIR))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_qdrant(args.bundle_dir)
+    else:
+        compare_stores(args.bundle_dir, args.queries, args.k)
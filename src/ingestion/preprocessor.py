@@ -20,6 +20,7 @@ def clean_product(p: Dict[str, Any]) -> Dict[str, Any]:
 
     return {
         "sku": p.get("sku"),
+        "parent_sku": p.get("parent_sku"),
         "name": clean_text(p.get("name", "")),
         "description": clean_text(mapped.get("description", "")),
         "features": clean_text(mapped.get("features", "")),
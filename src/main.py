@@ -1,6 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
-app = FastAPI()
+from src.api.routes import admin, chat, health, search
+from src.core.config import EMBEDDING_MODEL, ENCODER_MAX_BATCH_SIZE, ENCODER_MAX_WAIT_MS
+from src.search.batch_encoder import MicroBatchEncoder
+from src.search.hot_reload import IndexReloader
+from src.search.semantic_search import SemanticSearcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.searcher = SemanticSearcher(EMBEDDING_MODEL)
+    app.state.encoder = MicroBatchEncoder(
+        app.state.searcher.model,
+        max_batch_size=ENCODER_MAX_BATCH_SIZE,
+        max_wait_ms=ENCODER_MAX_WAIT_MS,
+    )
+    await app.state.encoder.start()
+    # New bundle versions are loaded, warmed and swapped in without a restart
+    app.state.reloader = IndexReloader(app.state, EMBEDDING_MODEL)
+    app.state.reloader.start()
+    yield
+    await app.state.reloader.stop()
+    await app.state.encoder.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(search.router)
+app.include_router(chat.router)
+app.include_router(health.router)
+app.include_router(admin.router)
 
 @app.get("/")
 def read_root():
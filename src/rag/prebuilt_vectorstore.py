@@ -0,0 +1,72 @@
+"""
+LangChain VectorStore adapter over the prebuilt FAISS index.
+
+The index is built offline by `src/search/build_faiss_index.py`, so loading it
+here is a file read (or mmap) — no document is re-encoded at startup.
+Documents are materialized only for the rows a search actually returns.
+"""
+
+import faiss
+import numpy as np
+from pathlib import Path
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from src.search.index_bundle import BUNDLE_DIR, bundle_exists, load_bundle, load_legacy_metadata, lookup_many
+
+EMBED_DIR = Path("data/embeddings")
+INDEX_FILE = EMBED_DIR / "faiss_index.bin"
+
+
+def product_document(meta):
+    return Document(page_content=f"{meta['name']} (SKU: {meta['sku']})", metadata=dict(meta))
+
+
+class PrebuiltFaissStore(VectorStore):
+    """Read-only vector store wrapping an existing inner-product FAISS index."""
+
+    def __init__(self, embedding, index, metadata):
+        self.embedding = embedding
+        self.index = index
+        self.metadata = metadata
+
+    @classmethod
+    def load(cls, embedding, bundle_dir=BUNDLE_DIR):
+        if bundle_exists(bundle_dir):
+            bundle = load_bundle(bundle_dir)
+            return cls(embedding, bundle.index, bundle.metadata)
+
+        return cls(embedding, faiss.read_index(str(INDEX_FILE)), load_legacy_metadata())
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities of L2-normalized vectors already
+        return lambda score: score
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        query = np.asarray([embedding], dtype="float32")
+        faiss.normalize_L2(query)
+
+        distances, indices = self.index.search(query, k)
+        keep = indices[0] != -1
+        rows = lookup_many(self.metadata, indices[0][keep])
+        return [(product_document(meta), float(score)) for meta, score in zip(rows, distances[0][keep])]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("PrebuiltFaissStore is read-only; rebuild with build_faiss_index")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("PrebuiltFaissStore wraps an index built by build_faiss_index; use PrebuiltFaissStore.load")
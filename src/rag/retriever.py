@@ -1,41 +1,55 @@
-import json
 import numpy as np
-from pathlib import Path
+from langchain_core.embeddings import Embeddings
 
-import faiss
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_core.documents import Document
-# from langchain_community.vectorstores.utils import InMemoryDocstore
+from src.core.model_registry import get_encoder
+from src.embeddings.onnx_encoder import encoder_id, resolved_revision
+from src.rag.prebuilt_vectorstore import PrebuiltFaissStore
+from src.search.query_cache import QueryEmbeddingCache
 
 
+class CachedQueryEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated queries from the query-embedding cache."""
 
-# Paths
-EMBED_DIR = Path("data/embeddings")
-INDEX_FILE = EMBED_DIR / "faiss_index.bin"
-EMBEDDINGS_FILE = EMBED_DIR / "product_embeddings.npy"
-META_FILE = EMBED_DIR / "product_metadata.json"
+    def __init__(self, embeddings, cache):
+        self.embeddings = embeddings
+        self.cache = cache
 
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
 
+    def embed_query(self, text):
+        vec = self.cache.get(text)
+        if vec is None:
+            vec = np.asarray([self.embeddings.embed_query(text)], dtype="float32")
+            vec /= max(np.linalg.norm(vec), 1e-12)
+            self.cache.put(text, vec)
+        return vec[0].tolist()
 
-class ProductRetriever:
-    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
-        print("🧠 Loading embedding model...")
-        self.embeddings = HuggingFaceEmbeddings(model_name=model_name)
 
-        print("📦 Loading metadata...")
-        with open(META_FILE, "r") as f:
-            self.metadata = json.load(f)
+class EncoderEmbeddings(Embeddings):
+    """LangChain embeddings over a shared registry encoder (same weights as the searcher's)."""
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+
+    def embed_documents(self, texts):
+        return np.asarray(self.encoder.encode(texts), dtype="float32").tolist()
 
-        print("🔢 Loading vectors...")
-        vectors = np.load(EMBEDDINGS_FILE).astype("float32")
+    def embed_query(self, text):
+        return np.asarray(self.encoder.encode([text]), dtype="float32")[0].tolist()
 
-        print("🔗 Creating FAISS vectorstore from documents...")
-        docs = [
-            Document(page_content=f"{meta['name']} (SKU: {meta['sku']})", metadata=meta)
-            for meta in self.metadata
-        ]
-        self.vectorstore = FAISS.from_documents(docs, self.embeddings)
+
+class ProductRetriever:
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+        print("🧠 Loading embedding model...")
+        self.embeddings = CachedQueryEmbeddings(
+            EncoderEmbeddings(get_encoder(model_name)),
+            QueryEmbeddingCache(encoder_id(model_name), resolved_revision(model_name)),
+        )
+
+        # Wrap the index built by build_faiss_index — no catalog re-encoding at startup
+        print("📦 Loading prebuilt FAISS index...")
+        self.vectorstore = PrebuiltFaissStore.load(self.embeddings)
 
         print("✅ Retriever ready!")
 
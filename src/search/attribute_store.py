@@ -0,0 +1,239 @@
+"""
+Columnar attribute store for filtered search.
+
+The structured fields extracted by clean_product are stored column-wise and
+addressed by FAISS id:
+
+    numeric      float32[n_ids] per field, NaN when unknown
+    categorical  one packed bitmap (1 bit per id) per distinct value
+
+A filter compiles into a single id bitmap that FAISS consumes as an
+IDSelectorBitmap, so non-matching products are skipped inside the search
+instead of being over-fetched and discarded afterwards.
+
+Filters are plain dicts:
+
+    {"material": "aluminium", "min_length_mm": 400, "min_capacity_kg": 300}
+
+Categorical fields take a value or a list of values (OR); numeric fields take
+"min_<field>" / "max_<field>" bounds (inclusive). All conditions are ANDed.
+"""
+
+import ast
+import re
+import faiss
+import numpy as np
+
+from src.storage.array_dir import load_arrays, save_arrays
+
+NUMERIC_FIELDS = ["length_mm", "capacity_kg", "weight_kg"]
+CATEGORICAL_FIELDS = ["material", "category_id", "corrosion_resistant"]
+
+LBS_TO_KG = 0.45359237
+
+# "over 400mm", "at least 300 kg", "up to 60kg", "holds 300kg", "500 mm"
+_LOWER = r"(?:over|above|more than|at least|min(?:imum)?|from|holds?|supports?|>=?)"
+_UPPER = r"(?:under|below|less than|at most|up to|upto|max(?:imum)?|<=?)"
+_MEASURE_RE = re.compile(rf"(?:({_LOWER})|({_UPPER}))?\s*(\d+(?:\.\d+)?)\s*(mm|cm|kg|lbs?)\b", re.IGNORECASE)
+
+
+def _as_dict(value):
+    """capacity / dimensions arrive either as dicts or as their str() form."""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str) and value.startswith("{"):
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return None
+    return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _category(value):
+    """Category ids come as ints, floats ("61.0") or strings; key them as "61"."""
+    number = _float(value)
+    if np.isnan(number):
+        return str(value).strip().lower() if value not in (None, "") else None
+    return str(int(number))
+
+
+def product_attributes(p):
+    """Flatten a cleaned product into {field: value} for the attribute store."""
+    dims = _as_dict(p.get("dimensions")) or {}
+    lengths = dims.get("length_mm") or []
+
+    capacity = _as_dict(p.get("capacity")) or {}
+    load = _float(capacity.get("value", capacity.get("max")))
+    if capacity.get("unit", "kg").startswith("lb"):
+        load *= LBS_TO_KG
+
+    material = p.get("material")
+    return {
+        # length_mm on the product is often a Magento option id; the parsed dimensions are reliable
+        "length_mm": _float(lengths[0]) if lengths else np.nan,
+        "capacity_kg": load,
+        "weight_kg": _float(p.get("weight_kg")),
+        "material": material.strip().lower() if material else None,
+        "category_id": _category(p.get("category_id")),
+        "corrosion_resistant": "true" if p.get("corrosion_resistant") else "false",
+    }
+
+
+class IdFilter:
+    """A compiled filter: packed id bitmap plus the FAISS selector reading it."""
+
+    def __init__(self, bitmap, n_ids):
+        self.bitmap = bitmap  # must outlive the selector, which holds a raw pointer to it
+        self.n_ids = n_ids
+        self.count = int(np.unpackbits(bitmap).sum())
+        # IDSelectorBitmap takes the bitmap's length in bytes; ids past it are rejected, not read
+        self.selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+        self.extra_ids = np.empty(0, dtype="int64")
+        self._selectors = []
+
+    def include(self, extra_ids):
+        """Also admit ids outside the bitmap range (spec chunks of the matching products)."""
+        self.extra_ids = np.unique(np.asarray(extra_ids, dtype="int64"))
+        if not len(self.extra_ids):
+            return self
+        batch = faiss.IDSelectorBatch(len(self.extra_ids), faiss.swig_ptr(self.extra_ids))
+        # IDSelectorOr only points at its operands; keep them alive with the filter
+        self._selectors = [self.selector, batch]
+        self.selector = faiss.IDSelectorOr(self._selectors[0], batch)
+        return self
+
+    def ids(self):
+        """Every id the filter admits, ascending (for stores that take an id list, not a selector)."""
+        inside = np.flatnonzero(np.unpackbits(self.bitmap, bitorder="little")[:self.n_ids])
+        return np.union1d(inside.astype("int64"), self.extra_ids)
+
+    def contains(self, ids):
+        """Boolean mask over an array of FAISS ids."""
+        ids = np.asarray(ids, dtype="int64")
+        inside = (ids >= 0) & (ids < self.n_ids)
+        safe = np.where(inside, ids, 0)
+        mask = inside & ((self.bitmap[safe >> 3] >> (safe & 7)) & 1).astype(bool)
+        if len(self.extra_ids):
+            mask |= np.isin(ids, self.extra_ids)
+        return mask
+
+
+class AttributeStore:
+    def __init__(self, numeric, bitmaps, live, n_ids):
+        self.numeric = numeric  # field → float32[n_ids]
+        self.bitmaps = bitmaps  # field → {value: packed uint8 bitmap}
+        self.live = live        # packed bitmap of the ids present in the index
+        self.n_ids = n_ids
+
+    @classmethod
+    def build(cls, products, ids):
+        ids = np.asarray(ids, dtype="int64")
+        n_ids = int(ids.max()) + 1 if len(ids) else 0
+
+        numeric = {field: np.full(n_ids, np.nan, dtype="float32") for field in NUMERIC_FIELDS}
+        members = {field: {} for field in CATEGORICAL_FIELDS}
+        for faiss_id, p in zip(ids.tolist(), products):
+            attrs = product_attributes(p)
+            for field in NUMERIC_FIELDS:
+                numeric[field][faiss_id] = attrs[field]
+            for field in CATEGORICAL_FIELDS:
+                if attrs[field] is not None:
+                    members[field].setdefault(attrs[field], []).append(faiss_id)
+
+        def bitmap(id_list):
+            mask = np.zeros(n_ids, dtype=bool)
+            mask[id_list] = True
+            return np.packbits(mask, bitorder="little")
+
+        bitmaps = {field: {value: bitmap(id_list) for value, id_list in values.items()} for field, values in members.items()}
+        return cls(numeric, bitmaps, bitmap(ids), n_ids)
+
+    def values(self, field):
+        return sorted(self.bitmaps.get(field, {}))
+
+    def compile(self, filters):
+        """Compile a filter dict into an IdFilter (None when there is nothing to filter on)."""
+        filters = {key: value for key, value in (filters or {}).items() if value is not None}
+        if not filters:
+            return None
+
+        mask = np.array(self.live)  # in-memory copy of the (mapped) live bitmap
+        for key, value in filters.items():
+            if key in self.bitmaps:
+                allowed = np.zeros_like(mask)
+                for v in value if isinstance(value, (list, tuple, set)) else [value]:
+                    bits = self.bitmaps[key].get(_category(v) if key == "category_id" else str(v).strip().lower())
+                    if bits is not None:
+                        allowed |= bits
+                mask &= allowed
+            elif key[:4] in ("min_", "max_") and key[4:] in self.numeric:
+                column = self.numeric[key[4:]]
+                # NaN (unknown) compares False, so products without the attribute are excluded
+                ok = column >= float(value) if key.startswith("min_") else column <= float(value)
+                mask &= np.packbits(ok, bitorder="little")
+            else:
+                raise ValueError(f"❌ Unknown filter '{key}'")
+
+        return IdFilter(mask, self.n_ids)
+
+    def save(self, path):
+        arrays = {"live": self.live, "n_ids": np.array(self.n_ids, dtype="int64")}
+        for field, column in self.numeric.items():
+            arrays[f"num_{field}"] = column
+        for field, values in self.bitmaps.items():
+            keys = sorted(values)
+            arrays[f"values_{field}"] = np.array(keys, dtype="U")
+            arrays[f"bitmaps_{field}"] = np.stack([values[k] for k in keys]) if keys else np.zeros((0, len(self.live)), dtype="uint8")
+        save_arrays(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        data = load_arrays(path)
+        numeric = {field: data[f"num_{field}"] for field in NUMERIC_FIELDS}
+        bitmaps = {
+            field: dict(zip(data[f"values_{field}"].tolist(), data[f"bitmaps_{field}"]))
+            for field in CATEGORICAL_FIELDS
+        }
+        return cls(numeric, bitmaps, data["live"], int(data["n_ids"]))
+
+
+def parse_query_filters(query, materials=()):
+    """
+    Best-effort filters from free text, e.g. "aluminium slide over 400mm that
+    holds 300kg" → {"material": "aluminium", "min_length_mm": 400, "min_capacity_kg": 300}.
+    """
+    filters = {}
+    lowered = (query or "").lower()
+
+    for material in materials:
+        if re.search(rf"\b{re.escape(material)}\b", lowered):
+            filters["material"] = material
+            break
+
+    for lower, upper, number, unit in _MEASURE_RE.findall(lowered):
+        value = float(number)
+        if unit == "cm":
+            value *= 10
+        elif unit.startswith("lb"):
+            value *= LBS_TO_KG
+
+        if unit in ("mm", "cm"):
+            # A bare length ("500mm slide") means that length
+            if lower or not upper:
+                filters["min_length_mm"] = value
+            if upper or not lower:
+                filters["max_length_mm"] = value
+        elif upper:
+            filters["max_capacity_kg"] = value
+        else:
+            # "300kg" on its own means it must hold at least that much
+            filters["min_capacity_kg"] = value
+
+    return filters
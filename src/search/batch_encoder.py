@@ -0,0 +1,126 @@
+"""
+Async micro-batching query encoder.
+
+Concurrent requests each await `encode(text)`. A single background task
+collects queued queries until either `max_batch_size` is reached or
+`max_wait_ms` has passed since the first one arrived, encodes them in one
+forward pass (off the event loop) and resolves every caller's future with
+its own row.
+"""
+
+import asyncio
+import time
+import faiss
+import numpy as np
+
+
+class BatchMetrics:
+    """Running counters for batch sizes, queue wait and encode time."""
+
+    def __init__(self):
+        self.batches = 0
+        self.queries = 0
+        self.max_batch_size = 0
+        self.batch_size_histogram = {}
+        self.total_queue_wait_ms = 0.0
+        self.max_queue_wait_ms = 0.0
+        self.total_encode_ms = 0.0
+
+    def record(self, batch_size, queue_waits_ms, encode_ms):
+        self.batches += 1
+        self.queries += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.batch_size_histogram[batch_size] = self.batch_size_histogram.get(batch_size, 0) + 1
+        self.total_queue_wait_ms += sum(queue_waits_ms)
+        self.max_queue_wait_ms = max(self.max_queue_wait_ms, max(queue_waits_ms))
+        self.total_encode_ms += encode_ms
+
+    def snapshot(self):
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": self.queries / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+            "avg_queue_wait_ms": self.total_queue_wait_ms / self.queries if self.queries else 0.0,
+            "max_queue_wait_ms": self.max_queue_wait_ms,
+            "avg_encode_ms": self.total_encode_ms / self.batches if self.batches else 0.0,
+        }
+
+
+class MicroBatchEncoder:
+    def __init__(self, model, max_batch_size=32, max_wait_ms=3.0, normalize=True):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.normalize = normalize
+        self.metrics = BatchMetrics()
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+            print(f"⚡ Micro-batch encoder started (batch≤{self.max_batch_size}, wait≤{self.max_wait * 1000:.1f}ms)")
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def encode(self, text: str):
+        """Encode one query; returns a (1, dim) float32 array."""
+        if self._worker is None:
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _encode_batch(self, texts):
+        emb = self.model.encode(texts, batch_size=len(texts), convert_to_tensor=False)
+        emb = np.asarray(emb).astype("float32")
+        if self.normalize:
+            faiss.normalize_L2(emb)
+        return emb
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _, _ in batch]
+
+            started = time.perf_counter()
+            waits_ms = [(started - queued_at) * 1000 for _, _, queued_at in batch]
+            try:
+                # Run the forward pass in a worker thread so the event loop keeps accepting requests
+                vectors = await loop.run_in_executor(None, self._encode_batch, texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.metrics.record(len(batch), waits_ms, (time.perf_counter() - started) * 1000)
+            for row, (_, future, _) in enumerate(batch):
+                if not future.done():
+                    future.set_result(vectors[row:row + 1])
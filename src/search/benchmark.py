@@ -0,0 +1,295 @@
+"""
+Offline search benchmark: stage latencies, QPS, ANN recall and golden-set quality.
+
+    python -m src.search.benchmark --output data/eval/benchmark.json [--compare old.json]
+
+Runs on CPU against the local data/embeddings artifacts (Hugging Face hub in
+offline mode). Queries are the labelled golden set (data/eval/golden_queries.jsonl,
+one {"query", "relevant", "type", "language"} object per line) plus seeded
+synthetic queries cut from catalog names, so two runs over the same artifacts
+see the same load.
+
+Reported:
+
+    latency_ms   p50/p95/p99 of encode, search, re-rank and end-to-end
+                 (end-to-end = SemanticSearcher.search with the query cache off;
+                 the re-rank score cache is cleared before each timed phase)
+    qps          sequential, and with a thread pool sharing one searcher
+    recall       recall@k of the configured index vs exact IndexFlatIP
+    quality      hit@k, recall@k and MRR of the golden queries
+
+The JSON output has sorted keys and rounded numbers so runs diff cleanly;
+--compare prints the change of every metric against an earlier run.
+"""
+
+import argparse
+import json
+import os
+import time
+import faiss
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from src.core.config import (
+    EMBEDDING_BACKEND, EMBEDDING_MODEL, HYBRID_SEARCH, RERANKER_MODEL,
+)
+from src.search.sku_index import normalize_sku
+from src.search.tune_index import exact_neighbours, recall_at_k
+from src.search.vector_segments import VectorSegments
+
+GOLDEN_FILE = Path("data/eval/golden_queries.jsonl")
+OUTPUT_FILE = Path("data/eval/benchmark.json")
+EMBED_FILE = Path("data/embeddings/product_embeddings.npy")
+
+
+class NoQueryCache:
+    """Stands in for QueryEmbeddingCache so every query pays for its encode."""
+
+    def get(self, text):
+        return None
+
+    def put(self, text, vec):
+        pass
+
+
+def load_golden(path=GOLDEN_FILE):
+    if not Path(path).exists():
+        print(f"⚠️ Golden query set missing: {path}")
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_queries(metadata, n, seed=42):
+    """Seeded 2-5 word windows of catalog names (every tenth one a SKU prefix)."""
+    rng = np.random.default_rng(seed)
+    rows = [row for row in metadata if row.get("name") and row["name"] != "None"]
+    queries = []
+    for i in rng.choice(len(rows), size=min(n, len(rows)), replace=False):
+        row = rows[i]
+        if len(queries) % 10 == 9:
+            queries.append(row["sku"][:max(4, len(row["sku"]) - 3)])
+            continue
+        words = row["name"].split()
+        width = int(rng.integers(2, 6))
+        start = int(rng.integers(0, max(1, len(words) - width + 1)))
+        queries.append(" ".join(words[start:start + width]).lower())
+    return queries
+
+
+def percentiles(ms):
+    if not ms:
+        return None
+    ms = np.asarray(ms)
+    return {
+        "mean": round(float(ms.mean()), 3),
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p95": round(float(np.percentile(ms, 95)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def encode(searcher, texts):
+    vectors = np.asarray(searcher.model.encode(texts, convert_to_tensor=False), dtype="float32").reshape(len(texts), -1)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def clear_rerank_cache(searcher):
+    """Drop cached cross-encoder scores so a timed phase doesn't replay the previous one's."""
+    if searcher.reranker is not None:
+        searcher.reranker.cache.clear()
+
+
+def stage_latencies(searcher, queries, top_k):
+    """Encode, first-stage search and re-rank timed separately on the vector path."""
+    clear_rerank_cache(searcher)
+    timings = {"encode": [], "search": [], "rerank": []}
+    first_k = searcher.first_stage_k(top_k) if searcher.reranker is not None else top_k
+    for query in queries:
+        started = time.perf_counter()
+        q_emb = encode(searcher, [query])
+        encoded = time.perf_counter()
+        results = searcher.rank(query, q_emb, first_k)
+        searched = time.perf_counter()
+        timings["encode"].append((encoded - started) * 1000)
+        timings["search"].append((searched - encoded) * 1000)
+
+        if searcher.reranker is not None:
+            searcher.reranker.rerank(query, results)
+            timings["rerank"].append((time.perf_counter() - searched) * 1000)
+    return {stage: percentiles(ms) for stage, ms in timings.items()}
+
+
+def end_to_end(searcher, queries, top_k, threads):
+    """Per-query latency and sequential QPS, then QPS with `threads` concurrent callers."""
+    latencies, results = [], []
+    clear_rerank_cache(searcher)
+    started = time.perf_counter()
+    for query in queries:
+        query_started = time.perf_counter()
+        results.append(searcher.search(query, top_k))
+        latencies.append((time.perf_counter() - query_started) * 1000)
+    sequential_sec = time.perf_counter() - started
+
+    clear_rerank_cache(searcher)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda q: searcher.search(q, top_k), queries))
+    threaded_sec = time.perf_counter() - started
+
+    qps = {
+        "sequential": round(len(queries) / sequential_sec, 2),
+        "threads": threads,
+        "threaded": round(len(queries) / threaded_sec, 2),
+    }
+    return percentiles(latencies), qps, results
+
+
+def index_recall(searcher, queries, k):
+    """recall@k of the index as configured (ANN params, compression) against exact inner-product search."""
+    if searcher.variants is not None:
+        ids = searcher.variants.rep_ids
+    elif searcher.manifest is not None:
+        ids = np.asarray(searcher.metadata.ids)
+    else:
+        ids = np.arange(len(searcher.metadata), dtype="int64")
+    # Legacy indexes and bundles from before the vectors were linked in: the embedder's file
+    vectors = (searcher.vectors if searcher.vectors is not None else VectorSegments(EMBED_FILE))[ids]
+    faiss.normalize_L2(vectors)
+    if searcher.chunks is not None:
+        ids = np.concatenate([ids, searcher.chunks.ids])
+        vectors = np.vstack([vectors, searcher.chunks.vectors])
+
+    q_embs = encode(searcher, queries)
+    _, approx = searcher.index.search(q_embs, k)
+    exact = ids[exact_neighbours(vectors, q_embs, k)]
+    return {"k": k, "recall": round(recall_at_k(approx, exact, k), 4), "queries": len(queries)}
+
+
+def golden_quality(golden, results, k):
+    """hit@k, recall@k and MRR of the labelled queries (SKUs compared normalized)."""
+    if not golden:
+        return None
+    hits, recalls, reciprocal = [], [], []
+    for item, found in zip(golden, results):
+        relevant = {normalize_sku(sku) for sku in item["relevant"]}
+        ranked = [normalize_sku(r["sku"]) for r in found[:k]]
+        first = next((rank for rank, sku in enumerate(ranked, 1) if sku in relevant), None)
+        hits.append(first is not None)
+        recalls.append(len(relevant & set(ranked)) / min(len(relevant), k))
+        reciprocal.append(1 / first if first else 0.0)
+    return {
+        "k": k,
+        "hit_rate": round(float(np.mean(hits)), 4),
+        "recall": round(float(np.mean(recalls)), 4),
+        "mrr": round(float(np.mean(reciprocal)), 4),
+        "queries": len(golden),
+    }
+
+
+def flatten(report, prefix=""):
+    flat = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(report, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = flatten(json.load(f))
+    current = flatten(report)
+
+    print(f"\n📊 Compared with {baseline_path}")
+    for name in sorted(set(baseline) | set(current)):
+        old, new = baseline.get(name), current.get(name)
+        if old is None or new is None:
+            print(f"{name:<40} {str(old):>12} → {str(new):>12}")
+        elif old != new:
+            change = f"{(new - old) / old:+.1%}" if old else ""
+            print(f"{name:<40} {old:>12} → {new:>12} {change:>8}")
+
+
+def run_benchmark(model_name=EMBEDDING_MODEL, golden_file=GOLDEN_FILE, n_synthetic=200, top_k=10,
+                  threads=4, warmup=5, seed=42):
+    # Everything comes from the local artifacts; never reach out to the hub
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    from src.search.semantic_search import SemanticSearcher
+
+    searcher = SemanticSearcher(model_name)
+    searcher.query_cache = NoQueryCache()
+    # Open the language bundles up front so their load isn't timed as a query
+    for language in searcher.language_manifests:
+        searcher.language_searcher(language).query_cache = NoQueryCache()
+
+    golden = load_golden(golden_file)
+    synthetic = synthetic_queries(searcher.metadata, n_synthetic, seed)
+    queries = [item["query"] for item in golden] + synthetic
+    print(f"\n🏁 Benchmarking {len(golden)} golden + {len(synthetic)} synthetic queries (k={top_k})")
+
+    for query in queries[:warmup]:
+        searcher.search(query, top_k)
+
+    stages = stage_latencies(searcher, queries, top_k)
+    e2e, qps, results = end_to_end(searcher, queries, top_k, threads)
+
+    manifest = searcher.manifest or {}
+    report = {
+        "config": {
+            "model": model_name,
+            "backend": EMBEDDING_BACKEND,
+            "index_type": manifest.get("index_type", "legacy"),
+            "search_params": manifest.get("search_params"),
+            "rerank_factor": searcher.rerank_factor,
+            "hybrid": HYBRID_SEARCH and searcher.lexical is not None,
+            "reranker": RERANKER_MODEL or None,
+            "index_version": searcher.index_version,
+            "vectors": int(searcher.index.ntotal),
+            "chunk_vectors": len(searcher.chunks) if searcher.chunks is not None else 0,
+        },
+        "queries": {"golden": len(golden), "synthetic": len(synthetic), "top_k": top_k, "seed": seed},
+        "latency_ms": {**stages, "end_to_end": e2e},
+        "qps": qps,
+        "recall": index_recall(searcher, queries, top_k),
+        "quality": golden_quality(golden, results[:len(golden)], top_k),
+    }
+
+    print(f"\n{'stage':<12} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    for stage, stats in report["latency_ms"].items():
+        if stats:
+            print(f"{stage:<12} {stats['p50']:>9.3f} {stats['p95']:>9.3f} {stats['p99']:>9.3f}")
+    print(f"⚡ QPS: {qps['sequential']} sequential · {qps['threaded']} with {threads} threads")
+    print(f"🎯 recall@{top_k} vs exact: {report['recall']['recall']:.4f}")
+    if report["quality"]:
+        quality = report["quality"]
+        print(f"⭐ golden hit@{top_k}={quality['hit_rate']:.3f} recall@{top_k}={quality['recall']:.3f} MRR={quality['mrr']:.3f}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark search latency, throughput and recall offline")
+    parser.add_argument("--golden", default=str(GOLDEN_FILE), help="JSONL golden query set")
+    parser.add_argument("--synthetic", type=int, default=200, help="Synthetic queries drawn from catalog names")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent callers for the threaded QPS run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=str(OUTPUT_FILE))
+    parser.add_argument("--compare", default=None, help="Earlier benchmark JSON to diff against")
+    args = parser.parse_args()
+
+    report = run_benchmark(golden_file=args.golden, n_synthetic=args.synthetic, top_k=args.k,
+                           threads=args.threads, seed=args.seed)
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"💾 Benchmark written → {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
@@ -1,21 +1,53 @@
 import json
+import argparse
+import os
+import shutil
 import faiss
 import numpy as np
 from pathlib import Path
 
+from src.core.config import (
+    COLLAPSE_VARIANTS, EMBEDDING_MODEL, FAISS_INDEX_TYPE, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH, HNSW_M, IVF_NLIST, IVF_NPROBE,
+    LANGUAGE_BUNDLE_MIN_COVERAGE, LANGUAGE_EMBEDDING_MODEL, PQ_M, PQ_NBITS, RERANK_FACTOR, SEARCH_LANGUAGES,
+)
+from src.embeddings.embedder import ProductEmbedder, build_product_text
+from src.embeddings.ranker import BM25Index, lexical_text
+from src.search.attribute_store import AttributeStore
+from src.search.index_bundle import PRIMARY_LANGUAGE, language_bundle_dir, write_bundle
+from src.search.sku_index import SkuIndex
+from src.search.spec_chunks import ChunkMap, collect_chunks, product_family
+from src.search.variants import VariantTable, variant_groups
+from src.search.vector_segments import VectorSegments
+from src.storage.db_manager import write_product_store
+
 EMBEDDING_DIR = Path("data/embeddings")
 EMBED_FILE = EMBEDDING_DIR / "product_embeddings.npy"
 META_FILE = EMBEDDING_DIR / "product_metadata.json"
 INDEX_FILE = EMBEDDING_DIR / "faiss_index.bin"
+# Products the embeddings were generated from (row-aligned with the metadata)
+PRODUCTS_FILE = Path("data/processed/magento_products_cleaned.json")
+# Per-language spec extractions written by src/ingestion/PDF/pdf_reader.py
+SPECS_DIR = Path("data/processed/clean_pdf_json")
+
+INDEX_TYPES = ("flat", "hnsw", "ivf", "sq8", "pq")
+SMALL_BUNDLE_SIZE = 1000
+
+# Vectors are normalized and added this many rows at a time, straight from the memmap
+ADD_CHUNK_ROWS = 65536
+# IVF / PQ codebooks are trained on at most this many sampled vectors
+TRAIN_SAMPLE_ROWS = 200_000
 
 
-def load_embeddings():
+def load_embeddings(mmap=True):
+    """The embeddings matrix, memory-mapped by default (read-only: copy before modifying)."""
     if not EMBED_FILE.exists():
         raise FileNotFoundError(f"❌ Embeddings file missing: {EMBED_FILE}")
 
-    embeddings = np.load(EMBED_FILE)
-    print(f"📦 Loaded embeddings → shape: {embeddings.shape}")
-    return embeddings.astype("float32")
+    embeddings = np.load(EMBED_FILE, mmap_mode="r" if mmap else None)
+    print(f"📦 Loaded embeddings → shape: {embeddings.shape}{' (mmap)' if mmap else ''}")
+    if embeddings.dtype != np.float32:
+        embeddings = embeddings.astype("float32")  # files from older builds
+    return embeddings
 
 
 def load_metadata():
@@ -28,38 +60,260 @@ def load_metadata():
     return metadata
 
 
-def build_faiss_index(embeddings):
-    dim = embeddings.shape[1]
+def load_products():
+    if not PRODUCTS_FILE.exists():
+        raise FileNotFoundError(f"❌ Processed products missing: {PRODUCTS_FILE}")
+
+    with open(PRODUCTS_FILE, "r") as f:
+        return json.load(f)
+
+
+def build_lexical_index(products, ids):
+    print(f"🔤 Building BM25 index over {len(products)} products...")
+    return BM25Index.build([lexical_text(p) for p in products], ids)
+
+
+def spec_text(spec):
+    """Prose values of a spec extraction (variant tables are numeric and identical across languages)."""
+    values = (" ".join(value.split()) for key, value in spec.items() if key not in ("product_id", "language") and isinstance(value, str))
+    return "\n".join(value for value in values if value)
+
+
+def load_specs(language):
+    """{SKU or family: spec text} for one language; empty when the extraction is missing."""
+    path = SPECS_DIR / f"product_specs_{language}.json"
+    if not path.exists():
+        return {}
+
+    with open(path, "r", encoding="utf-8") as f:
+        specs = json.load(f)
+
+    texts = {}
+    for spec in specs:
+        text = spec_text(spec)
+        if not spec.get("product_id") or not text:
+            continue
+        texts.setdefault(spec["product_id"], text)
+        texts.setdefault(product_family(spec["product_id"]), text)
+    return texts
+
+
+def build_language_bundle(language, products, index_type=FAISS_INDEX_TYPE, model_name=LANGUAGE_EMBEDDING_MODEL):
+    """
+    Bundle for one spec language over the whole catalog, embedded with a
+    multilingual model: the product's PDF spec text in that language where it
+    exists, followed by its catalog text, so products without a translated spec
+    stay findable. FAISS ids are the main bundle's ids, so attributes, results
+    and caches line up.
+
+    Skipped (None) while fewer than LANGUAGE_BUNDLE_MIN_COVERAGE of the products
+    have spec text in the language: the bundle would be the English catalog
+    re-embedded. A stale bundle is removed, so its queries use the primary one.
+    """
+    specs = load_specs(language)
+    rows, n_specs = [], 0
+    for faiss_id, p in enumerate(products):
+        spec = specs.get(p["sku"]) or specs.get(p.get("parent_sku")) or specs.get(product_family(p["sku"]))
+        n_specs += bool(spec)
+        rows.append((faiss_id, p, f"{spec}\n{build_product_text(p)}" if spec else build_product_text(p)))
+
+    coverage = n_specs / max(len(rows), 1)
+    if coverage < LANGUAGE_BUNDLE_MIN_COVERAGE:
+        print(f"⏭️ Skipping {language} bundle: {n_specs}/{len(rows)} products have {language} specs "
+              f"({coverage:.0%} < {LANGUAGE_BUNDLE_MIN_COVERAGE:.0%}); {language} queries use the {PRIMARY_LANGUAGE} bundle")
+        # Its ids would no longer match the primary bundle just built
+        shutil.rmtree(language_bundle_dir(language), ignore_errors=True)
+        return None
+
+    if len(rows) < SMALL_BUNDLE_SIZE:
+        index_type = "flat"  # exact search over a few hundred vectors beats training a quantizer
+
+    print(f"🌍 Building {language} bundle over {len(rows)} products, {n_specs} with {language} specs ({index_type})...")
+    ids = np.array([faiss_id for faiss_id, _, _ in rows], dtype="int64")
+    texts = [text for _, _, text in rows]
+    embeddings = ProductEmbedder(model_name).encode_with_cache(texts)
+
+    index, search_params = build_faiss_index(embeddings, index_type, ids=ids)
+    metadata = [
+        {"product_id": p.get("product_id", p["sku"]), "sku": p["sku"], "name": p["name"], "content_hash": ""}
+        for _, p, _ in rows
+    ]
+    lexical = BM25Index.build([f"{p['sku']} {text}" for _, p, text in rows], ids)
+    attributes = AttributeStore.build([p for _, p, _ in rows], ids)
+
+    return write_bundle(index, metadata, language_bundle_dir(language), ids=ids, lexical=lexical, attributes=attributes, extra_manifest={
+        "language": language,
+        "model": model_name,
+        "index_type": index_type,
+        "search_params": search_params,
+        "rerank_factor": 0,  # product_embeddings.npy holds the catalog-model vectors only
+    })
+
+
+def build_chunk_map(products, ids, model_name=EMBEDDING_MODEL, variants=None):
+    """Embed the English PDF spec chunks with the catalog model (None when there are none)."""
+    chunks = collect_chunks(products, ids)
+    if variants is not None:
+        # Chunks attach to the vector standing for their product's group (once per group)
+        owners = variants.representatives([product_id for product_id, _, _ in chunks]).tolist()
+        chunks = list(dict.fromkeys((owner, section, text) for owner, (_, section, text) in zip(owners, chunks)))
+    if not chunks:
+        print("⚠️ No PDF spec chunks found; indexing products only")
+        return None
+
+    print(f"📑 Embedding {len(chunks)} spec chunks...")
+    vectors = ProductEmbedder(model_name).encode_with_cache([text for _, _, text in chunks]).astype("float32")
+    faiss.normalize_L2(vectors)
+    return ChunkMap.build(chunks, vectors)
 
-    print(f"🧠 Creating FAISS index (dimension={dim})")
 
-    index = faiss.IndexFlatIP(dim)  # Inner product (cosine similarity with normalized vectors)
+def default_nlist(n_vectors):
+    """~4·sqrt(n) lists, keeping ≥39 training points per centroid."""
+    return int(max(1, min(4 * np.sqrt(n_vectors), n_vectors // 39)))
 
-    # Normalize to use cosine similarity
-    faiss.normalize_L2(embeddings)
 
-    index.add(embeddings)
+def create_index(dim, n_vectors, index_type=FAISS_INDEX_TYPE):
+    """Create an empty inner-product index plus the query-time params to persist with it."""
+    if index_type == "flat":
+        return faiss.IndexFlatIP(dim), {}
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index, {"efSearch": HNSW_EF_SEARCH}
+
+    if index_type == "ivf":
+        nlist = IVF_NLIST or default_nlist(n_vectors)
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        return index, {"nprobe": min(IVF_NPROBE, nlist)}
+
+    # Compressed codes: 1 byte per dimension (4x) / PQ_M * PQ_NBITS bits per vector
+    if index_type == "sq8":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT), {}
+
+    if index_type == "pq":
+        if dim % PQ_M:
+            raise ValueError(f"❌ PQ_M={PQ_M} must divide the embedding dimension {dim}")
+        return faiss.IndexPQ(dim, PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT), {}
+
+    raise ValueError(f"❌ Unknown index type '{index_type}' (expected one of {INDEX_TYPES})")
+
+
+def normalized_rows(embeddings, rows):
+    """Float32 copy of the selected rows, L2-normalized (cosine similarity under inner product)."""
+    vectors = np.array(embeddings[rows], dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_faiss_index(embeddings, index_type=FAISS_INDEX_TYPE, ids=None):
+    """
+    Build from an in-memory or memory-mapped matrix without modifying or
+    copying it whole: only the training sample and one chunk of rows are
+    materialized at a time.
+    """
+    n, dim = embeddings.shape
+
+    print(f"🧠 Creating FAISS index (type={index_type}, dimension={dim})")
+
+    # Inner product (cosine similarity with normalized vectors)
+    base, search_params = create_index(dim, n, index_type)
+
+    # Stable int64 id per product so refreshes can update/remove in place
+    index = faiss.IndexIDMap2(base)
+    ids = np.arange(n, dtype="int64") if ids is None else np.asarray(ids, dtype="int64")
+
+    if not index.is_trained:
+        rows = slice(None) if n <= TRAIN_SAMPLE_ROWS else np.sort(np.random.default_rng(0).choice(n, TRAIN_SAMPLE_ROWS, replace=False))
+        sample = normalized_rows(embeddings, rows)
+        print(f"🏋️ Training {index_type} index on {len(sample)} vectors...")
+        index.train(sample)
+        del sample
+
+    for start in range(0, n, ADD_CHUNK_ROWS):
+        end = min(start + ADD_CHUNK_ROWS, n)
+        index.add_with_ids(normalized_rows(embeddings, slice(start, end)), ids[start:end])
 
     print(f"✅ Added {index.ntotal} vectors to the FAISS index")
-    return index
+    return index, search_params
 
 
 def save_index(index):
-    faiss.write_index(index, str(INDEX_FILE))
+    # Temp file + rename: a reader opening the legacy index never sees a partial write
+    faiss.write_index(index, str(INDEX_FILE) + ".tmp")
+    os.replace(str(INDEX_FILE) + ".tmp", INDEX_FILE)
     print(f"💾 FAISS index saved → {INDEX_FILE}")
 
 
-def main():
+def main(index_type=FAISS_INDEX_TYPE, rerank_factor=RERANK_FACTOR, languages=SEARCH_LANGUAGES, chunks=True,
+         collapse_variants=COLLAPSE_VARIANTS):
     print("🚀 Building FAISS index...")
-    
+
     embeddings = load_embeddings()
     metadata = load_metadata()
-    
-    index = build_faiss_index(embeddings)
+
+    products = load_products()
+    if len(products) != len(metadata):
+        raise ValueError(f"❌ {PRODUCTS_FILE} has {len(products)} rows but metadata has {len(metadata)}; re-run embed-products")
+    ids = np.arange(len(metadata), dtype="int64")
+
+    # Collapsed: index one vector per variant group; metadata, SKUs and attributes keep every product
+    variants = None
+    if collapse_variants:
+        variants = VariantTable.build(variant_groups(products, ids, [build_product_text(p) for p in products]))
+    vector_ids = variants.rep_ids if variants is not None else ids
+
+    index, search_params = build_faiss_index(embeddings[vector_ids] if variants is not None else embeddings, index_type, ids=vector_ids)
     save_index(index)
+    # Id-keyed metadata for the standalone index (the bundle below carries its own table)
+    write_product_store(metadata, ids)
+    if variants is not None:
+        print(f"🧬 Collapsed {len(ids)} products into {len(variants)} vectors ({len(variants.member_ids)} variants behind them)")
+
+    # BM25 covers every product, variants included; a hit counts for its group at query time
+    lexical = build_lexical_index(products, ids)
+    sku_index = SkuIndex.build([m["sku"] for m in metadata], ids, [p.get("parent_sku") for p in products])
+    attributes = AttributeStore.build(products, ids)
+
+    # Spec chunks share the index with the products (the legacy index above stays product-only);
+    # quantizers are trained on product vectors only
+    chunk_map = build_chunk_map(products, ids, variants=variants) if chunks else None
+    if chunk_map is not None:
+        index.add_with_ids(chunk_map.vectors, chunk_map.ids)
+
+    write_bundle(index, metadata, lexical=lexical, sku_index=sku_index, attributes=attributes, chunks=chunk_map,
+                 variants=variants, vectors=VectorSegments(EMBED_FILE), extra_manifest={
+        "language": PRIMARY_LANGUAGE,
+        "index_type": index_type,
+        "search_params": search_params,
+        "rerank_factor": rerank_factor,
+        "next_id": len(metadata),
+        "removed_since_compaction": 0,
+    })
+
+    for language in languages:
+        if language != PRIMARY_LANGUAGE:
+            build_language_bundle(language, products, index_type)
 
     print("🎉 FAISS index creation complete!")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build the FAISS index and search bundle")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=FAISS_INDEX_TYPE)
+    parser.add_argument("--rerank-factor", type=int, default=RERANK_FACTOR,
+                        help="Re-rank top_k * factor candidates with exact float vectors (0 = off)")
+    parser.add_argument("--languages", default=",".join(SEARCH_LANGUAGES),
+                        help="Comma-separated languages; non-catalog languages get their own bundle from the PDF specs")
+    parser.add_argument("--no-chunks", action="store_true", help="Don't index PDF spec chunks next to the products")
+    parser.add_argument("--collapse-variants", action="store_true", default=COLLAPSE_VARIANTS,
+                        help="Index one vector per configurable product and resolve its variants after retrieval")
+    args = parser.parse_args()
+    main(
+        index_type=args.index_type,
+        rerank_factor=args.rerank_factor,
+        languages=[lang for lang in args.languages.split(",") if lang],
+        chunks=not args.no_chunks,
+        collapse_variants=args.collapse_variants,
+    )
@@ -1,101 +1,292 @@
+"""
+Search quality evaluation over a labelled query file.
+
+    python -m src.search.evaluate_search [--queries data/eval/golden_queries.jsonl] [--output report.json]
+
+Queries are encoded in one batch and searched with one batched FAISS call per
+bundle (each language's queries go to its own bundle, as in serving); the
+metrics are numpy operations over the (queries, k) relevance matrix, so
+thousands of queries evaluate in seconds and the run can gate an index
+rebuild (--min-ndcg exits non-zero below the threshold).
+
+Reported overall and sliced by query language and type (sku / spec / text):
+precision@k and recall@k for k in K_VALUES, MRR and nDCG@k.
+"""
+
 import json
+import sys
+import time
+import argparse
 import faiss
 import numpy as np
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
+
+from src.core.config import EMBEDDING_MODEL, LANGUAGE_EMBEDDING_MODEL, RERANKER_MODEL, SEARCH_LANGUAGES
+from src.core.model_registry import get_encoder
+from src.embeddings.ranker import CrossEncoderReranker
+from src.search.benchmark import GOLDEN_FILE, load_golden
+from src.search.build_faiss_index import build_faiss_index, load_embeddings
+from src.search.index_bundle import (
+    BUNDLE_DIR, PRIMARY_LANGUAGE, bundle_exists, language_bundle_dir, load_bundle, load_legacy_metadata, lookup_many,
+    read_manifest,
+)
+from src.search.language_router import detect_language
+from src.search.semantic_search import CHUNK_OVERFETCH, exact_rerank
+from src.search.sku_index import looks_like_sku, normalize_sku
+from src.search.spec_chunks import aggregate_hit_matrix
+from src.search.tune_index import exact_neighbours, recall_at_k, tuning_queries
+
+# Used for --rerank when RERANKER_MODEL is not configured
+DEFAULT_RERANKER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+K_VALUES = (1, 5, 10)
+
+# Used when the labelled query file is missing
+FALLBACK_QUERIES = [
+    {"query": "550 liter chest freezer", "relevant": ["DZ2907", "DZ0305", "DZ0301", "DZ2807"]},
+    {"query": "glass door upright cooler", "relevant": ["DZ9308-0040L-E4", "DZ9308-0044R-E4"]},
+    {"query": "commercial ice machine", "relevant": ["DZ4501-0050", "DZ4501-0060"]},
+    {"query": "double door refrigerator", "relevant": ["DZ4501-0070TR", "DZ4501-0070EC"]},
+    {"query": "undercounter freezer", "relevant": ["DS4180-080-035-0185U", "DS4180-080-035-0060U"]},
+]
 
 # Paths
 EMBED_DIR = Path("data/embeddings")
 INDEX_FILE = EMBED_DIR / "faiss_index.bin"
-META_FILE = EMBED_DIR / "product_metadata.json"
-
-
-def load_index_and_metadata():
-    index = faiss.read_index(str(INDEX_FILE))
-    with open(META_FILE, "r") as f:
-        metadata = json.load(f)
-    return index, metadata
-
-
-def run_faiss_search(index, query_vec, top_k=5):
-    query_vec = np.asarray([query_vec]).astype("float32")
-    faiss.normalize_L2(query_vec)
-    distances, indices = index.search(query_vec, top_k)
-    return indices[0]
-
-
-def precision_at_k(retrieved_skus, relevant_skus, k=5):
-    retrieved_top_k = set(retrieved_skus[:k])
-    relevant_set = set(relevant_skus)
-    correct = len(retrieved_top_k.intersection(relevant_set))
-    return correct / k
-
-
-def evaluate_search():
-    print("📘 Loading FAISS index and metadata...")
-    index, metadata = load_index_and_metadata()
-
-    # Create SKU lookup by index
-    sku_lookup = [item["sku"] for item in metadata]
-
-    print("🧠 Loading embedding model...")
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
-    # -----------------------------
-    # TEST QUERY SET (edit as needed)
-    # -----------------------------
-    test_queries = [
-        {
-            "query": "550 liter chest freezer",
-            "relevant": ['DZ2907', 'DZ0305', 'DZ0301', 'DZ2807']
-        },
-        {
-            "query": "glass door upright cooler",
-            "relevant": ["DZ9308-0040L-E4", "DZ9308-0044R-E4"]
-        },
-        {
-            "query": "commercial ice machine",
-            "relevant": ["DZ4501-0050", "DZ4501-0060"]
-        },
-        {
-            "query": "double door refrigerator",
-            "relevant": ["DZ4501-0070TR", "DZ4501-0070EC"]
-        },
-        {
-            "query": "undercounter freezer",
-            "relevant": ["DS4180-080-035-0185U", "DS4180-080-035-0060U"]
-        }
-    ]
 
-    print(f"📝 Evaluating {len(test_queries)} queries...")
-    results = []
-    
-    for item in test_queries:
-        query = item["query"]
-        relevant = item["relevant"]
 
-        print(f"\n🔎 Query: {query}")
+def load_index_and_metadata(bundle_dir=BUNDLE_DIR):
+    """(index, metadata, spec chunks, variant table); the last two are None where the bundle has none."""
+    if bundle_exists(bundle_dir):
+        bundle = load_bundle(bundle_dir)
+        return bundle.index, bundle.metadata, bundle.chunks, bundle.variants
+
+    return faiss.read_index(str(INDEX_FILE)), load_legacy_metadata(), None, None
+
+
+def load_queries(path=GOLDEN_FILE):
+    """Labelled queries; "type" and "language" are inferred where the file leaves them out."""
+    items = load_golden(path)
+    if not items:
+        print(f"⚠️ Falling back to the {len(FALLBACK_QUERIES)} built-in queries")
+        items = [dict(item) for item in FALLBACK_QUERIES]
+    for item in items:
+        item.setdefault("type", "sku" if looks_like_sku(item["query"]) else "text")
+        item.setdefault("language", detect_language(item["query"], SEARCH_LANGUAGES))
+    return items
+
+
+def sku_codes(metadata, vocab):
+    """(FAISS ids ascending, code of each id's normalized SKU); `vocab` maps normalized SKU → code across bundles."""
+    if hasattr(metadata, "ids"):
+        ids = np.asarray(metadata.ids, dtype="int64")
+    else:
+        ids = np.arange(len(metadata), dtype="int64")
+    codes = np.array([vocab.setdefault(normalize_sku(row.get("sku")), len(vocab)) for row in metadata], dtype="int64")
+    return ids, codes
+
+
+def collapse_codes(vocab, ids, codes, variants):
+    """Give every variant its group's code, so a hit on a collapsed group counts for the variants behind it."""
+    reps = variants.representatives(ids)
+    group_codes = codes[np.searchsorted(ids, np.where(reps == -1, ids, reps))]
+    sku_of = {code: sku for sku, code in vocab.items()}
+    for code, group_code in zip(codes.tolist(), group_codes.tolist()):
+        vocab[sku_of[code]] = group_code
+    return group_codes
+
+
+def codes_for(product_ids, ids, codes):
+    """SKU codes of a product id matrix; -1 where the slot is empty."""
+    rows = np.clip(np.searchsorted(ids, product_ids), 0, len(ids) - 1)
+    return np.where((product_ids != -1) & (ids[rows] == product_ids), codes[rows], -1)
+
+
+def batch_search(index, chunks, model, texts, k):
+    """One encode call and one FAISS call for all `texts` → (queries, k) product ids."""
+    vectors = np.asarray(model.encode(texts, convert_to_tensor=False), dtype="float32").reshape(len(texts), -1)
+    faiss.normalize_L2(vectors)
+    fetch = k + (min(len(chunks), k * CHUNK_OVERFETCH) if chunks is not None else 0)
+    _, ids = index.search(vectors, fetch)
+    # Spec-chunk hits count for the product they belong to
+    return aggregate_hit_matrix(ids, chunks, k)
+
+
+def relevance_matrix(retrieved, relevant, vocab):
+    """Boolean (queries, k) matrix of relevant hits, plus the number of relevant SKUs per query."""
+    relevant = [{normalize_sku(sku) for sku in skus} for skus in relevant]
+    # -2 never matches: it pads short rows and stands in for SKUs missing from the catalog
+    labels = np.full((len(relevant), max(map(len, relevant), default=1)), -2, dtype="int64")
+    for i, skus in enumerate(relevant):
+        labels[i, :len(skus)] = [vocab.get(sku, -2) for sku in skus]
+    hits = (retrieved[:, :, None] == labels[:, None, :]).any(axis=2)
+    return hits, np.array([len(skus) for skus in relevant])
 
-        # Generate embedding
-        vec = model.encode(query)
 
-        # Run FAISS search
-        idxs = run_faiss_search(index, vec, top_k=5)
-        retrieved_skus = [sku_lookup[i] for i in idxs]
+def ranking_metrics(hits, n_relevant, k_values=K_VALUES):
+    """Per-query precision@k, recall@k, nDCG@k and reciprocal rank columns."""
+    k_max = hits.shape[1]
+    discount = 1 / np.log2(np.arange(2, k_max + 2))
+    ideal = np.cumsum(discount)
 
-        print("   Retrieved:", retrieved_skus)
-        print("   Relevant: ", relevant)
+    found = hits.any(axis=1)
+    metrics = {"mrr": np.where(found, 1 / (hits.argmax(axis=1) + 1), 0.0)}
+    for k in k_values:
+        if k > k_max:
+            continue
+        top = hits[:, :k]
+        metrics[f"precision@{k}"] = top.sum(axis=1) / k
+        metrics[f"recall@{k}"] = top.sum(axis=1) / np.maximum(n_relevant, 1)
+        metrics[f"ndcg@{k}"] = (top * discount[:k]).sum(axis=1) / ideal[np.clip(np.minimum(n_relevant, k) - 1, 0, None)]
+    return metrics
 
-        # Calculate precision@5
-        score = precision_at_k(retrieved_skus, relevant, k=5)
-        results.append(score)
-        print(f"   🎯 Precision@5: {score:.2f}")
 
-    avg_precision = sum(results) / len(results)
-    print("\n=====================================")
-    print(f"⭐ Average Precision@5: {avg_precision:.2f}")
-    print("=====================================")
+def summarize(metrics, mask):
+    summary = {name: round(float(values[mask].mean()), 4) for name, values in metrics.items()}
+    summary["queries"] = int(mask.sum())
+    return summary
+
+
+def rerank_rows(reranker, queries, product_ids, metadata, vocab, k):
+    """Cross-encoder order of each row's candidates, as SKU codes cut to k."""
+    codes = np.full((len(queries), k), -1, dtype="int64")
+    for i, query in enumerate(queries):
+        retrieved = lookup_many(metadata, product_ids[i][product_ids[i] != -1])
+        ranked = reranker.rerank(query, retrieved)[:k]
+        codes[i, :len(ranked)] = [vocab.get(normalize_sku(row["sku"]), -1) for row in ranked]
+    return codes
+
+
+def evaluate_search(query_file=GOLDEN_FILE, rerank=False, k_values=K_VALUES):
+    items = load_queries(query_file)
+    k = max(k_values)
+    languages = np.array([item["language"] for item in items])
+    types = np.array([item["type"] for item in items])
+
+    reranker = None
+    if rerank:
+        print("🎯 Loading cross-encoder re-ranker...")
+        # No budget here: we want the quality of the full second stage
+        reranker = CrossEncoderReranker(RERANKER_MODEL or DEFAULT_RERANKER, budget_ms=float("inf"))
+
+    # Each language is served by its own bundle when one exists, else by the primary one
+    targets = {PRIMARY_LANGUAGE: (BUNDLE_DIR, EMBEDDING_MODEL)}
+    for language in set(languages.tolist()) - {PRIMARY_LANGUAGE}:
+        if bundle_exists(language_bundle_dir(language)):
+            model_name = read_manifest(language_bundle_dir(language)).get("model", LANGUAGE_EMBEDDING_MODEL)
+            targets[language] = (language_bundle_dir(language), model_name)
+
+    print(f"📝 Evaluating {len(items)} queries (k={k})...")
+    started = time.perf_counter()
+    served_by = np.where(np.isin(languages, list(targets)), languages, PRIMARY_LANGUAGE)
+    vocab = {}
+    retrieved = np.full((len(items), k), -1, dtype="int64")
+    for language, (bundle_dir, model_name) in targets.items():
+        rows = np.flatnonzero(served_by == language)
+        if not len(rows):
+            continue
+
+        index, metadata, chunks, variants = load_index_and_metadata(bundle_dir)
+        model = get_encoder(model_name)
+        texts = [items[i]["query"] for i in rows]
+        # English cross-encoders don't transfer; language bundles skip the re-rank stage, as in serving
+        use_reranker = reranker is not None and language == PRIMARY_LANGUAGE
+        depth = max(k, reranker.max_candidates) if use_reranker else k
+
+        product_ids = batch_search(index, chunks, model, texts, depth)
+        ids, codes = sku_codes(metadata, vocab)
+        if variants is not None:
+            codes = collapse_codes(vocab, ids, codes, variants)
+        if use_reranker:
+            retrieved[rows] = rerank_rows(reranker, texts, product_ids, metadata, vocab, k)
+        else:
+            retrieved[rows] = codes_for(product_ids[:, :k], ids, codes)
+        print(f"   {language}: {len(rows)} queries → {bundle_dir}")
+    search_sec = time.perf_counter() - started
+
+    started = time.perf_counter()
+    hits, n_relevant = relevance_matrix(retrieved, [item["relevant"] for item in items], vocab)
+    metrics = ranking_metrics(hits, n_relevant, k_values)
+    report = {
+        "overall": summarize(metrics, np.ones(len(items), dtype=bool)),
+        "language": {language: summarize(metrics, languages == language) for language in sorted(set(languages))},
+        "type": {query_type: summarize(metrics, types == query_type) for query_type in sorted(set(types))},
+        "k": k,
+        "reranked": reranker is not None,
+    }
+    metrics_sec = time.perf_counter() - started
+
+    columns = [name for name in report["overall"] if name != "queries"]
+    print("\n" + f"{'slice':<14} {'n':>5} " + " ".join(f"{name:>12}" for name in columns))
+    slices = [("overall", report["overall"])]
+    slices += [(f"lang={name}", summary) for name, summary in report["language"].items()]
+    slices += [(f"type={name}", summary) for name, summary in report["type"].items()]
+    for name, summary in slices:
+        print(f"{name:<14} {summary['queries']:>5} " + " ".join(f"{summary[column]:>12.4f}" for column in columns))
+    print(f"⏱️ encode + search {search_sec:.2f}s, metrics {metrics_sec * 1000:.1f}ms")
+    return report
+
+
+def compression_report(index_types=("flat", "sq8", "pq"), k=10, n_queries=500, rerank_factor=4):
+    """Bytes per vector and recall@k (with and without exact re-rank) of each index type vs exact search."""
+    embeddings = load_embeddings(mmap=False)
+    faiss.normalize_L2(embeddings)
+    queries = tuning_queries(load_legacy_metadata(), n_queries)
+    exact_ids = exact_neighbours(embeddings, queries, k)
+
+    print(f"\n📐 Compression report ({len(embeddings)} vectors, {len(queries)} queries, k={k})")
+    print(f"{'index':>6} {'bytes/vec':>10} {'ratio':>7} {'recall@' + str(k):>10} {'Δ':>8} {'reranked':>9} {'Δ':>8}")
+
+    float_bytes = embeddings.shape[1] * 4
+    report = []
+    for index_type in index_types:
+        index, _ = build_faiss_index(embeddings, index_type)
+        bytes_per_vec = len(faiss.serialize_index(index)) / index.ntotal
+
+        _, ids = index.search(queries, k)
+        recall = recall_at_k(ids, exact_ids, k)
+
+        _, candidates = index.search(queries, k * rerank_factor)
+        reranked = np.vstack([exact_rerank(queries[i:i + 1], candidates[i], embeddings, k)[1] for i in range(len(queries))])
+        recall_reranked = recall_at_k(reranked, exact_ids, k)
+
+        row = {
+            "index_type": index_type,
+            "bytes_per_vector": bytes_per_vec,
+            "compression": float_bytes / bytes_per_vec,
+            "recall": recall,
+            "recall_delta": recall - 1.0,
+            "recall_reranked": recall_reranked,
+            "recall_reranked_delta": recall_reranked - 1.0,
+        }
+        report.append(row)
+        print(f"{index_type:>6} {bytes_per_vec:>10.1f} {row['compression']:>6.1f}x {recall:>10.4f} "
+              f"{row['recall_delta']:>+8.4f} {recall_reranked:>9.4f} {row['recall_reranked_delta']:>+8.4f}")
+
+    return report
 
 
 if __name__ == "__main__":
-    evaluate_search()
+    parser = argparse.ArgumentParser(description="Evaluate search quality")
+    parser.add_argument("--queries", default=str(GOLDEN_FILE), help="JSONL labelled queries")
+    parser.add_argument("--output", default=None, help="Write the metrics report as JSON")
+    parser.add_argument("--min-ndcg", type=float, default=None,
+                        help=f"Exit non-zero when overall nDCG@{max(K_VALUES)} falls below this")
+    parser.add_argument("--compression", action="store_true", help="Report bytes/vector and recall delta of sq8/pq indexes")
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--rerank", action="store_true", help="Re-rank the FAISS candidates with the cross-encoder")
+    args = parser.parse_args()
+
+    if args.compression:
+        compression_report(rerank_factor=args.rerank_factor)
+    else:
+        report = evaluate_search(args.queries, rerank=args.rerank)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            print(f"💾 Report written → {args.output}")
+
+        ndcg = report["overall"][f"ndcg@{max(K_VALUES)}"]
+        if args.min_ndcg is not None and ndcg < args.min_ndcg:
+            print(f"❌ nDCG@{max(K_VALUES)} {ndcg:.4f} is below the {args.min_ndcg} gate")
+            sys.exit(1)
@@ -1,94 +1,220 @@
-import json
 import faiss
 import numpy as np
 from pathlib import Path
-from datetime import datetime
-from sentence_transformers import SentenceTransformer
+
+from src.core.config import VECTOR_STORE
+from src.embeddings.embedder import build_product_text, content_hash
+from src.core.model_registry import get_encoder
+from src.search.build_faiss_index import build_lexical_index, create_index, load_products
+from src.search.attribute_store import AttributeStore
+from src.search.index_bundle import load_bundle, write_bundle
+from src.search.sku_index import SkuIndex
+from src.search.vector_segments import VectorSegments
 
 # File locations
 EMBED_DIR = Path("data/embeddings")
-INDEX_FILE = EMBED_DIR / "faiss_index.bin"
-META_FILE = EMBED_DIR / "product_metadata.json"
-
-# Latest processed cleaned data
-LATEST_CLEAN = Path("data/processed") / "clean_products.json"
-
+EMBED_FILE = EMBED_DIR / "product_embeddings.npy"
 
-def load_latest_products():
-    if not LATEST_CLEAN.exists():
-        raise FileNotFoundError(f"❌ Clean products not found at: {LATEST_CLEAN}")
-
-    with open(LATEST_CLEAN, "r") as f:
-        return json.load(f)
+# Rebuild (and retrain) the index once this share of it has been removed or replaced
+COMPACT_RATIO = 0.2
 
 
 def build_text(product):
-    """Convert product fields into a search text block."""
-    parts = [
-        product.get("name", ""),
-        product.get("description", ""),
-        product.get("features", "")
-    ]
-    return ". ".join([p for p in parts if p]).strip()
+    """Same text as ProductEmbedder, so content hashes match the initial build."""
+    return build_product_text(product)
+
+
+def catalog_keys(skus):
+    """(SKU, occurrence) per row: the catalog repeats variants, and the build gives every repeat its own id."""
+    seen = {}
+    keys = []
+    for sku in skus:
+        n = seen.get(sku, 0)
+        seen[sku] = n + 1
+        keys.append((sku, n))
+    return keys
+
+
+def diff_catalog(old_rows, products):
+    """
+    Split the catalog into new, changed, deleted and unchanged products by SKU
+    and content hash. A repeated SKU matches its old rows in order (ids
+    ascending, like the build numbered the catalog rows).
+    Returns (new, changed, deleted, unchanged); unchanged is [(product, id)].
+    """
+    old_rows = sorted(old_rows, key=lambda row: row["id"])
+    old_by_key = dict(zip(catalog_keys(row["sku"] for row in old_rows), old_rows))
+
+    new, changed, unchanged = [], [], []
+    latest = set()
+    for key, p in zip(catalog_keys(p["sku"] for p in products), products):
+        latest.add(key)
+        text = build_text(p)
+        digest = content_hash(text)
+        row = old_by_key.get(key)
+        if row is None:
+            new.append((p, text, digest))
+        elif row.get("content_hash") != digest:
+            changed.append((p, text, digest, row["id"]))
+        else:
+            unchanged.append((p, row["id"]))
+
+    deleted = [row for key, row in old_by_key.items() if key not in latest]
+    return new, changed, deleted, unchanged
+
+
+def compact_index(manifest, live_ids, vectors, chunks=None):
+    """Rebuild the index from the stored vectors of the live ids (retrains IVF/PQ codebooks) plus the spec chunks."""
+    vectors = vectors[live_ids]
+    faiss.normalize_L2(vectors)
+
+    base, _ = create_index(vectors.shape[1], len(vectors), manifest.get("index_type", "flat"))
+    index = faiss.IndexIDMap2(base)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, live_ids)
+    if chunks is not None and len(chunks):
+        index.add_with_ids(chunks.vectors, chunks.ids)
+    return index
+
+
+def sync_qdrant(deleted_ids, upsert_ids, vectors, payloads):
+    """Apply the delta to the Qdrant collection (it overwrites points in place); raises when it can't."""
+    from src.embeddings.vector_store import open_vector_store
+
+    try:
+        store = open_vector_store("qdrant")
+    except RuntimeError as e:
+        # An embedded collection is locked by the process that has it open (the API)
+        raise RuntimeError(
+            f"❌ Qdrant sync failed, nothing was published ({e}). Stop the API or serve Qdrant via QDRANT_URL, then refresh again"
+        ) from e
+    try:
+        store.delete(deleted_ids)
+        if vectors is not None:
+            store.upsert(upsert_ids, vectors, payloads)
+    finally:
+        store.close()
+    print(f"🗄️ Qdrant synced: {len(upsert_ids) if vectors is not None else 0} upserted, {len(deleted_ids)} deleted")
 
 
 def refresh_faiss_index(model_name="sentence-transformers/all-MiniLM-L6-v2"):
-    print("🔄 Loading existing FAISS index and metadata...")
-    index = faiss.read_index(str(INDEX_FILE))
+    print("🔄 Loading existing search bundle...")
+    bundle = load_bundle(mmap=False)
+    index, manifest = bundle.index, bundle.manifest
 
-    with open(META_FILE, "r") as f:
-        old_meta = json.load(f)
+    if not isinstance(index, faiss.IndexIDMap2):
+        raise RuntimeError("❌ Index has no stable ids — rebuild it with build_faiss_index first")
+    if bundle.variants is not None:
+        # A changed variant can move its group's representative; regroup from scratch
+        raise RuntimeError("❌ Collapsed-variant bundles are rebuilt, not refreshed — run build_faiss_index --collapse-variants")
 
-    old_skus = {item["sku"] for item in old_meta}
-    print(f"📘 Existing metadata: {len(old_skus)} SKUs")
+    # Bundles from before the vectors were linked in: start from the embedder's file
+    vectors = bundle.vectors if bundle.vectors is not None else VectorSegments(EMBED_FILE)
 
-    print("📦 Loading latest cleaned products...")
-    products = load_latest_products()
+    old_rows = list(bundle.metadata)
+    print(f"📘 Existing metadata: {len(old_rows)} SKUs")
 
-    # Identify NEW or UPDATED products
-    new_products = []
-    for p in products:
-        if p["sku"] not in old_skus:
-            new_products.append(p)
+    print("📦 Loading latest cleaned products...")
+    products = load_products()
 
-    print(f"🆕 Found {len(new_products)} new products to index")
+    new, changed, deleted, unchanged = diff_catalog(old_rows, products)
+    print(f"🆕 {len(new)} new · ✏️ {len(changed)} changed · 🗑️ {len(deleted)} deleted")
 
-    if not new_products:
-        print("✨ No new products. Index is already up-to-date.")
+    if not (new or changed or deleted):
+        print("✨ No changes. Index is already up-to-date.")
         return
 
-    # Load the embedding model
-    print("🧠 Loading embedding model for new items...")
-    model = SentenceTransformer(model_name)
-
-    # Build texts and compute embeddings
-    texts = [build_text(p) for p in new_products]
-    print("🔢 Generating embeddings for new items...")
-    new_vecs = model.encode(texts, convert_to_tensor=False)
-    new_vecs = np.asarray(new_vecs).astype("float32")
-
-    # Normalize vectors (cosine similarity)
-    faiss.normalize_L2(new_vecs)
-
-    print(f"➕ Adding {len(new_vecs)} vectors to the index...")
-    index.add(new_vecs)
-
-    # Update metadata
-    print("📘 Updating metadata file...")
-    for p in new_products:
-        old_meta.append({
-            "sku": p["sku"],
-            "name": p["name"]
-        })
-
-    # Save updated FAISS index
-    faiss.write_index(index, str(INDEX_FILE))
-    print(f"💾 Updated FAISS index saved → {INDEX_FILE}")
-
-    # Save updated metadata
-    with open(META_FILE, "w") as f:
-        json.dump(old_meta, f, indent=2)
-    print(f"💾 Metadata updated → {META_FILE}")
+    if "next_id" in manifest:
+        next_id = manifest["next_id"]
+    else:
+        # Bundles from before next_id was recorded: continue after the highest id (0 for an empty catalog)
+        next_id = int(bundle.metadata.ids.max()) + 1 if len(bundle.metadata) else 0
+    new_ids = np.arange(next_id, next_id + len(new), dtype="int64")
+    changed_ids = np.array([item[3] for item in changed], dtype="int64")
+    deleted_ids = np.array([row["id"] for row in deleted], dtype="int64")
+
+    # Embed only the delta
+    upsert_ids = np.concatenate([changed_ids, new_ids])
+    if len(upsert_ids):
+        print("🧠 Loading embedding model for changed items...")
+        model = get_encoder(model_name)
+
+        texts = [item[1] for item in changed] + [item[1] for item in new]
+        print(f"🔢 Generating embeddings for {len(texts)} items...")
+        vecs = np.asarray(model.encode(texts, convert_to_tensor=False)).astype("float32")
+        # Only the delta is written: a segment of the new bundle version
+        vectors = vectors.with_rows(upsert_ids, vecs)
+        faiss.normalize_L2(vecs)
+    else:
+        vecs = None
+
+    # Metadata rows, keyed and ordered by stable id
+    rows = {row["id"]: row for row in old_rows}
+    for row in deleted:
+        del rows[row["id"]]
+    for (p, _, digest, faiss_id) in changed:
+        rows[faiss_id] = {"id": faiss_id, "product_id": p.get("product_id", p["sku"]), "sku": p["sku"], "name": p["name"], "content_hash": digest}
+    for (p, _, digest), faiss_id in zip(new, new_ids):
+        rows[int(faiss_id)] = {"id": int(faiss_id), "product_id": p.get("product_id", p["sku"]), "sku": p["sku"], "name": p["name"], "content_hash": digest}
+    live_ids = np.array(sorted(rows), dtype="int64")
+
+    # Spec chunks of deleted products go with them; changed products keep theirs (they come from the PDFs)
+    chunks = bundle.chunks
+    dropped_chunk_ids = np.empty(0, dtype="int64")
+    if chunks is not None:
+        orphaned = np.isin(chunks.product_ids, deleted_ids)
+        dropped_chunk_ids = chunks.ids[orphaned]
+        chunks = chunks.subset(~orphaned)
+
+    removed = manifest.get("removed_since_compaction", 0) + len(changed_ids) + len(deleted_ids)
+    stale_ids = np.concatenate([changed_ids, deleted_ids, dropped_chunk_ids])
+    compact = removed > COMPACT_RATIO * max(len(live_ids), 1)
+
+    if not compact and len(stale_ids):
+        try:
+            print(f"➖ Removing {len(stale_ids)} stale vectors...")
+            index.remove_ids(faiss.IDSelectorBatch(stale_ids))
+        except RuntimeError:
+            # e.g. HNSW cannot delete in place
+            print("⚠️ Index type does not support removal; compacting instead")
+            compact = True
+
+    if compact:
+        print(f"🧹 Compacting index ({removed} vectors replaced since last compaction)...")
+        index = compact_index(manifest, live_ids, vectors, chunks)
+        removed = 0
+    elif vecs is not None:
+        print(f"➕ Adding {len(vecs)} vectors to the index...")
+        index.add_with_ids(vecs, upsert_ids)
+
+    # Lexical index is rebuilt from the catalog (no model involved)
+    product_of = {faiss_id: p for p, faiss_id in unchanged}
+    product_of.update((faiss_id, p) for p, _, _, faiss_id in changed)
+    product_of.update(zip(new_ids.tolist(), (p for p, _, _ in new)))
+    live_products = [product_of[i] for i in live_ids.tolist()]
+    lexical = build_lexical_index(live_products, live_ids)
+    sku_index = SkuIndex.build([p["sku"] for p in live_products], live_ids, [p.get("parent_sku") for p in live_products])
+    attributes = AttributeStore.build(live_products, live_ids)
+
+    # Keep the index type and tuned query-time params of the previous build
+    extra_manifest = {key: manifest[key] for key in ("index_type", "search_params", "rerank_factor") if key in manifest}
+    extra_manifest.update({
+        "next_id": int(next_id + len(new)),
+        "removed_since_compaction": removed,
+    })
+
+    # Sync Qdrant before publishing: a bundle must never go live without its points
+    if VECTOR_STORE == "qdrant":
+        from src.embeddings.vector_store import product_payload
+        payloads = [product_payload(product_of[int(i)]) for i in upsert_ids] if vecs is not None else None
+        sync_qdrant(np.concatenate([deleted_ids, dropped_chunk_ids]), upsert_ids, vecs, payloads)
+
+    write_bundle(
+        index, [rows[i] for i in live_ids], ids=live_ids,
+        lexical=lexical, sku_index=sku_index, attributes=attributes, chunks=chunks,
+        vectors=vectors, extra_manifest=extra_manifest,
+    )
 
     print("🎉 Index refresh complete!")
 
@@ -0,0 +1,154 @@
+"""
+Zero-downtime index hot-swap for the API process.
+
+Builds, refreshes and re-tunes publish a new bundle version by atomically
+repointing CURRENT (src/search/index_bundle.py). IndexReloader picks up a new
+version in two ways: it polls the bundles' manifests every INDEX_WATCH_INTERVAL
+seconds, and POST /admin/reload can trigger it directly. A reload then:
+
+    1. loads a complete SemanticSearcher in a worker thread; the old one keeps serving
+    2. warms it up: reads the bundle files into the page cache, re-opens the
+       language bundles the old searcher had open and runs INDEX_WARMUP_QUERIES
+       searches over catalog names
+    3. carries over the query-embedding and result caches (embeddings don't
+       depend on the index; result keys include the index version) and the
+       cross-encoder re-ranker with its score cache, so nothing is reloaded
+    4. swaps app.state.searcher with a single reference assignment
+
+The swap is RCU-style. Each request reads app.state.searcher once and uses
+that searcher until it finishes, so in-flight searches complete on the old
+version. The old version is freed once the last request holding it returns.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from pathlib import Path
+
+from src.core.config import EMBEDDING_MODEL, INDEX_WARMUP_QUERIES, INDEX_WATCH_INTERVAL, SEARCH_LANGUAGES
+from src.search.index_bundle import bundle_exists, language_bundle_dir, read_manifest
+from src.search.semantic_search import SemanticSearcher
+
+PREFAULT_BLOCK = 8 << 20
+
+
+def disk_versions(languages=SEARCH_LANGUAGES):
+    """{language: index version} of the bundles currently published on disk."""
+    versions = {}
+    for language in languages:
+        bundle_dir = language_bundle_dir(language)
+        if bundle_exists(bundle_dir):
+            manifest = read_manifest(bundle_dir)
+            versions[language] = manifest.get("index_version") or manifest["created_at"]
+    return versions
+
+
+def searcher_versions(searcher):
+    """{language: index version} a searcher was built from."""
+    if searcher.manifest is None:
+        return {}
+    manifests = {searcher.language: searcher.manifest, **searcher.language_manifests}
+    return {language: manifest.get("index_version") or manifest["created_at"] for language, manifest in manifests.items()}
+
+
+def prefault(bundle_path):
+    """Read a bundle's files once so the first queries after the swap don't page-fault on the mmaps."""
+    if bundle_path is None:
+        return
+    for path in sorted(Path(bundle_path).rglob("*")):
+        if path.is_file():
+            with open(path, "rb") as f:
+                while f.read(PREFAULT_BLOCK):
+                    pass
+
+
+def warm_up(searcher, n_queries=INDEX_WARMUP_QUERIES):
+    n_rows = len(searcher.metadata)
+    for row in range(0, n_rows, max(1, n_rows // max(n_queries, 1)))[:n_queries]:
+        searcher.search(searcher.metadata[row]["name"], top_k=10)
+
+
+class IndexReloader:
+    def __init__(self, state, model_name=EMBEDDING_MODEL, interval=INDEX_WATCH_INTERVAL,
+                 warmup_queries=INDEX_WARMUP_QUERIES):
+        self.state = state  # app.state; its .searcher is the published reference
+        self.model_name = model_name
+        self.interval = interval
+        self.warmup_queries = warmup_queries
+        self._lock = asyncio.Lock()
+        self._task = None
+        self.stats = {
+            "reloads": 0,
+            "failures": 0,
+            "last_reload_at": None,
+            "last_duration_sec": None,
+            "last_error": None,
+        }
+
+    def pending(self):
+        """True when a bundle on disk is newer than the one being served."""
+        return disk_versions() != searcher_versions(self.state.searcher)
+
+    def _load(self, old):
+        searcher = SemanticSearcher(self.model_name, store=old.store, reranker=old.reranker)
+        searcher.query_cache = old.query_cache
+        searcher.result_cache = old.result_cache
+
+        prefault(searcher.bundle_path)
+        for language in old.language_searchers:
+            if language in searcher.language_manifests:
+                prefault(searcher.language_searcher(language).bundle_path)
+        warm_up(searcher, self.warmup_queries)
+        return searcher
+
+    async def reload(self, force=False):
+        """Load, warm and swap in the published bundles; False when nothing changed or the load failed."""
+        async with self._lock:
+            old = self.state.searcher
+            if not force and not self.pending():
+                return False
+
+            print(f"🔁 Loading new index version (serving {old.index_version})...")
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            try:
+                searcher = await loop.run_in_executor(None, self._load, old)
+            except Exception as e:
+                # Keep serving the old version; the next poll retries
+                self.stats["failures"] += 1
+                self.stats["last_error"] = str(e)
+                print(f"❌ Index reload failed, still serving {old.index_version}: {e}")
+                return False
+
+            self.state.searcher = searcher
+            duration = time.perf_counter() - started
+            self.stats.update({
+                "reloads": self.stats["reloads"] + 1,
+                "last_reload_at": datetime.utcnow().isoformat(),
+                "last_duration_sec": round(duration, 3),
+                "last_error": None,
+            })
+            print(f"✅ Swapped in index {searcher.index_version} (loaded and warmed in {duration:.1f}s)")
+            return True
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if self.pending():
+                    await self.reload()
+            except Exception as e:
+                # e.g. a manifest caught mid-publish by an unversioned writer
+                print(f"⚠️ Index watch check failed: {e}")
+
+    def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self.watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
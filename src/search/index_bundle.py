@@ -0,0 +1,480 @@
+"""
+Search bundle: a versioned on-disk package holding the FAISS index, a compact
+binary metadata table and a manifest.
+
+Every build, refresh and re-tune writes a complete new version next to the
+live one and then atomically repoints CURRENT at it:
+
+    search_bundle/
+        CURRENT                      name of the live version (replaced with os.replace)
+        versions/<index_version>/    one immutable bundle directory per version
+
+A version directory is never modified once published, so a reader that
+resolved CURRENT keeps a consistent snapshot however long it runs, and a
+server can load the next version in the background (src/search/hot_reload.py).
+The newest KEEP_VERSIONS versions are kept; older ones are pruned, which is
+safe on POSIX even while a process still has their files mapped.
+
+Layout of a bundle (version) directory:
+
+    manifest.json   format version, counts, field names, file names
+    index.faiss     FAISS index (opened with mmap)
+    metadata.bin    binary metadata table (opened with mmap)
+    bm25/           optional lexical index (src/embeddings/ranker.py)
+    skus/           optional SKU / part-number index (src/search/sku_index.py)
+    attributes/     optional columnar attribute store for filters (src/search/attribute_store.py)
+    chunks/         optional PDF spec-chunk map (src/search/spec_chunks.py)
+    variants/       optional variant table of a collapsed index (src/search/variants.py)
+    vectors.npy     optional exact float vectors, row = FAISS id (src/search/vector_segments.py)
+    vectors.<n>/    rows re-embedded by refreshes since the build, newest last
+
+metadata.bin layout (little endian):
+
+    header   magic b"MAISMETA", uint32 version, uint32 n_fields, uint64 n_rows
+    ids      int64[n_rows]                   stable FAISS id of each row, ascending
+    offsets  uint64[n_rows * n_fields + 1]   byte offsets into the string heap
+    heap     utf-8 bytes of every field value, row major
+
+The optional parts are directories of plain .npy arrays (src/storage/array_dir.py).
+Nothing is parsed at load time: workers only map the files, and the OS page
+cache shares the pages between processes.
+"""
+
+import json
+import os
+import secrets
+import shutil
+import struct
+import faiss
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+
+from src.embeddings.ranker import BM25Index
+from src.search.attribute_store import AttributeStore
+from src.search.sku_index import SkuIndex
+from src.search.spec_chunks import ChunkMap
+from src.search.variants import VariantTable
+from src.search.vector_segments import VECTORS_NAME, VectorSegments
+from src.storage.array_dir import link_or_copy
+from src.storage.db_manager import PRODUCT_DB_FILE, ProductStore
+
+EMBEDDING_DIR = Path("data/embeddings")
+BUNDLE_DIR = EMBEDDING_DIR / "search_bundle"
+LEGACY_METADATA_FILE = EMBEDDING_DIR / "product_metadata.json"
+PRIMARY_LANGUAGE = "en"  # the catalog language; other languages get their own bundle next to it
+
+BUNDLE_FORMAT_VERSION = 2  # 2: parts as mmap-able .npy directories instead of .npz
+CURRENT_NAME = "CURRENT"
+VERSIONS_DIR = "versions"
+KEEP_VERSIONS = 3
+MANIFEST_NAME = "manifest.json"
+INDEX_NAME = "index.faiss"
+METADATA_NAME = "metadata.bin"
+LEXICAL_NAME = "bm25"
+SKU_INDEX_NAME = "skus"
+ATTRIBUTES_NAME = "attributes"
+CHUNKS_NAME = "chunks"
+VARIANTS_NAME = "variants"
+
+METADATA_FIELDS = ["product_id", "sku", "name", "content_hash"]
+
+_MAGIC = b"MAISMETA"
+_HEADER = struct.Struct("<8sIIQ")
+_METADATA_VERSION = 1
+
+# Zero-copy mmap for flat codes where the installed FAISS supports it
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+class MetadataTable:
+    """Read-only, memory-mapped view over metadata.bin."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._buf = np.memmap(self.path, dtype=np.uint8, mode="r")
+
+        magic, version, n_fields, n_rows = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"❌ Not a metadata table: {self.path}")
+        if version != _METADATA_VERSION:
+            raise ValueError(f"❌ Unsupported metadata table version {version} in {self.path}")
+
+        self.n_fields = n_fields
+        self.n_rows = n_rows
+
+        pos = _HEADER.size
+        self.ids = np.frombuffer(self._buf, dtype="<i8", count=n_rows, offset=pos)
+        pos += 8 * n_rows
+        self._offsets = np.frombuffer(self._buf, dtype="<u8", count=n_rows * n_fields + 1, offset=pos)
+        pos += 8 * (n_rows * n_fields + 1)
+        self._heap_start = pos
+
+        self.fields = None  # set by load_bundle from the manifest
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.n_rows
+        if not 0 <= row < self.n_rows:
+            raise IndexError(row)
+        return self._row(row)
+
+    def __iter__(self):
+        for row in range(self.n_rows):
+            yield self._row(row)
+
+    def _value(self, slot):
+        start = self._heap_start + int(self._offsets[slot])
+        end = self._heap_start + int(self._offsets[slot + 1])
+        return self._buf[start:end].tobytes().decode("utf-8")
+
+    def _row(self, row):
+        base = row * self.n_fields
+        record = {name: self._value(base + i) for i, name in enumerate(self.fields)}
+        record["id"] = int(self.ids[row])
+        return record
+
+    def row_for_id(self, faiss_id):
+        """Binary search the row holding a FAISS id (None if absent)."""
+        row = int(np.searchsorted(self.ids, faiss_id))
+        if row < self.n_rows and self.ids[row] == faiss_id:
+            return row
+        return None
+
+    def get_by_id(self, faiss_id):
+        row = self.row_for_id(faiss_id)
+        return None if row is None else self._row(row)
+
+    def get_many(self, faiss_ids):
+        """Rows for a page of FAISS ids in one vectorized search (None where an id is absent)."""
+        faiss_ids = np.asarray(faiss_ids, dtype="int64")
+        if not self.n_rows:
+            return [None] * len(faiss_ids)
+        rows = np.minimum(np.searchsorted(self.ids, faiss_ids), self.n_rows - 1)
+        found = self.ids[rows] == faiss_ids
+        return [self._row(int(row)) if ok else None for row, ok in zip(rows.tolist(), found.tolist())]
+
+
+def lookup(metadata, faiss_id):
+    """Metadata row for a FAISS id: bundle tables and product stores are id-keyed, legacy JSON lists are positional."""
+    if hasattr(metadata, "get_by_id"):
+        return metadata.get_by_id(faiss_id)
+    return metadata[faiss_id]
+
+
+def lookup_many(metadata, faiss_ids):
+    """Metadata rows for a result page of FAISS ids, with one bulk read where the store supports it."""
+    if hasattr(metadata, "get_many"):
+        return metadata.get_many(faiss_ids)
+    return [metadata[faiss_id] for faiss_id in faiss_ids]
+
+
+def load_legacy_metadata():
+    """
+    Metadata of the standalone faiss_index.bin: the id-keyed product store, or
+    for artifacts built before it, the positional product_metadata.json.
+    """
+    if PRODUCT_DB_FILE.exists():
+        return ProductStore(PRODUCT_DB_FILE)
+
+    print(f"⚠️ {PRODUCT_DB_FILE} missing; loading positional {LEGACY_METADATA_FILE} (rebuild the index to switch)")
+    with open(LEGACY_METADATA_FILE, "r") as f:
+        return json.load(f)
+
+
+def write_metadata_table(path, metadata, ids, fields=METADATA_FIELDS):
+    """Serialize metadata dicts into the binary table format."""
+    ids = np.asarray(ids, dtype="<i8")
+    if len(ids) != len(metadata):
+        raise ValueError(f"❌ {len(ids)} ids for {len(metadata)} metadata rows")
+    if len(ids) > 1 and np.any(np.diff(ids) <= 0):
+        raise ValueError("❌ Metadata ids must be strictly ascending")
+
+    chunks = []
+    offsets = np.zeros(len(metadata) * len(fields) + 1, dtype="<u8")
+    pos = 0
+    slot = 0
+    for item in metadata:
+        for name in fields:
+            value = item.get(name)
+            data = b"" if value is None else str(value).encode("utf-8")
+            chunks.append(data)
+            pos += len(data)
+            slot += 1
+            offsets[slot] = pos
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _METADATA_VERSION, len(fields), len(metadata)))
+        f.write(ids.tobytes())
+        f.write(offsets.tobytes())
+        for data in chunks:
+            f.write(data)
+
+
+def new_index_version():
+    """Unique, roughly time-ordered id stamped on every build, refresh and re-tune."""
+    return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(4)}"
+
+
+class SearchBundle:
+    def __init__(self, index, metadata, manifest, path, lexical=None, sku_index=None, attributes=None, chunks=None,
+                 variants=None, vectors=None):
+        self.index = index
+        self.metadata = metadata
+        self.manifest = manifest
+        self.path = Path(path)
+        self.lexical = lexical
+        self.sku_index = sku_index
+        self.attributes = attributes
+        self.chunks = chunks
+        self.variants = variants
+        self.vectors = vectors
+
+    def product_ids(self):
+        """Ids of the product vectors in the index: every metadata row, or one per group when variants are collapsed."""
+        if self.variants is not None:
+            return self.variants.rep_ids
+        return np.asarray(self.metadata.ids, dtype="int64")
+
+
+def _write_manifest(bundle_dir, manifest):
+    manifest_tmp = bundle_dir / (MANIFEST_NAME + ".tmp")
+    with open(manifest_tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_tmp, bundle_dir / MANIFEST_NAME)
+
+
+def language_bundle_dir(language):
+    """search_bundle for the catalog language, search_bundle_<lang> for the others."""
+    return BUNDLE_DIR if language == PRIMARY_LANGUAGE else EMBEDDING_DIR / f"search_bundle_{language}"
+
+
+def current_version(bundle_dir=BUNDLE_DIR):
+    """Version CURRENT points at (None for a missing bundle); one small file read."""
+    try:
+        return (Path(bundle_dir) / CURRENT_NAME).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_bundle(bundle_dir=BUNDLE_DIR):
+    """Directory holding the live version's files: versions/<CURRENT> (the directory itself when it has no CURRENT)."""
+    bundle_dir = Path(bundle_dir)
+    version = current_version(bundle_dir)
+    return bundle_dir / VERSIONS_DIR / version if version else bundle_dir
+
+
+def bundle_exists(bundle_dir=BUNDLE_DIR):
+    return (resolve_bundle(bundle_dir) / MANIFEST_NAME).exists()
+
+
+def _stage_version(bundle_dir, version):
+    staging = Path(bundle_dir) / VERSIONS_DIR / f".{version}.tmp"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+    return staging
+
+
+def _publish_version(bundle_dir, staging, version):
+    """Move a fully written version into place, then flip CURRENT to it atomically."""
+    bundle_dir = Path(bundle_dir)
+    os.replace(staging, bundle_dir / VERSIONS_DIR / version)
+
+    pointer_tmp = bundle_dir / (CURRENT_NAME + ".tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, bundle_dir / CURRENT_NAME)
+    _prune_versions(bundle_dir, version)
+
+
+def _prune_versions(bundle_dir, live, keep=KEEP_VERSIONS):
+    versions_dir = Path(bundle_dir) / VERSIONS_DIR
+    # Version names start with a UTC timestamp, so name order is age order
+    published = sorted(path for path in versions_dir.iterdir() if path.is_dir() and not path.name.startswith("."))
+    for path in published[:-keep]:
+        if path.name != live:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def write_bundle(index, metadata, bundle_dir=BUNDLE_DIR, ids=None, extra_manifest=None,
+                 lexical=None, sku_index=None, attributes=None, chunks=None, variants=None, vectors=None):
+    """
+    Write index + metadata + manifest as a new version of a bundle and make it current.
+
+    The index holds one vector per metadata row (per variant group with
+    `variants`) plus one per spec chunk.
+
+    The version is written into a staging directory that readers never see and
+    only published once complete. `vectors` (VectorSegments) are linked into
+    it, so exact re-ranking and the next refresh read this version's vectors.
+    """
+    root = Path(bundle_dir)
+    version = new_index_version()
+    bundle_dir = _stage_version(root, version)
+
+    if ids is None:
+        ids = np.arange(len(metadata), dtype="int64")
+    n_chunks = len(chunks) if chunks is not None else 0
+    n_products = len(variants) if variants is not None else len(metadata)
+    if index.ntotal != n_products + n_chunks:
+        raise ValueError(f"❌ Index holds {index.ntotal} vectors but expected {n_products} products and {n_chunks} chunks")
+
+    faiss.write_index(index, str(bundle_dir / INDEX_NAME))
+    write_metadata_table(bundle_dir / METADATA_NAME, metadata, ids)
+
+    for name, part in ((LEXICAL_NAME, lexical), (SKU_INDEX_NAME, sku_index), (ATTRIBUTES_NAME, attributes), (CHUNKS_NAME, chunks),
+                       (VARIANTS_NAME, variants)):
+        if part is not None:
+            part.save(bundle_dir / name)
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "index_version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "index_file": INDEX_NAME,
+        "metadata_file": METADATA_NAME,
+        "fields": METADATA_FIELDS,
+        "count": len(metadata),
+        "chunk_count": n_chunks,
+        "dim": int(index.d),
+        "metric": "inner_product",
+        "lexical_file": LEXICAL_NAME if lexical is not None else None,
+        "sku_file": SKU_INDEX_NAME if sku_index is not None else None,
+        "attributes_file": ATTRIBUTES_NAME if attributes is not None else None,
+        "chunks_file": CHUNKS_NAME if chunks is not None else None,
+        "variants_file": VARIANTS_NAME if variants is not None else None,
+        "variant_groups": n_products if variants is not None else None,
+    }
+    manifest.update(vectors.save(bundle_dir) if vectors is not None else {"vectors_file": None, "vector_segments": []})
+    manifest.update(extra_manifest or {})
+    _write_manifest(bundle_dir, manifest)
+    _publish_version(root, bundle_dir, version)
+
+    print(f"📦 Search bundle written → {root / VERSIONS_DIR / version} ({manifest['count']} products, {n_chunks} spec chunks)")
+    return manifest
+
+
+def read_manifest(bundle_dir=BUNDLE_DIR):
+    path = resolve_bundle(bundle_dir) / MANIFEST_NAME
+    if not path.exists():
+        raise FileNotFoundError(f"❌ Search bundle manifest missing: {path}")
+
+    with open(path, "r") as f:
+        manifest = json.load(f)
+
+    version = manifest.get("format_version")
+    if version != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"❌ Unsupported search bundle version {version} (expected {BUNDLE_FORMAT_VERSION}); rebuild it with build_faiss_index")
+    return manifest
+
+
+def read_index(path, mmap=True):
+    """Open a FAISS index, memory-mapped when possible."""
+    if mmap:
+        try:
+            return faiss.read_index(str(path), MMAP_FLAGS)
+        except RuntimeError as e:
+            print(f"⚠️ mmap not supported for {path} ({e}); reading into memory")
+    return faiss.read_index(str(path))
+
+
+def update_manifest(bundle_dir=BUNDLE_DIR, updates=None):
+    """
+    Publish a new version whose manifest merges in `updates`; the data files
+    are hard-linked from the current version (copied where links fail).
+    """
+    root = Path(bundle_dir)
+    source = resolve_bundle(root)
+    manifest = read_manifest(root)
+
+    version = new_index_version()
+    staging = _stage_version(root, version)
+    for path in source.iterdir():
+        if path.name == MANIFEST_NAME:
+            continue
+        link_or_copy(path, staging / path.name)
+
+    manifest.update(updates or {})
+    manifest["index_version"] = version
+    _write_manifest(staging, manifest)
+    _publish_version(root, staging, version)
+    return manifest
+
+
+def apply_search_params(index, params):
+    """Apply query-time parameters (efSearch, nprobe, ...) persisted with the index."""
+    space = faiss.ParameterSpace()
+    for name, value in (params or {}).items():
+        space.set_index_parameter(index, name, value)
+
+
+def search_parameters(index, selector):
+    """
+    SearchParameters restricting a search to `selector`, carrying over the
+    index's current efSearch / nprobe. None when the index cannot take search
+    parameters (IndexPQ).
+    """
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+
+    if isinstance(base, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = base.hnsw.efSearch
+    elif isinstance(base, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = base.nprobe
+    elif isinstance(base, faiss.IndexPQ):
+        return None
+    else:
+        params = faiss.SearchParameters()
+
+    params.sel = selector
+    return params
+
+
+def load_bundle(bundle_dir=BUNDLE_DIR, mmap=True):
+    """Open a search bundle without parsing or copying its contents."""
+    # Resolve CURRENT once: every file below comes from the same immutable version
+    bundle_dir = resolve_bundle(bundle_dir)
+    manifest = read_manifest(bundle_dir)
+
+    index = read_index(bundle_dir / manifest["index_file"], mmap=mmap)
+    apply_search_params(index, manifest.get("search_params"))
+    metadata = MetadataTable(bundle_dir / manifest["metadata_file"])
+    metadata.fields = manifest["fields"]
+
+    chunks = None
+    if manifest.get("chunks_file"):
+        chunks = ChunkMap.load(bundle_dir / manifest["chunks_file"])
+
+    variants = None
+    if manifest.get("variants_file"):
+        variants = VariantTable.load(bundle_dir / manifest["variants_file"])
+
+    n_chunks = len(chunks) if chunks is not None else 0
+    n_products = len(variants) if variants is not None else len(metadata)
+    if index.ntotal != n_products + n_chunks:
+        raise ValueError(f"❌ Bundle mismatch: {index.ntotal} vectors vs {n_products} products + {n_chunks} chunks")
+
+    lexical = None
+    if manifest.get("lexical_file"):
+        lexical = BM25Index.load(bundle_dir / manifest["lexical_file"])
+
+    sku_index = None
+    if manifest.get("sku_file"):
+        sku_index = SkuIndex.load(bundle_dir / manifest["sku_file"])
+
+    attributes = None
+    if manifest.get("attributes_file"):
+        attributes = AttributeStore.load(bundle_dir / manifest["attributes_file"])
+
+    vectors = None
+    if manifest.get("vectors_file"):
+        vectors = VectorSegments.load(bundle_dir, manifest)
+
+    return SearchBundle(index, metadata, manifest, bundle_dir, lexical, sku_index, attributes, chunks, variants, vectors)
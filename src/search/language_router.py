@@ -0,0 +1,57 @@
+"""
+Query language detection for routing searches to per-language bundles.
+
+Short product queries are a poor fit for statistical detectors, so this
+scores language-specific characters and a small vocabulary of function words
+and catalog terms (words that are also English, like "charge" or "die", are
+left out). A query leaves the default language only on clear evidence: at
+least ROUTE_MARGIN points more than the default, and no tie between languages.
+"""
+
+import re
+
+from src.embeddings.ranker import tokenize
+
+LANGUAGE_WORDS = {
+    "fr": {
+        "le", "la", "les", "des", "du", "une", "pour", "avec", "sans", "sur", "et", "ou", "jusqu",
+        "glissière", "glissières", "coulisse", "coulisses", "tiroir", "tiroirs",
+        "acier", "inoxydable", "épaisseur", "longueur", "sortie", "totale",
+    },
+    "de": {
+        "der", "das", "den", "dem", "ein", "eine", "und", "oder", "mit", "ohne", "für",
+        "schiene", "schienen", "auszug", "vollauszug", "schublade", "schubladen", "lastwert", "edelstahl",
+        "länge", "höhe", "befestigung", "paar", "schwerlast",
+    },
+}
+
+LANGUAGE_CHARS = {
+    "fr": re.compile(r"[éèêëàâîïôûùç]"),
+    "de": re.compile(r"[äöüß]"),
+}
+
+# Two vocabulary words, or one language-specific character
+ROUTE_MARGIN = 2
+
+
+def detect_language(text, languages=("en", "fr", "de"), default="en"):
+    """Best guess among `languages` for a short query; `default` when nothing points elsewhere."""
+    lowered = (text or "").lower()
+    tokens = tokenize(lowered)
+
+    scores = {}
+    for language, words in LANGUAGE_WORDS.items():
+        if language not in languages:
+            continue
+        score = sum(token in words for token in tokens)
+        score += 2 * len(LANGUAGE_CHARS[language].findall(lowered))
+        scores[language] = score
+
+    best = max(scores, key=scores.get, default=None)
+    if best is None or best == default:
+        return default
+    if scores[best] - scores.get(default, 0) < ROUTE_MARGIN:
+        return default
+    if any(score == scores[best] for language, score in scores.items() if language != best):
+        return default  # as much evidence for another language: stay put
+    return best
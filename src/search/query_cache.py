@@ -0,0 +1,85 @@
+"""
+Two-tier query-embedding cache: in-process LRU in front of Redis.
+
+Keys combine the normalized query text with the model name and the commit
+its weights were loaded from, so a model upgrade never serves stale vectors. Redis values are the raw bytes
+of the float32 vector. A Redis error or timeout counts as a miss (or a
+skipped write): the cache never fails a search.
+"""
+
+import hashlib
+import re
+import unicodedata
+import numpy as np
+
+from src.core.config import QUERY_CACHE_LRU_SIZE, QUERY_CACHE_TTL
+from src.storage.redis_cache import REDIS_ERRORS, LRUCache, get_redis
+
+
+def normalize_query(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class QueryEmbeddingCache:
+    def __init__(self, model_name, model_revision, redis_client=None,
+                 lru_size=QUERY_CACHE_LRU_SIZE, ttl=QUERY_CACHE_TTL):
+        self.model_name = model_name
+        self.model_revision = model_revision
+        self.redis = redis_client if redis_client is not None else get_redis()
+        self.lru = LRUCache(lru_size)
+        self.ttl = ttl
+
+        self.lru_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha1(normalize_query(text).encode("utf-8")).hexdigest()
+        return f"qemb:{self.model_name}:{self.model_revision}:{digest}"
+
+    def get(self, text: str):
+        """Return the cached (1, dim) float32 vector, or None."""
+        key = self.key(text)
+
+        vec = self.lru.get(key)
+        if vec is not None:
+            self.lru_hits += 1
+            return vec
+
+        try:
+            raw = self.redis.get(key)
+        except REDIS_ERRORS:
+            self.redis_errors += 1
+            raw = None
+        if raw is not None:
+            vec = np.frombuffer(raw, dtype="float32").reshape(1, -1)
+            self.lru.put(key, vec)
+            self.redis_hits += 1
+            return vec
+
+        self.misses += 1
+        return None
+
+    def put(self, text: str, vec):
+        key = self.key(text)
+        # A private read-only copy: cached vectors are shared between callers, the caller's array stays writable
+        vec = np.array(vec, dtype="float32").reshape(1, -1)
+        vec.setflags(write=False)
+        self.lru.put(key, vec)
+        try:
+            self.redis.set(key, vec.tobytes(), ex=self.ttl)
+        except REDIS_ERRORS:
+            self.redis_errors += 1
+
+    def stats(self):
+        lookups = self.lru_hits + self.redis_hits + self.misses
+        return {
+            "lru_hits": self.lru_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "redis_errors": self.redis_errors,
+            "hit_rate": (self.lru_hits + self.redis_hits) / lookups if lookups else 0.0,
+            "lru_size": len(self.lru),
+        }
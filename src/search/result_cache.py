@@ -0,0 +1,95 @@
+"""
+Two-tier cache of ranked search results: in-process LRU in front of Redis.
+
+Keys combine the bundle's index version with the normalized query, filters,
+k and requested language. Every build, refresh or re-tune stamps a new index
+version, so stale results simply stop being addressed — nothing is scanned
+or flushed — and expire from Redis through their TTL.
+
+Values are the JSON bytes of the result list, ready to be spliced into a
+response body without re-serializing. A Redis error or timeout counts as a
+miss (or a skipped write).
+"""
+
+import hashlib
+import json
+
+from src.core.config import RESULT_CACHE_LRU_SIZE, RESULT_CACHE_TTL
+from src.search.query_cache import normalize_query
+from src.storage.redis_cache import REDIS_ERRORS, LRUCache, get_redis
+
+
+def serialize_results(results) -> bytes:
+    return json.dumps(results, separators=(",", ":")).encode("utf-8")
+
+
+def is_complete(results) -> bool:
+    """False when the re-ranker ran out of budget (rerank_score None): don't pin the fallback order."""
+    return not any("rerank_score" in r and r["rerank_score"] is None for r in results)
+
+
+def render_response(fields, results_key, results_bytes) -> bytes:
+    """JSON object of `fields` plus `results_key` holding already-serialized results."""
+    head = json.dumps(fields, separators=(",", ":"))[:-1]
+    sep = "," if fields else ""
+    return f'{head}{sep}"{results_key}":'.encode("utf-8") + results_bytes + b"}"
+
+
+class SearchResultCache:
+    def __init__(self, namespace="", redis_client=None, lru_size=RESULT_CACHE_LRU_SIZE, ttl=RESULT_CACHE_TTL):
+        self.namespace = namespace  # search settings that change results (model, hybrid, re-ranker)
+        self.redis = redis_client if redis_client is not None else get_redis()
+        self.lru = LRUCache(lru_size)
+        self.ttl = ttl
+
+        self.lru_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    def key(self, index_version, query, filters=None, top_k=10, language=None) -> str:
+        payload = json.dumps([self.namespace, normalize_query(query), filters or {}, top_k, language], sort_keys=True, default=str)
+        digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        return f"qres:{index_version}:{digest}"
+
+    def get(self, key):
+        """Return the cached result bytes, or None."""
+        raw = self.lru.get(key)
+        if raw is not None:
+            self.lru_hits += 1
+            return raw
+
+        try:
+            raw = self.redis.get(key)
+        except REDIS_ERRORS:
+            self.redis_errors += 1
+            raw = None
+        if raw is not None:
+            self.lru.put(key, raw)
+            self.redis_hits += 1
+            return raw
+
+        self.misses += 1
+        return None
+
+    def put(self, key, results) -> bytes:
+        """Serialize and store results; returns the bytes (cached or not)."""
+        raw = serialize_results(results)
+        if is_complete(results):
+            self.lru.put(key, raw)
+            try:
+                self.redis.set(key, raw, ex=self.ttl)
+            except REDIS_ERRORS:
+                self.redis_errors += 1
+        return raw
+
+    def stats(self):
+        lookups = self.lru_hits + self.redis_hits + self.misses
+        return {
+            "lru_hits": self.lru_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "redis_errors": self.redis_errors,
+            "hit_rate": (self.lru_hits + self.redis_hits) / lookups if lookups else 0.0,
+            "lru_size": len(self.lru),
+        }
@@ -1,55 +1,363 @@
-import json
+import asyncio
+import threading
 import faiss
 import numpy as np
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
+
+from src.core.config import (
+    HYBRID_CANDIDATES, HYBRID_SEARCH, LANGUAGE_EMBEDDING_MODEL, RERANK_CANDIDATES, RERANKER_MODEL, RRF_K, SEARCH_LANGUAGES,
+    VECTOR_STORE,
+)
+from src.core.model_registry import get_encoder
+from src.embeddings.onnx_encoder import encoder_id, resolved_revision
+from src.embeddings.ranker import CrossEncoderReranker, reciprocal_rank_fusion
+from src.search.attribute_store import parse_query_filters
+from src.search.index_bundle import (
+    BUNDLE_DIR, PRIMARY_LANGUAGE, bundle_exists, language_bundle_dir, load_bundle, load_legacy_metadata, lookup_many,
+    read_manifest, search_parameters,
+)
+from src.search.language_router import detect_language
+from src.search.query_cache import QueryEmbeddingCache
+from src.search.result_cache import SearchResultCache
+from src.search.sku_index import looks_like_sku
+from src.search.spec_chunks import CHUNK_ID_BASE, aggregate_hits
 
 # File paths
 EMBEDDING_DIR = Path("data/embeddings")
 INDEX_FILE = EMBEDDING_DIR / "faiss_index.bin"
-META_FILE = EMBEDDING_DIR / "product_metadata.json"
+
+# Scores reported for SKU fast-path hits (they never go through the model)
+SKU_MATCH_SCORES = {"exact": 1.0, "variant": 0.9, "prefix": 0.8}
+
+# IndexPQ takes no IDSelector; filtered searches over-fetch by this factor instead
+PQ_FILTER_OVERFETCH = 10
+
+# Extra hits fetched per requested product when spec chunks share the index,
+# since several chunks of one product collapse into a single result
+CHUNK_OVERFETCH = 4
+
+
+def exact_rerank(q_emb, candidate_ids, vectors, top_k, chunks=None):
+    """Re-score compressed-index candidates with the exact float vectors (rows addressed by FAISS id)."""
+    ids = candidate_ids[candidate_ids != -1]
+    if len(ids) == 0:
+        return np.empty((1, 0), dtype="float32"), np.empty((1, 0), dtype="int64")
+
+    if chunks is None:
+        cand = np.asarray(vectors[ids], dtype="float32")  # touches only the candidate rows of the mmap
+    else:
+        is_chunk = ids >= CHUNK_ID_BASE
+        cand = np.empty((len(ids), vectors.shape[1]), dtype="float32")
+        cand[~is_chunk] = vectors[ids[~is_chunk]]
+        cand[is_chunk] = chunks.vectors[chunks.rows(ids[is_chunk])]
+    scores = cand @ q_emb[0] / np.maximum(np.linalg.norm(cand, axis=1), 1e-12)
+
+    order = np.argsort(-scores)[:top_k]
+    return scores[order][None, :], ids[order][None, :]
+
 
 class SemanticSearcher:
-    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", bundle_dir=BUNDLE_DIR,
+                 language=PRIMARY_LANGUAGE, rerank=True, store=None, reranker=None):
         print("🔍 Loading FAISS index and embedding model...")
-        
-        self.index = faiss.read_index(str(INDEX_FILE))
-        print(f"📦 FAISS index loaded — vectors: {self.index.ntotal}")
+        self.language = language
+
+        if bundle_exists(bundle_dir):
+            # mmap'd bundle: nothing is parsed or copied, pages are shared across workers
+            bundle = load_bundle(bundle_dir)
+            self.index = bundle.index
+            self.metadata = bundle.metadata
+            self.manifest = bundle.manifest
+            self.lexical = bundle.lexical
+            self.sku_index = bundle.sku_index
+            self.attributes = bundle.attributes
+            self.chunks = bundle.chunks
+            self.variants = bundle.variants
+            self.vectors = bundle.vectors
+            self.bundle_path = bundle.path
+            self.index_version = self.manifest.get("index_version") or self.manifest["created_at"]
+            print(f"📦 Search bundle mapped — vectors: {self.index.ntotal} ({len(self.chunks) if self.chunks is not None else 0} spec chunks)")
+        elif bundle_dir != BUNDLE_DIR:
+            raise FileNotFoundError(f"❌ Search bundle missing: {bundle_dir}")
+        else:
+            self.index = faiss.read_index(str(INDEX_FILE))
+            print(f"📦 FAISS index loaded — vectors: {self.index.ntotal}")
+
+            self.metadata = load_legacy_metadata()
+            self.manifest = None
+            self.lexical = None
+            self.sku_index = None
+            self.attributes = None
+            self.chunks = None
+            self.variants = None
+            self.vectors = None
+            self.bundle_path = None
+            self.index_version = f"legacy-{INDEX_FILE.stat().st_mtime_ns}"
+            print(f"📘 Metadata loaded — {len(self.metadata)} items")
 
-        with open(META_FILE, "r") as f:
-            self.metadata = json.load(f)
-        print(f"📘 Metadata loaded — {len(self.metadata)} items")
+        # Compressed (sq8/pq) indexes may re-rank candidates against the mmap'd float vectors
+        # the bundle version ships with (ids and rows always match the index)
+        self.rerank_factor = (self.manifest or {}).get("rerank_factor", 0)
+        if self.rerank_factor and self.vectors is None:
+            print("⚠️ Bundle has no float vectors; exact re-ranking disabled (rebuild the index)")
+            self.rerank_factor = 0
+        self.rerank_vectors = self.vectors if self.rerank_factor else None
 
-        self.model = SentenceTransformer(model_name)
+        # VECTOR_STORE=qdrant answers the primary bundle's vector searches from the Qdrant collection
+        # loaded from it (python -m src.embeddings.vector_store build); FAISS serves everything else.
+        # A hot reload passes the open store on (an embedded collection allows one client per process)
+        self.store = store
+        if store is None and VECTOR_STORE == "qdrant" and self.manifest is not None and language == PRIMARY_LANGUAGE:
+            from src.embeddings.vector_store import open_vector_store
+            self.store = open_vector_store("qdrant")
+
+        # Shared per process (sentence-transformers or ONNX Runtime, per EMBEDDING_BACKEND)
+        self.model = get_encoder(model_name)
         print(f"🧠 Embedding model ready: {model_name}")
 
+        self.query_cache = QueryEmbeddingCache(encoder_id(model_name), resolved_revision(model_name))
+
+        # A hot reload passes the serving re-ranker on, with its model and score cache
+        # (scores depend on the query and the product text, not on the index)
+        self.reranker = reranker
+        if reranker is None and rerank and RERANKER_MODEL:
+            self.reranker = CrossEncoderReranker(RERANKER_MODEL)
+            print(f"🎯 Cross-encoder re-ranker ready: {RERANKER_MODEL}")
+
+        # Bundles of the other languages are only opened (with their model) on their first query
+        self.language_manifests = {}
+        if language == PRIMARY_LANGUAGE:
+            for lang in SEARCH_LANGUAGES:
+                if lang != language and bundle_exists(language_bundle_dir(lang)):
+                    self.language_manifests[lang] = read_manifest(language_bundle_dir(lang))
+        self.language_searchers = {}
+        self._language_lock = threading.Lock()
+        if self.language_manifests:
+            print(f"🌍 Language bundles available: {', '.join(sorted(self.language_manifests))}")
+            # Rebuilding any language bundle invalidates cached results too
+            self.index_version = "+".join([self.index_version] + [
+                f"{lang}:{manifest.get('index_version') or manifest['created_at']}"
+                for lang, manifest in sorted(self.language_manifests.items())
+            ])
+
+        # Settings that change the ranking are part of every result-cache key
+        self.result_cache = SearchResultCache(
+            namespace=f"{encoder_id(model_name)}@{resolved_revision(model_name)}|hybrid={HYBRID_SEARCH}:{HYBRID_CANDIDATES}:{RRF_K}|rerank={RERANKER_MODEL}:{RERANK_CANDIDATES}"
+        )
+
     def encode_query(self, text: str):
         """Convert query into embedding."""
+        cached = self.query_cache.get(text)
+        if cached is not None:
+            return cached
+
         emb = self.model.encode([text], convert_to_tensor=False)
         emb = np.asarray(emb).astype("float32")
         
         # Normalize for cosine similarity
         faiss.normalize_L2(emb)
+        self.query_cache.put(text, emb)
         return emb
 
-    def search(self, query: str, top_k: int = 50):
+    def query_language(self, query: str, language=None):
+        """Language whose bundle serves the query: explicit, else detected; the primary one when there is no bundle."""
+        if not self.language_manifests:
+            return self.language
+        language = language or detect_language(query, SEARCH_LANGUAGES, default=self.language)
+        return language if language in self.language_manifests else self.language
+
+    def language_searcher(self, language):
+        """Searcher over a language bundle, opened on first use."""
+        searcher = self.language_searchers.get(language)
+        if searcher is not None:
+            return searcher
+
+        with self._language_lock:
+            if language not in self.language_searchers:
+                manifest = self.language_manifests[language]
+                print(f"🌍 Opening {language} search bundle...")
+                # English cross-encoders don't transfer; the language bundles skip the re-rank stage
+                self.language_searchers[language] = SemanticSearcher(
+                    manifest.get("model", LANGUAGE_EMBEDDING_MODEL), language_bundle_dir(language), language, rerank=False
+                )
+        return self.language_searchers[language]
+
+    def search(self, query: str, top_k: int = 50, filters=None, language=None):
+        language = self.query_language(query, language)
+        if language != self.language:
+            return self.language_searcher(language).search(query, top_k, filters)
+
         print(f"\n🔎 Searching for: \"{query}\"")
 
+        id_filter = self.compile_filters(filters)
+        if id_filter is not None and id_filter.count == 0:
+            return []
+
+        hits = self.search_sku(query, top_k, id_filter)
+        if hits:
+            return hits
+
         q_emb = self.encode_query(query)
+        return self.retrieve(query, q_emb, top_k, id_filter)
+
+    async def asearch(self, query: str, top_k: int = 50, encoder=None, filters=None, language=None):
+        """Async search; queries are encoded through a shared MicroBatchEncoder when given."""
+        language = self.query_language(query, language)
+        if language != self.language:
+            # The shared encoder runs the primary model; load + encode for other languages off the event loop
+            loop = asyncio.get_running_loop()
+            searcher = await loop.run_in_executor(None, self.language_searcher, language)
+            return await loop.run_in_executor(None, searcher.search, query, top_k, filters)
+
+        id_filter = self.compile_filters(filters)
+        if id_filter is not None and id_filter.count == 0:
+            return []
+
+        hits = self.search_sku(query, top_k, id_filter)
+        if hits:
+            return hits
+
+        loop = asyncio.get_running_loop()
+        if encoder is None:
+            q_emb = await loop.run_in_executor(None, self.encode_query, query)
+        else:
+            q_emb = self.query_cache.get(query)
+            if q_emb is None:
+                q_emb = await encoder.encode(query)
+                self.query_cache.put(query, q_emb)
+
+        # FAISS, BM25, fusion and the cross-encoder are CPU-bound: one executor hop keeps them all off the event loop
+        return await loop.run_in_executor(None, self.retrieve, query, q_emb, top_k, id_filter)
+
+    def retrieve(self, query: str, q_emb, top_k: int = 50, id_filter=None):
+        """rank(), then the cross-encoder over the first stage when one is configured."""
+        if self.reranker is None:
+            return self.rank(query, q_emb, top_k, id_filter)
+
+        results = self.rank(query, q_emb, self.first_stage_k(top_k), id_filter)
+        return self.reranker.rerank(query, results)[:top_k]
+
+    def first_stage_k(self, top_k: int):
+        """Fetch at least the re-ranker's candidate count so it can promote hits from below top_k."""
+        return max(top_k, self.reranker.max_candidates)
+
+    def compile_filters(self, filters):
+        """Attribute filters (see src/search/attribute_store.py) → IdFilter, or None for no filtering."""
+        if not filters:
+            return None
+        if self.attributes is None:
+            print("⚠️ Index has no attribute store; ignoring filters")
+            return None
+        id_filter = self.attributes.compile(filters)
+        if id_filter is not None and self.variants is not None:
+            # A collapsed index holds one vector per group; it is searched when any of its variants passes
+            id_filter = self.variants.group_filter(id_filter)
+        if id_filter is not None and self.chunks is not None:
+            # Spec chunks pass when the product they belong to does
+            id_filter.include(self.chunks.ids[id_filter.contains(self.chunks.product_ids)])
+        return id_filter
+
+    def infer_filters(self, query: str):
+        """Filters implied by the query text ("over 400mm", "holds 300kg", material names)."""
+        if self.attributes is None:
+            return {}
+        return parse_query_filters(query, self.attributes.values("material"))
+
+    def search_sku(self, query: str, top_k: int = 50, id_filter=None):
+        """Exact / variant / prefix SKU matches for SKU-shaped queries; [] means fall through to vector search."""
+        if self.sku_index is None or not looks_like_sku(query):
+            return []
+
+        # SKUs name single products, so they are filtered per product even in a collapsed index
+        id_filter = getattr(id_filter, "member_filter", id_filter)
+        hits = self.sku_index.lookup(query, limit=top_k, id_filter=id_filter)
+        return self.format_results([i for i, _ in hits], [SKU_MATCH_SCORES[match] for _, match in hits])
+
+    def rank(self, query: str, q_emb, top_k: int = 50, id_filter=None):
+        """Vector search, fused with BM25 when the bundle ships a lexical index."""
+        if self.lexical is None or not HYBRID_SEARCH:
+            return self.search_by_vector(q_emb, top_k, id_filter)
+
+        candidates = max(top_k, HYBRID_CANDIDATES)
+        vec_ids, _, highlights = self.vector_candidates(q_emb, candidates, id_filter)
+        # BM25 scores every product, also in a collapsed index: a variant's hit counts for its group
+        lex_ids, _ = self.lexical.search(query, candidates, getattr(id_filter, "member_filter", id_filter))
+        if self.variants is not None:
+            lex_ids = list(dict.fromkeys(self.variants.representatives(lex_ids).tolist()))
+
+        fused = reciprocal_rank_fusion([vec_ids, lex_ids], k=RRF_K, top_k=top_k)
+        return self.format_results([i for i, _ in fused], [score for _, score in fused], highlights, id_filter)
+
+    def index_search(self, q_emb, k, id_filter=None):
+        """index.search, restricted to the ids passing id_filter inside FAISS."""
+        if self.store is not None:
+            return self.store.search(q_emb, k, ids=None if id_filter is None else id_filter.ids())
+        if id_filter is None:
+            return self.index.search(q_emb, k)
+
+        params = search_parameters(self.index, id_filter.selector)
+        if params is not None:
+            return self.index.search(q_emb, k, params=params)
+
+        distances, indices = self.index.search(q_emb, k * PQ_FILTER_OVERFETCH)
+        keep = id_filter.contains(indices[0])
+        return distances[:, keep][:, :k], indices[:, keep][:, :k]
+
+    def vector_candidates(self, q_emb, top_k: int = 50, id_filter=None):
+        """
+        FAISS ids and scores of the nearest products, best first, plus
+        {id: spec chunk text} for products that matched through a chunk.
+        """
+        k = top_k
+        if self.chunks is not None:
+            k += min(len(self.chunks), top_k * CHUNK_OVERFETCH)
+
+        if self.rerank_vectors is not None:
+            distances, indices = self.index_search(q_emb, k * self.rerank_factor, id_filter)
+            distances, indices = exact_rerank(q_emb, indices[0], self.rerank_vectors, k, self.chunks)
+        else:
+            distances, indices = self.index_search(q_emb, k, id_filter)
+
+        keep = indices[0] != -1
+        return aggregate_hits(indices[0][keep], distances[0][keep], self.chunks, top_k)
+
+    def search_by_vector(self, q_emb, top_k: int = 50, id_filter=None):
+        ids, scores, highlights = self.vector_candidates(q_emb, top_k, id_filter)
+        return self.format_results(ids, scores, highlights, id_filter)
+
+    def variant_rows(self, rep_id, id_filter=None):
+        """Variants behind a collapsed hit that pass the filter, with their lengths."""
+        members = self.variants.members(rep_id)
+        member_filter = getattr(id_filter, "member_filter", None)
+        if member_filter is not None:
+            members = members[member_filter.contains(members)]
+
+        lengths = self.attributes.numeric["length_mm"] if self.attributes is not None else None
+        rows = []
+        for faiss_id, meta in zip(members.tolist(), lookup_many(self.metadata, members)):
+            length = float(lengths[faiss_id]) if lengths is not None else float("nan")
+            rows.append({"sku": meta["sku"], "length_mm": None if np.isnan(length) else length})
+        return sorted(rows, key=lambda row: (row["length_mm"] is None, row["length_mm"] or 0, row["sku"]))
 
-        distances, indices = self.index.search(q_emb, top_k)
-        print(distances , indices)
+    def format_results(self, ids, scores, highlights=None, id_filter=None):
         results = []
-        for rank, idx in enumerate(indices[0]):
-            if idx == -1:
-                continue
-            meta = self.metadata[idx]
-            results.append({
-                "rank": rank + 1,
-                "score": float(distances[0][rank]),
+        # One bulk read for the whole page
+        for idx, score, meta in zip(ids, scores, lookup_many(self.metadata, ids)):
+            if meta is None:
+                continue  # an id the store has but this bundle doesn't (e.g. a Qdrant sync ahead of the bundle)
+            result = {
+                "rank": len(results) + 1,
+                "score": float(score),
                 "sku": meta["sku"],
                 "name": meta["name"]
-            })
+            }
+            if highlights and idx in highlights:
+                result["highlight"] = highlights[idx]
+            if self.variants is not None:
+                variants = self.variant_rows(idx, id_filter)
+                if variants:
+                    result["variants"] = variants
+            results.append(result)
 
         return results
 
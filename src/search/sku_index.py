@@ -0,0 +1,100 @@
+"""
+SKU / part-number fast path.
+
+Queries that look like a SKU (or a SKU prefix such as "DZ4501-0070" or
+"DS4180-080") are answered from a sorted array of normalized SKUs with binary
+search — no embedding model, no ANN search. Keys drop separators, so
+"DZ4180 060", "dz4180-060" and "DZ4180060" all hit the same products.
+"""
+
+import re
+import numpy as np
+
+from src.storage.array_dir import load_arrays, save_arrays
+
+# Letters then digits, optionally followed by more part-number segments
+SKU_QUERY_RE = re.compile(r"^[A-Z]{1,4}\d{2,}[A-Z0-9]*(?:[-\s./][A-Z0-9]+)*-?$")
+_STRIP_RE = re.compile(r"[^A-Z0-9]")
+
+
+def normalize_sku(sku):
+    return _STRIP_RE.sub("", (sku or "").upper())
+
+
+def looks_like_sku(query):
+    query = (query or "").strip().upper()
+    return bool(query) and len(query) <= 40 and bool(SKU_QUERY_RE.match(query))
+
+
+class SkuIndex:
+    def __init__(self, keys, ids, parent_keys, parent_ids):
+        self.keys = keys                # sorted normalized SKUs
+        self.ids = ids                  # int64 FAISS id per key
+        self.parent_keys = parent_keys  # sorted normalized parent SKUs of variants
+        self.parent_ids = parent_ids    # FAISS id of the variant per parent key
+
+    @classmethod
+    def build(cls, skus, ids, parent_skus=None):
+        ids = np.asarray(ids, dtype="int64")
+        keys = np.array([normalize_sku(s) for s in skus], dtype="U")
+        order = np.argsort(keys, kind="stable")
+
+        parents = np.array([normalize_sku(p) for p in (parent_skus or [""] * len(keys))], dtype="U")
+        has_parent = np.flatnonzero(parents != "")
+        porder = has_parent[np.argsort(parents[has_parent], kind="stable")]
+
+        return cls(keys[order], ids[order], parents[porder], ids[porder])
+
+    def lookup(self, query, limit=20, id_filter=None):
+        """
+        [(id, match)] for exact, variant-of-exact and prefix matches, in that
+        order, keeping only ids id_filter admits when given (limit=None: all).
+        """
+        key = normalize_sku(query)
+        if not key:
+            return []
+
+        lo = int(np.searchsorted(self.keys, key, side="left"))
+        hi = int(np.searchsorted(self.keys, key + "~", side="left"))  # "~" sorts after A-Z0-9
+
+        hits, seen = [], set()
+
+        def add(ids, match):
+            if id_filter is not None and len(ids):
+                ids = ids[id_filter.contains(ids)]
+            for faiss_id in ids.tolist():
+                if limit is not None and len(hits) >= limit:
+                    return
+                if faiss_id not in seen:
+                    seen.add(faiss_id)
+                    hits.append((faiss_id, match))
+
+        exact_end = int(np.searchsorted(self.keys, key, side="right"))
+        add(self.ids[lo:exact_end], "exact")
+
+        # Variants that name this SKU as their parent
+        if exact_end > lo:
+            plo = int(np.searchsorted(self.parent_keys, key, side="left"))
+            phi = int(np.searchsorted(self.parent_keys, key, side="right"))
+            add(self.parent_ids[plo:phi], "variant")
+
+        # A short prefix can span much of the catalog: read only as many rows as
+        # the limit still needs (plus the ids already taken, which are skipped)
+        start = exact_end
+        while start < hi and (limit is None or len(hits) < limit):
+            if limit is None:
+                stop = hi
+            else:
+                step = limit - len(hits) + len(seen)
+                stop = min(hi, start + (max(4 * step, 256) if id_filter is not None else step))
+            add(self.ids[start:stop], "prefix")
+            start = stop
+        return hits
+
+    def save(self, path):
+        save_arrays(path, keys=self.keys, ids=self.ids, parent_keys=self.parent_keys, parent_ids=self.parent_ids)
+
+    @classmethod
+    def load(cls, path):
+        data = load_arrays(path)
+        return cls(data["keys"], data["ids"], data["parent_keys"], data["parent_ids"])
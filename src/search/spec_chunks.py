@@ -0,0 +1,200 @@
+"""
+Spec-chunk vectors: the PDF manual detail (load rating, temperature range,
+mounting, accessories, ...) indexed next to the product vectors.
+
+Each chunk is one spec section from extract_detailed_specs_en
+(product_specs_en.json) or one bullet of the English section of a raw manual
+(data/raw/pdfs/<SKU>_manual.json). A manual covers a whole SKU family, so its
+chunks are attached to one representative product of that family.
+
+Chunk vectors live in the same FAISS index under ids from CHUNK_ID_BASE up,
+far above any product id. ChunkMap (chunks/ in the bundle) maps them back
+to their product; search keeps the best hit per product (max-sim) and shows
+the matching chunk as a highlight.
+"""
+
+import json
+import re
+import numpy as np
+from pathlib import Path
+
+from src.storage.array_dir import load_arrays, save_arrays
+
+CHUNK_ID_BASE = 1 << 40
+CHUNK_LANGUAGE = "en"  # chunks share the catalog model's index, so only the catalog language is chunked
+
+SPECS_EN_FILE = Path("data/processed/clean_pdf_json/product_specs_en.json")
+RAW_MANUALS_DIR = Path("data/raw/pdfs")
+
+# Bullets shorter than this are table fragments rather than statements
+MIN_CHUNK_CHARS = 12
+
+
+def product_family(sku):
+    """Leading letters + digits of a SKU ("DB4501-0020TR" → "DB4501"); spec PDFs cover whole families."""
+    match = re.match(r"[A-Z]+\d+", (sku or "").upper())
+    return match.group(0) if match else None
+
+
+def _clean(text):
+    return " ".join((text or "").split())
+
+
+def spec_section_chunks(spec, language=CHUNK_LANGUAGE):
+    """
+    ("load_rating", "Load rating: 622 kg") per prose field of an
+    extract_detailed_specs_* record; none when the record's language tag is
+    another language.
+    """
+    if spec.get("language", language) != language:
+        return []
+    chunks = []
+    for key, value in spec.items():
+        if key in ("product_id", "language") or not isinstance(value, str):
+            continue
+        value = _clean(value)
+        if len(value) >= 2:
+            chunks.append((key, f"{key.replace('_', ' ').capitalize()}: {value}"))
+    return chunks
+
+
+def manual_bullet_chunks(text):
+    """"• ..." bullets of one language's section of a raw manual, re-joined across PDF line wraps."""
+    bullets = [_clean(part) for part in re.split(r"\n\s*•", "\n" + (text or ""))[1:]]
+    return [("manual", bullet) for bullet in bullets if len(bullet) >= MIN_CHUNK_CHARS]
+
+
+def representative_row(products, product_id):
+    """Row of the product a manual's chunks attach to: exact SKU, then the family's parent, then its first variant."""
+    family = product_family(product_id)
+    first = None
+    for row, p in enumerate(products):
+        sku = p.get("sku") or ""
+        if sku == product_id or sku == family:
+            return row
+        if first is None and family and sku.startswith(family):
+            first = row
+    return first
+
+
+def collect_chunks(products, ids, specs_file=SPECS_EN_FILE, manuals_dir=RAW_MANUALS_DIR):
+    """[(product FAISS id, section, text)] for every product with a manual, de-duplicated per product."""
+    by_product = {}
+
+    if Path(specs_file).exists():
+        with open(specs_file, "r", encoding="utf-8") as f:
+            for spec in json.load(f):
+                if spec.get("product_id"):
+                    by_product.setdefault(spec["product_id"], []).extend(spec_section_chunks(spec))
+
+    for path in sorted(Path(manuals_dir).glob("*_manual.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            manual = json.load(f)
+        by_product.setdefault(manual.get("sku") or path.stem[:-len("_manual")], []).extend(manual_bullet_chunks(manual.get(CHUNK_LANGUAGE)))
+
+    chunks = []
+    for product_id, sections in by_product.items():
+        row = representative_row(products, product_id)
+        if row is None:
+            print(f"⚠️ No catalog product for manual {product_id}; skipping its chunks")
+            continue
+        seen = set()
+        for section, text in sections:
+            if text.lower() not in seen:
+                seen.add(text.lower())
+                chunks.append((int(ids[row]), section, text))
+    return chunks
+
+
+class ChunkMap:
+    def __init__(self, ids, product_ids, sections, texts, vectors):
+        self.ids = ids                  # int64 chunk ids, ascending, ≥ CHUNK_ID_BASE
+        self.product_ids = product_ids  # int64 FAISS id of the product each chunk belongs to
+        self.sections = sections
+        self.texts = texts
+        self.vectors = vectors          # float32, normalized; for compaction and exact re-rank
+
+    @classmethod
+    def build(cls, chunks, vectors):
+        ids = CHUNK_ID_BASE + np.arange(len(chunks), dtype="int64")
+        return cls(
+            ids,
+            np.array([product_id for product_id, _, _ in chunks], dtype="int64"),
+            np.array([section for _, section, _ in chunks], dtype="U"),
+            np.array([text for _, _, text in chunks], dtype="U"),
+            np.asarray(vectors, dtype="float32"),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, chunk_ids):
+        return np.searchsorted(self.ids, chunk_ids)
+
+    def subset(self, keep):
+        """ChunkMap of the chunks where the boolean mask `keep` is set."""
+        return ChunkMap(self.ids[keep], self.product_ids[keep], self.sections[keep], self.texts[keep], self.vectors[keep])
+
+    def save(self, path):
+        save_arrays(path, ids=self.ids, product_ids=self.product_ids, sections=self.sections, texts=self.texts, vectors=self.vectors)
+
+    @classmethod
+    def load(cls, path):
+        data = load_arrays(path)
+        return cls(data["ids"], data["product_ids"], data["sections"], data["texts"], data["vectors"])
+
+
+def aggregate_hits(ids, scores, chunks, top_k=None):
+    """
+    Max-sim per product over mixed product / chunk hits (best first).
+    Returns (product ids, scores, {product id: highlight chunk text}).
+    """
+    ids = np.asarray(ids, dtype="int64")
+    if chunks is None or not len(chunks):
+        return ids[:top_k], np.asarray(scores)[:top_k], {}
+
+    is_chunk = ids >= CHUNK_ID_BASE
+    rows = chunks.rows(ids[is_chunk])
+    owners = ids.copy()
+    owners[is_chunk] = chunks.product_ids[rows]
+
+    best, highlights = {}, {}
+    chunk_rows = iter(rows.tolist())
+    for owner, score, chunk in zip(owners.tolist(), np.asarray(scores).tolist(), is_chunk.tolist()):
+        row = next(chunk_rows) if chunk else None
+        if owner not in best:
+            best[owner] = score  # hits arrive best first, so the first one is the max
+        if row is not None and owner not in highlights:
+            highlights[owner] = str(chunks.texts[row])
+
+    ranked = list(best.items())[:top_k]
+    return (
+        np.array([owner for owner, _ in ranked], dtype="int64"),
+        np.array([score for _, score in ranked], dtype="float32"),
+        {owner: highlights[owner] for owner, _ in ranked if owner in highlights},
+    )
+
+
+def aggregate_hit_matrix(ids, chunks, top_k):
+    """
+    aggregate_hits for a batch: (queries, k) FAISS ids, best first → (queries, top_k)
+    product ids, each product kept at its best hit; -1 pads rows with fewer products.
+    """
+    owners = np.array(ids, dtype="int64")
+    if chunks is not None and len(chunks):
+        is_chunk = owners >= CHUNK_ID_BASE
+        owners[is_chunk] = chunks.product_ids[chunks.rows(owners[is_chunk])]
+
+    # A repeat is an owner equal to its predecessor once each row is sorted (stable, so the best hit stays first)
+    order = np.argsort(owners, axis=1, kind="stable")
+    ranked = np.take_along_axis(owners, order, axis=1)
+    repeat_sorted = np.zeros(owners.shape, dtype=bool)
+    repeat_sorted[:, 1:] = ranked[:, 1:] == ranked[:, :-1]
+    drop = np.empty_like(repeat_sorted)
+    np.put_along_axis(drop, order, repeat_sorted, axis=1)
+    drop |= owners == -1
+
+    keep = np.argsort(drop, axis=1, kind="stable")[:, :top_k]
+    products = np.take_along_axis(owners, keep, axis=1)
+    products[np.take_along_axis(drop, keep, axis=1)] = -1
+    return products
@@ -0,0 +1,130 @@
+"""
+Recall-vs-latency sweep for approximate FAISS indexes.
+
+Sweeps efSearch (HNSW) or nprobe (IVF) on the bundle's index, comparing every
+operating point against exact IndexFlatIP search over the same embeddings.
+Queries are query texts (the golden set plus synthetic ones cut from catalog
+names) encoded with the bundle's model, never the indexed vectors themselves.
+With --target-recall the cheapest setting that reaches the target is written
+into the bundle manifest, and SemanticSearcher applies it on load.
+"""
+
+import argparse
+import time
+import faiss
+import numpy as np
+
+from src.core.config import EMBEDDING_MODEL
+from src.core.model_registry import get_encoder
+from src.search.build_faiss_index import load_embeddings
+from src.search.index_bundle import BUNDLE_DIR, apply_search_params, load_bundle, update_manifest
+
+SWEEPS = {
+    "hnsw": ("efSearch", [16, 32, 64, 128, 256, 512]),
+    "ivf": ("nprobe", [1, 2, 4, 8, 16, 32, 64, 128]),
+}
+
+
+def tuning_queries(metadata, n_queries, model_name=EMBEDDING_MODEL, seed=42):
+    """
+    Up to n_queries golden and seeded synthetic query texts, encoded and
+    normalized like search queries. An indexed vector is its own nearest
+    neighbour at any efSearch / nprobe, so using them as queries overstates recall.
+    """
+    from src.search.benchmark import load_golden, synthetic_queries  # benchmark imports this module
+
+    texts = [item["query"] for item in load_golden()][:n_queries]
+    texts += synthetic_queries(metadata, n_queries - len(texts), seed)
+    queries = np.asarray(get_encoder(model_name).encode(texts, convert_to_tensor=False), dtype="float32").reshape(len(texts), -1)
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def exact_neighbours(embeddings, queries, k):
+    exact = faiss.IndexFlatIP(embeddings.shape[1])
+    exact.add(embeddings)
+    _, ids = exact.search(queries, k)
+    return ids
+
+
+def recall_at_k(approx_ids, exact_ids, k):
+    hits = [len(set(a[:k]) & set(e[:k])) for a, e in zip(approx_ids, exact_ids)]
+    return float(np.mean(hits)) / k
+
+
+def measure(index, queries, k):
+    """Search one query at a time (the serving pattern); returns ids and per-query ms."""
+    latencies = np.empty(len(queries))
+    ids = np.empty((len(queries), k), dtype="int64")
+    for i in range(len(queries)):
+        started = time.perf_counter()
+        _, found = index.search(queries[i:i + 1], k)
+        latencies[i] = (time.perf_counter() - started) * 1000
+        ids[i] = found[0]
+    return ids, latencies
+
+
+def tune(k=10, n_queries=500, target_recall=None, bundle_dir=BUNDLE_DIR):
+    bundle = load_bundle(bundle_dir, mmap=False)
+    index_type = bundle.manifest.get("index_type", "flat")
+    if index_type not in SWEEPS:
+        print(f"✨ Index type '{index_type}' is exact — nothing to tune.")
+        return None
+
+    param, values = SWEEPS[index_type]
+
+    # The bundle's vectors (else product_embeddings.npy) are addressed by FAISS id; keep only the rows in the index
+    live_ids = bundle.product_ids()
+    if bundle.vectors is not None:
+        embeddings = bundle.vectors[live_ids]
+    else:
+        embeddings = np.ascontiguousarray(load_embeddings()[live_ids])
+    faiss.normalize_L2(embeddings)
+    queries = tuning_queries(bundle.metadata, n_queries, bundle.manifest.get("model", EMBEDDING_MODEL))
+
+    # Spec chunks are part of the index, so they are part of the exact answer too
+    if bundle.chunks is not None:
+        live_ids = np.concatenate([live_ids, bundle.chunks.ids])
+        embeddings = np.vstack([embeddings, bundle.chunks.vectors])
+
+    # Map exact row positions back to the ids stored in the index
+    exact_ids = live_ids[exact_neighbours(embeddings, queries, k)]
+
+    print(f"\n🎛️ Sweeping {param} on {index_type} index ({bundle.index.ntotal} vectors, {len(queries)} queries, k={k})")
+    print(f"{param:>10} {'recall@' + str(k):>10} {'p50 ms':>9} {'p99 ms':>9}")
+
+    rows = []
+    for value in values:
+        apply_search_params(bundle.index, {param: value})
+        ids, latencies = measure(bundle.index, queries, k)
+        row = {
+            param: value,
+            "recall": recall_at_k(ids, exact_ids, k),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+        }
+        rows.append(row)
+        print(f"{value:>10} {row['recall']:>10.4f} {row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+
+    if target_recall is None:
+        return rows
+
+    chosen = next((row for row in rows if row["recall"] >= target_recall), rows[-1])
+    if chosen["recall"] < target_recall:
+        print(f"⚠️ No setting reached recall {target_recall}; using the largest {param}")
+
+    update_manifest(bundle_dir, {
+        "search_params": {param: chosen[param]},
+        "tuning": {"k": k, "target_recall": target_recall, **chosen},
+    })
+    print(f"💾 Persisted {param}={chosen[param]} (recall@{k}={chosen['recall']:.4f}, p99={chosen['p99_ms']:.3f}ms)")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep ANN search params against exact search")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500, help="Number of encoded golden + synthetic queries")
+    parser.add_argument("--target-recall", type=float, default=None, help="Persist the cheapest setting reaching this recall")
+    args = parser.parse_args()
+    tune(k=args.k, n_queries=args.queries, target_recall=args.target_recall)
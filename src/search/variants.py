@@ -0,0 +1,118 @@
+"""
+Collapsed variants: one vector per configurable product, variants resolved after retrieval.
+
+flatten_products emits a configurable's parent and every child, and the
+children carry the parent's description (propagate_parent_attrs), so their
+vectors are near-duplicates that differ only in SKU and length. In a bundle
+built with --collapse-variants the index holds one vector per group:
+
+    group           parent_sku when set (the parent row joins its children),
+                    else the embedded text: only rows whose vectors are the
+                    same collapse, never products that merely share a SKU stem
+    representative  the group's parent row when the catalog has one, else its first row
+    members         one row per distinct variant SKU
+
+Metadata, SKU, BM25 and attribute lookups still cover every product id, so
+SKU queries return the exact variant and a lexical hit on a variant counts for
+its group; a vector hit is expanded into its members with their lengths ("one
+product, 12 lengths"). Filters apply per variant: a group is searched when any
+member passes, and only passing members are listed.
+
+VariantTable (variants/ in the bundle) keeps the groups CSR-style.
+"""
+
+import numpy as np
+
+from src.search.attribute_store import IdFilter
+from src.storage.array_dir import load_arrays, save_arrays
+
+def variant_groups(products, ids, texts):
+    """
+    [(representative id, [member ids], [every id in the group])] in catalog
+    order; members are one id per distinct SKU besides the parent. `texts`
+    are the embedded texts of the products.
+    """
+    ids = np.asarray(ids, dtype="int64").tolist()
+    parent_skus = {p["parent_sku"] for p in products if p.get("parent_sku")}
+    groups = {}
+    for faiss_id, p, text in zip(ids, products, texts):
+        parent_sku = p.get("parent_sku") or (p["sku"] if p["sku"] in parent_skus else None)
+        key = ("parent", parent_sku) if parent_sku else ("text", text)
+        groups.setdefault(key, []).append((faiss_id, p["sku"]))
+
+    collapsed = []
+    for (kind, key), rows in groups.items():
+        parent = next((faiss_id for faiss_id, sku in rows if sku == key), None) if kind == "parent" else None
+        # The parent is the group's own product, not one of its variants
+        members, seen = [], ({key} if parent is not None else set())
+        for faiss_id, sku in rows:
+            if sku not in seen:
+                seen.add(sku)
+                members.append(faiss_id)
+        group_ids = [faiss_id for faiss_id, _ in rows]
+        if parent is None:
+            # Without a parent row the first variant stands in; a lone one is just a product
+            collapsed.append((members[0], members if len(members) > 1 else [], group_ids))
+        else:
+            collapsed.append((parent, members, group_ids))
+    return collapsed
+
+
+class GroupFilter(IdFilter):
+    """Filter over a collapsed index: admits each representative with a passing member."""
+
+    def __init__(self, bitmap, n_ids, member_filter):
+        super().__init__(bitmap, n_ids)
+        self.member_filter = member_filter  # the per-product filter the groups were derived from
+
+
+class VariantTable:
+    def __init__(self, rep_ids, offsets, member_ids, owners):
+        self.rep_ids = rep_ids        # int64 representative id per group, ascending
+        self.offsets = offsets        # int64[n_groups + 1]: members of group g are member_ids[offsets[g]:offsets[g + 1]]
+        self.member_ids = member_ids  # int64 variant ids, grouped
+        self.owners = owners          # int64 representative id per product id (-1 where there is no product)
+
+    @classmethod
+    def build(cls, groups):
+        groups = sorted(groups)
+        rep_ids = np.array([rep for rep, _, _ in groups], dtype="int64")
+        offsets = np.zeros(len(groups) + 1, dtype="int64")
+        offsets[1:] = np.cumsum([len(members) for _, members, _ in groups])
+        member_ids = np.array([i for _, members, _ in groups for i in members], dtype="int64")
+
+        rows = [np.asarray(ids, dtype="int64") for _, _, ids in groups]
+        owners = np.full(max((int(r.max()) for r in rows), default=-1) + 1, -1, dtype="int64")
+        for rep, group_ids in zip(rep_ids.tolist(), rows):
+            owners[group_ids] = rep
+        return cls(rep_ids, offsets, member_ids, owners)
+
+    def __len__(self):
+        return len(self.rep_ids)
+
+    def representatives(self, ids):
+        """Representative id of each product id."""
+        return self.owners[np.asarray(ids, dtype="int64")]
+
+    def members(self, rep_id):
+        """Variant ids of a representative (empty for products without variants)."""
+        group = int(np.searchsorted(self.rep_ids, rep_id))
+        if group == len(self.rep_ids) or self.rep_ids[group] != rep_id:
+            return self.member_ids[:0]
+        return self.member_ids[self.offsets[group]:self.offsets[group + 1]]
+
+    def group_filter(self, id_filter):
+        """GroupFilter admitting the representatives of the products id_filter admits."""
+        ids = id_filter.ids()
+        reps = self.representatives(ids[ids < len(self.owners)])
+        mask = np.zeros(id_filter.n_ids, dtype=bool)
+        mask[reps[reps != -1]] = True
+        return GroupFilter(np.packbits(mask, bitorder="little"), id_filter.n_ids, id_filter)
+
+    def save(self, path):
+        save_arrays(path, rep_ids=self.rep_ids, offsets=self.offsets, member_ids=self.member_ids, owners=self.owners)
+
+    @classmethod
+    def load(cls, path):
+        data = load_arrays(path)
+        return cls(data["rep_ids"], data["offsets"], data["member_ids"], data["owners"])
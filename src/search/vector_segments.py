@@ -0,0 +1,97 @@
+"""
+Exact float vectors of a bundle version, addressed by FAISS id.
+
+A build links the embedder's product_embeddings.npy into the version as the
+base (vectors.npy, row = id). A refresh never rewrites it: the rows it embeds
+become a segment (vectors.<n>/ holding ids.npy and vectors.npy), and the new
+version links the base and the earlier segments, so the I/O of a refresh is
+proportional to its delta. A lookup takes an id's row from the newest segment
+holding it, else from the base.
+
+Past MAX_SEGMENTS the segments are merged into one; that costs the rows
+refreshed since the build, not the catalog. A full build starts a new base.
+"""
+
+import numpy as np
+from pathlib import Path
+
+from src.storage.array_dir import link_or_copy, load_arrays, save_arrays
+
+VECTORS_NAME = "vectors.npy"
+SEGMENT_PREFIX = "vectors."
+MAX_SEGMENTS = 8
+
+
+class VectorSegments:
+    def __init__(self, base_path, segments=()):
+        self.base_path = Path(base_path)                 # .npy file of the base rows, linked into every version
+        self.base = np.load(self.base_path, mmap_mode="r")
+        self.segments = list(segments)                   # [(ids ascending, vectors, source directory or None)], oldest first
+
+    @classmethod
+    def load(cls, bundle_dir, manifest):
+        bundle_dir = Path(bundle_dir)
+        segments = []
+        for name in manifest.get("vector_segments") or []:
+            data = load_arrays(bundle_dir / name)
+            segments.append((data["ids"], data["vectors"], bundle_dir / name))
+        return cls(bundle_dir / manifest["vectors_file"], segments)
+
+    @property
+    def dim(self):
+        return self.base.shape[1]
+
+    @property
+    def shape(self):
+        """(ids addressable, dim)."""
+        n = max([len(self.base)] + [int(ids[-1]) + 1 for ids, _, _ in self.segments if len(ids)])
+        return n, self.dim
+
+    def __getitem__(self, ids):
+        """Float32 rows of an id array; raises KeyError for ids without a stored vector."""
+        ids = np.asarray(ids, dtype="int64")
+        out = np.zeros((len(ids), self.dim), dtype="float32")
+        found = (ids >= 0) & (ids < len(self.base))
+        out[found] = self.base[ids[found]]
+        for seg_ids, vectors, _ in self.segments:
+            if not len(seg_ids):
+                continue
+            pos = np.minimum(np.searchsorted(seg_ids, ids), len(seg_ids) - 1)
+            hit = seg_ids[pos] == ids
+            out[hit] = vectors[pos[hit]]
+            found |= hit
+        if not found.all():
+            raise KeyError(f"❌ No stored vector for ids {ids[~found][:5].tolist()}")
+        return out
+
+    def with_rows(self, ids, vectors):
+        """Copy with `vectors` stored for `ids` as a new segment (all segments merged past MAX_SEGMENTS)."""
+        ids = np.asarray(ids, dtype="int64")
+        order = np.argsort(ids, kind="stable")
+        segments = self.segments + [(ids[order], np.asarray(vectors, dtype="float32")[order], None)]
+        if len(segments) > MAX_SEGMENTS:
+            segments = [merge_segments(segments)]
+        return VectorSegments(self.base_path, segments)
+
+    def save(self, bundle_dir):
+        """Link the base and on-disk segments into a bundle version, write the new ones; returns the manifest entries."""
+        bundle_dir = Path(bundle_dir)
+        link_or_copy(self.base_path, bundle_dir / VECTORS_NAME)
+        names = []
+        for n, (ids, vectors, source) in enumerate(self.segments):
+            name = f"{SEGMENT_PREFIX}{n}"
+            if source is not None:
+                link_or_copy(source, bundle_dir / name)
+            else:
+                save_arrays(bundle_dir / name, ids=ids, vectors=vectors)
+            names.append(name)
+        return {"vectors_file": VECTORS_NAME, "vector_segments": names}
+
+
+def merge_segments(segments):
+    """One segment holding the newest vector of every id in `segments` (oldest first)."""
+    ids = np.concatenate([seg_ids for seg_ids, _, _ in segments])
+    vectors = np.concatenate([np.asarray(seg_vectors, dtype="float32") for _, seg_vectors, _ in segments])
+    # Last occurrence wins: unique over the reversed order keeps the newest row of each id
+    unique, first = np.unique(ids[::-1], return_index=True)
+    return unique, vectors[::-1][first], None
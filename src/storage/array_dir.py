@@ -0,0 +1,44 @@
+"""
+Bundle parts stored as a directory of plain .npy files, one per array.
+
+np.load of an .npz archive reads every array into memory, in every worker.
+A .npy file opens with mmap_mode="r" instead: nothing is read up front, and
+the OS page cache shares the pages between processes.
+
+    save_arrays(bundle / "skus", keys=keys, ids=ids)
+    load_arrays(bundle / "skus")["keys"]      # read-only memmap
+"""
+
+import os
+import shutil
+import numpy as np
+from pathlib import Path
+
+
+def save_arrays(path, **arrays):
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(path / f"{name}.npy", np.asarray(array))
+
+
+def load_arrays(path, mmap=True):
+    """{name: array} of a directory written by save_arrays, memory-mapped read-only by default."""
+    path = Path(path)
+    if not path.is_dir():
+        raise FileNotFoundError(f"❌ Array directory missing: {path}")
+    return {file.stem: np.load(file, mmap_mode="r" if mmap else None) for file in sorted(path.glob("*.npy"))}
+
+
+def link_or_copy(source, target):
+    """Hard-link a file or directory tree into place (copied where links fail)."""
+    # Published files are never written in place, so a hard link is a safe snapshot
+    if Path(source).is_dir():
+        Path(target).mkdir()
+        for path in Path(source).iterdir():
+            link_or_copy(path, Path(target) / path.name)
+        return
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
@@ -0,0 +1,131 @@
+"""
+Id-keyed product metadata store (SQLite).
+
+Maps the FAISS int64 id of every product to its metadata row, so lookups
+never rely on a JSON list lining up with the index rows, and nothing is
+loaded up front: SQLite reads the pages a lookup touches (memory-mapped, so
+the OS page cache is shared by workers). A result page is fetched with one
+bulk query.
+
+    store = ProductStore()                  # data/embeddings/product_metadata.sqlite, read-only
+    store.get_many([412, 7, 1093])          # rows in the order asked, None for unknown ids
+
+The file is written once per index build (write_product_store) into a
+temporary file that replaces the old one atomically, so readers never see a
+half-written table. Search bundles keep the same rows in their own mmap'd
+metadata.bin (src/search/index_bundle.py); this store serves the standalone
+faiss_index.bin.
+"""
+
+import os
+import sqlite3
+import threading
+import numpy as np
+from pathlib import Path
+
+from src.storage.models.product_schema import (
+    CREATE_PRODUCTS, PRODUCT_FIELDS, PRODUCTS_TABLE, SELECT_COLUMNS, product_record, product_row,
+)
+
+PRODUCT_DB_FILE = Path("data/embeddings/product_metadata.sqlite")
+
+_BATCH = 500  # stays below SQLite's bound-parameter limit
+_MMAP_BYTES = 256 << 20
+
+
+def write_product_store(metadata, ids=None, path=PRODUCT_DB_FILE):
+    """Write metadata dicts keyed by `ids` (row positions when omitted), replacing the store atomically."""
+    path = Path(path)
+    ids = np.arange(len(metadata), dtype="int64") if ids is None else np.asarray(ids, dtype="int64")
+    if len(ids) != len(metadata):
+        raise ValueError(f"❌ {len(ids)} ids for {len(metadata)} metadata rows")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(str(tmp))
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute(CREATE_PRODUCTS)
+        placeholders = ",".join("?" * (len(PRODUCT_FIELDS) + 1))
+        conn.executemany(
+            f"INSERT INTO {PRODUCTS_TABLE} ({SELECT_COLUMNS}) VALUES ({placeholders})",
+            (product_row(faiss_id, item) for faiss_id, item in zip(ids.tolist(), metadata)),
+        )
+        conn.commit()
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"❌ Duplicate FAISS id in product metadata ({e})")
+    finally:
+        conn.close()
+
+    os.replace(tmp, path)
+    print(f"🗄️ Product metadata store written → {path} ({len(ids)} rows)")
+    return path
+
+
+class ProductStore:
+    """Read-only view of a product metadata store; safe to share between threads."""
+
+    def __init__(self, path=PRODUCT_DB_FILE):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"❌ Product metadata store missing: {self.path}")
+        self._local = threading.local()
+        self._ids = None
+        self.n_rows = self._conn().execute(f"SELECT COUNT(*) FROM {PRODUCTS_TABLE}").fetchone()[0]
+
+    def _conn(self):
+        # sqlite3 connections belong to the thread that opened them; each thread gets its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            conn.execute(f"PRAGMA mmap_size={_MMAP_BYTES}")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self.n_rows
+
+    def __iter__(self):
+        rows = self._conn().execute(f"SELECT {SELECT_COLUMNS} FROM {PRODUCTS_TABLE} ORDER BY id")
+        for row in rows:
+            yield product_record(row)
+
+    def __getitem__(self, row):
+        """Row by position in id order (for callers that walk the table; lookups go by id)."""
+        if row < 0:
+            row += self.n_rows
+        if not 0 <= row < self.n_rows:
+            raise IndexError(row)
+        found = self._conn().execute(
+            f"SELECT {SELECT_COLUMNS} FROM {PRODUCTS_TABLE} ORDER BY id LIMIT 1 OFFSET ?", (row,)
+        ).fetchone()
+        return product_record(found)
+
+    @property
+    def ids(self):
+        """Every id, ascending (read on first use)."""
+        if self._ids is None:
+            rows = self._conn().execute(f"SELECT id FROM {PRODUCTS_TABLE} ORDER BY id").fetchall()
+            self._ids = np.array([faiss_id for faiss_id, in rows], dtype="int64")
+        return self._ids
+
+    def get_by_id(self, faiss_id):
+        found = self._conn().execute(
+            f"SELECT {SELECT_COLUMNS} FROM {PRODUCTS_TABLE} WHERE id = ?", (int(faiss_id),)
+        ).fetchone()
+        return None if found is None else product_record(found)
+
+    def get_many(self, ids):
+        """Rows for a list of ids in the same order (None where an id is unknown), in one query per 500 ids."""
+        ids = [int(faiss_id) for faiss_id in ids]
+        found = {}
+        unique = list(dict.fromkeys(ids))
+        for start in range(0, len(unique), _BATCH):
+            chunk = unique[start:start + _BATCH]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn().execute(f"SELECT {SELECT_COLUMNS} FROM {PRODUCTS_TABLE} WHERE id IN ({placeholders})", chunk)
+            for row in rows:
+                found[row[0]] = product_record(row)
+        return [found.get(faiss_id) for faiss_id in ids]
@@ -0,0 +1,36 @@
+"""
+Product metadata table of the SQLite store (src/storage/db_manager.py).
+
+Rows are keyed by the product's FAISS id: `id INTEGER PRIMARY KEY` aliases the
+rowid, so a point lookup is one B-tree descent and never depends on row order.
+"""
+
+PRODUCTS_TABLE = "products"
+
+# Same fields (and order) as the bundle's metadata.bin (src/search/index_bundle.py)
+PRODUCT_FIELDS = ("product_id", "sku", "name", "content_hash")
+
+CREATE_PRODUCTS = f"""
+CREATE TABLE IF NOT EXISTS {PRODUCTS_TABLE} (
+    id           INTEGER PRIMARY KEY,
+    product_id   TEXT,
+    sku          TEXT NOT NULL,
+    name         TEXT,
+    content_hash TEXT
+)
+"""
+
+SELECT_COLUMNS = ", ".join(("id",) + PRODUCT_FIELDS)
+
+
+def product_row(faiss_id, item):
+    """INSERT parameters for one metadata dict; values are stored as text, like metadata.bin."""
+    return (int(faiss_id),) + tuple(None if item.get(name) is None else str(item.get(name)) for name in PRODUCT_FIELDS)
+
+
+def product_record(row):
+    """Metadata dict of a SELECT_COLUMNS row, shaped like MetadataTable's rows."""
+    faiss_id, *values = row
+    record = {name: "" if value is None else value for name, value in zip(PRODUCT_FIELDS, values)}
+    record["id"] = faiss_id
+    return record
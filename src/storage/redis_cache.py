@@ -0,0 +1,133 @@
+"""
+Redis access for caches, with an in-process stand-in when Redis is unavailable.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from src.core.config import QUERY_CACHE_LRU_SIZE, REDIS_URL
+
+try:
+    import redis
+except ImportError:  # optional dependency
+    redis = None
+
+# What a cache read or write may raise at runtime (timeouts, dropped connections); empty without redis-py
+REDIS_ERRORS = (redis.RedisError,) if redis is not None else ()
+
+
+class InMemoryRedis:
+    """
+    Minimal stand-in for the redis-py calls used by the caches (get/set/delete with TTL).
+
+    Bounded like the LRU tier in front of it: a set evicts the least recently
+    used keys beyond `maxsize`, and expired keys are purged on writes (at most
+    once per PURGE_INTERVAL seconds), not only when they are read again.
+    """
+
+    PURGE_INTERVAL = 60
+
+    def __init__(self, maxsize=QUERY_CACHE_LRU_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_purge = time.monotonic() + self.PURGE_INTERVAL
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ex=None):
+        now = time.monotonic()
+        expires_at = now + ex if ex else None
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        with self._lock:
+            if now >= self._next_purge:
+                self._purge_expired(now)
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return True
+
+    def _purge_expired(self, now):
+        expired = [key for key, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self._data[key]
+        self._next_purge = now + self.PURGE_INTERVAL
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def ping(self):
+        return True
+
+    def __len__(self):
+        return len(self._data)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis(url=None):
+    """Shared Redis client; falls back to InMemoryRedis when Redis is missing or unreachable."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            return _client
+
+        url = url or REDIS_URL
+        if redis is not None and url:
+            try:
+                client = redis.Redis.from_url(url, socket_timeout=0.05)
+                client.ping()
+                print(f"🧰 Redis cache connected → {url}")
+                _client = client
+                return _client
+            except redis.RedisError as e:
+                print(f"⚠️ Redis unavailable at {url} ({e}); using in-memory cache")
+
+        _client = InMemoryRedis()
+        return _client
+
+
+class LRUCache:
+    """Bounded, thread-safe in-process LRU."""
+
+    def __init__(self, maxsize=10_000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,75 @@
+import faiss
+import numpy as np
+import pytest
+
+from src.search.attribute_store import AttributeStore, IdFilter, parse_query_filters, product_attributes
+from src.search.index_bundle import search_parameters
+
+PRODUCTS = [
+    {"material": "Aluminium", "category_id": "61.0", "dimensions": {"length_mm": [400]}, "capacity": {"value": 300, "unit": "kg"}},
+    {"material": "Steel", "category_id": 61, "dimensions": {"length_mm": [250]}, "capacity": {"value": 45, "unit": "kg"}},
+    {"material": "aluminium", "category_id": 12, "dimensions": "{'length_mm': [600]}", "capacity": {"value": 100, "unit": "lbs"},
+     "corrosion_resistant": True},
+    {"material": None, "category_id": None},
+]
+IDS = [0, 1, 5, 9]
+
+
+def make_store():
+    return AttributeStore.build(PRODUCTS, IDS)
+
+
+def test_product_attributes():
+    attrs = product_attributes(PRODUCTS[2])
+    assert attrs["material"] == "aluminium"
+    assert attrs["category_id"] == "12"
+    assert attrs["length_mm"] == 600
+    assert attrs["capacity_kg"] == pytest.approx(45.359237)
+    assert attrs["corrosion_resistant"] == "true"
+
+
+def test_compile_categorical_and_numeric():
+    store = make_store()
+    assert store.compile({"material": "ALUMINIUM"}).ids().tolist() == [0, 5]
+    assert store.compile({"category_id": "61"}).ids().tolist() == [0, 1]
+    assert store.compile({"material": ["steel", "aluminium"], "min_length_mm": 300}).ids().tolist() == [0, 5]
+    # Unknown values never pass a bound
+    assert store.compile({"max_capacity_kg": 1000}).ids().tolist() == [0, 1, 5]
+
+
+def test_compile_nothing_and_unknown_filter():
+    store = make_store()
+    assert store.compile({}) is None
+    assert store.compile({"material": None}) is None
+    with pytest.raises(ValueError):
+        store.compile({"colour": "red"})
+
+
+def test_contains_and_extra_ids():
+    id_filter = make_store().compile({"material": "steel"}).include([1 << 40])
+    assert id_filter.contains([0, 1, 9, 1 << 40, -1, 10 ** 6]).tolist() == [False, True, False, True, False, False]
+    assert id_filter.ids().tolist() == [1, 1 << 40]
+
+
+def test_selector_restricts_faiss_search():
+    vectors = np.eye(10, 4, dtype="float32")
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(4))
+    index.add_with_ids(vectors, np.arange(10, dtype="int64"))
+
+    mask = np.zeros(10, dtype=bool)
+    mask[[2, 7]] = True
+    id_filter = IdFilter(np.packbits(mask, bitorder="little"), 10)
+    _, ids = index.search(vectors[:1], 10, params=search_parameters(index, id_filter.selector))
+    assert sorted(i for i in ids[0].tolist() if i != -1) == [2, 7]
+
+
+def test_save_load_roundtrip(tmp_path):
+    path = tmp_path / "attributes"
+    make_store().save(path)
+    assert AttributeStore.load(path).compile({"material": "aluminium"}).ids().tolist() == [0, 5]
+
+
+def test_parse_query_filters():
+    filters = parse_query_filters("aluminium slide over 400mm that holds 300kg", materials=["steel", "aluminium"])
+    assert filters == {"material": "aluminium", "min_length_mm": 400, "min_capacity_kg": 300}
+    assert parse_query_filters("50 cm slide") == {"min_length_mm": 500, "max_length_mm": 500}
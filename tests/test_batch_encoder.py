@@ -0,0 +1,75 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.search.batch_encoder import MicroBatchEncoder
+
+DIM = 4
+
+
+class FakeEncoder:
+    """Vector [len(text), 1, 0, 0] per text; records the batches it was called with."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def encode(self, texts, batch_size=32, convert_to_tensor=False):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return np.array([[len(text), 1, 0, 0] for text in texts], dtype="float32")
+
+
+async def encode_concurrently(encoder, texts):
+    try:
+        return await asyncio.gather(*(encoder.encode(text) for text in texts), return_exceptions=True)
+    finally:
+        await encoder.stop()
+
+
+def test_concurrent_queries_share_one_forward_pass():
+    model = FakeEncoder()
+    encoder = MicroBatchEncoder(model, max_batch_size=8, max_wait_ms=50, normalize=False)
+    texts = ["a", "bb", "ccc"]
+
+    vectors = asyncio.run(encode_concurrently(encoder, texts))
+
+    assert model.batches == [texts]
+    # Every caller gets its own row
+    assert [v.shape for v in vectors] == [(1, DIM)] * 3
+    assert [float(v[0, 0]) for v in vectors] == [1, 2, 3]
+    assert encoder.metrics.snapshot()["batch_size_histogram"] == {3: 1}
+
+
+def test_batches_are_capped_at_max_batch_size():
+    model = FakeEncoder()
+    encoder = MicroBatchEncoder(model, max_batch_size=2, max_wait_ms=50, normalize=False)
+
+    asyncio.run(encode_concurrently(encoder, ["a", "b", "c", "d", "e"]))
+
+    assert [len(batch) for batch in model.batches] == [2, 2, 1]
+    assert encoder.metrics.snapshot()["max_batch_size"] == 2
+
+
+def test_vectors_are_normalized():
+    encoder = MicroBatchEncoder(FakeEncoder(), max_wait_ms=1)
+    (vector,) = asyncio.run(encode_concurrently(encoder, ["abc"]))
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+
+
+def test_model_error_fails_the_batch_not_the_worker():
+    model = FakeEncoder(fail=True)
+    encoder = MicroBatchEncoder(model, max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        failed = await asyncio.gather(encoder.encode("a"), encoder.encode("b"), return_exceptions=True)
+        model.fail = False
+        recovered = await encoder.encode("c")
+        await encoder.stop()
+        return failed, recovered
+
+    failed, recovered = asyncio.run(run())
+    assert all(isinstance(e, RuntimeError) for e in failed)
+    assert recovered.shape == (1, DIM)
@@ -0,0 +1,41 @@
+import sys
+
+import numpy as np
+
+from src.core import model_registry
+from src.embeddings import bulk_encoder
+from src.embeddings.bulk_encoder import bulk_encode, token_lengths
+
+
+class FakeEncoder:
+    """Vector [word count, first letter] per text; records the batches it was called with."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32):
+        self.batches.append(list(texts))
+        return np.array([[len(t.split()), ord(t[0])] for t in texts], dtype="float32")
+
+
+def test_vectors_come_back_in_input_order(monkeypatch):
+    encoder = FakeEncoder()
+    monkeypatch.setattr(model_registry, "get_encoder", lambda model_name, backend, device: encoder)
+    monkeypatch.setattr(bulk_encoder, "token_lengths", lambda texts, model_name, backend: np.array([len(t.split()) for t in texts]))
+    texts = ["a", "b b b", "c c", "a", "d d d d", "b b b"]
+
+    vectors = bulk_encode(texts, "fake-model", backend="torch", device="cpu", workers=1, batch_size=2)
+
+    expected = FakeEncoder().encode(texts)
+    np.testing.assert_array_equal(vectors, expected)
+    # Duplicates are encoded once, longest texts first
+    assert encoder.batches == [["d d d d", "b b b"], ["c c", "a"]]
+
+
+def test_empty_input():
+    assert bulk_encode([], "fake-model").shape == (0, 0)
+
+
+def test_token_lengths_fall_back_to_word_counts(monkeypatch):
+    monkeypatch.setitem(sys.modules, "transformers", None)  # import fails like an install without it
+    assert token_lengths(["drawer slide", "x " * 600], "fake-model", backend="torch").tolist() == [2, 512]
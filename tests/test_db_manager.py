@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from src.storage.db_manager import ProductStore, write_product_store
+
+METADATA = [
+    {"product_id": "p1", "sku": "DZ1", "name": "Slide one", "content_hash": "a"},
+    {"product_id": "p2", "sku": "DZ2", "name": None, "content_hash": "b"},
+    {"product_id": 3, "sku": "DZ3", "name": "Slide three", "content_hash": "c"},
+]
+IDS = [40, 7, 1093]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProductStore(write_product_store(METADATA, IDS, path=tmp_path / "products.sqlite"))
+
+
+def test_get_many_keeps_request_order(store):
+    rows = store.get_many([1093, 7, 999, 40, 7])
+    assert [row and row["sku"] for row in rows] == ["DZ3", "DZ2", None, "DZ1", "DZ2"]
+    assert rows[0]["id"] == 1093 and rows[0]["product_id"] == "3"
+    assert rows[1]["name"] == ""
+    assert store.get_many([]) == []
+
+
+def test_get_many_spans_batches(tmp_path):
+    metadata = [{"product_id": str(i), "sku": f"DZ{i}", "name": "", "content_hash": ""} for i in range(1200)]
+    store = ProductStore(write_product_store(metadata, path=tmp_path / "products.sqlite"))
+    ids = list(range(1199, -1, -1))
+    assert [row["id"] for row in store.get_many(ids)] == ids
+
+
+def test_lookups_by_id_and_position(store):
+    assert len(store) == 3
+    assert store.ids.tolist() == [7, 40, 1093]
+    assert store.get_by_id(40)["sku"] == "DZ1"
+    assert store.get_by_id(41) is None
+    assert store[0]["id"] == 7 and store[-1]["id"] == 1093
+    assert [row["id"] for row in store] == [7, 40, 1093]
+    with pytest.raises(IndexError):
+        store[3]
+
+
+def test_threads_get_their_own_connection(store):
+    found = []
+    thread = threading.Thread(target=lambda: found.extend(store.get_many([7, 40])))
+    thread.start()
+    thread.join()
+    assert [row["sku"] for row in found] == ["DZ2", "DZ1"]
+
+
+def test_write_rejects_bad_ids(tmp_path):
+    with pytest.raises(ValueError):
+        write_product_store(METADATA, [1, 2], path=tmp_path / "products.sqlite")
+    with pytest.raises(ValueError):
+        write_product_store(METADATA, [1, 1, 2], path=tmp_path / "products.sqlite")
+
+
+def test_missing_store(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ProductStore(tmp_path / "missing.sqlite")
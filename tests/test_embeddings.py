@@ -0,0 +1,151 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.embeddings import embedder as embedder_module
+from src.embeddings.embedder import CHECKPOINT_FILE, META_FILE, OUTPUT_FILE, ProductEmbedder, content_hash
+from src.embeddings.ranker import BM25Index, reciprocal_rank_fusion, tokenize
+from src.search.attribute_store import IdFilter
+
+DOCS = [
+    "DZ4501-0070 aluminium drawer slide 400 mm",
+    "steel locking slide heavy duty",
+    "aluminium profile rail",
+    "drawer slide drawer slide soft close",
+]
+IDS = [100, 101, 205, 300]
+
+
+def make_index():
+    return BM25Index.build(DOCS, IDS)
+
+
+def test_tokenize_splits_part_numbers_and_units():
+    tokens = tokenize("DZ4501-0070 Slide 400 mm")
+    assert "dz4501-0070" in tokens and "dz4501" in tokens and "0070" in tokens
+    assert "400mm" in tokens
+
+
+def test_bm25_ranks_term_matches():
+    ids, scores = make_index().search("drawer slide", top_k=10)
+    assert ids[0] == 300  # repeats both terms
+    assert set(ids.tolist()) == {100, 101, 300}
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_bm25_part_number_segment():
+    ids, _ = make_index().search("dz4501", top_k=5)
+    assert ids.tolist() == [100]
+
+
+def test_bm25_unknown_terms_and_top_k():
+    index = make_index()
+    ids, scores = index.search("hinge", top_k=5)
+    assert len(ids) == 0 and len(scores) == 0
+    assert len(index.search("slide", top_k=2)[0]) == 2
+
+
+def test_bm25_scores_do_not_leak_between_queries():
+    index = make_index()
+    first = index.search("aluminium", top_k=5)
+    index.search("drawer slide", top_k=5)
+    again = index.search("aluminium", top_k=5)
+    assert first[0].tolist() == again[0].tolist()
+    np.testing.assert_allclose(first[1], again[1])
+
+
+def test_bm25_id_filter():
+    mask = np.zeros(301, dtype=bool)
+    mask[[101, 205]] = True
+    id_filter = IdFilter(np.packbits(mask, bitorder="little"), 301)
+    ids, _ = make_index().search("aluminium slide", top_k=5, id_filter=id_filter)
+    assert sorted(ids.tolist()) == [101, 205]
+
+
+def test_bm25_save_load_roundtrip(tmp_path):
+    path = tmp_path / "bm25"
+    make_index().save(path)
+    ids, scores = BM25Index.load(path).search("drawer slide", top_k=10)
+    expected_ids, expected_scores = make_index().search("drawer slide", top_k=10)
+    assert ids.tolist() == expected_ids.tolist()
+    np.testing.assert_allclose(scores, expected_scores)
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+    assert [doc_id for doc_id, _ in fused] == [1, 3, 2]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+    assert reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60, top_k=1) == fused[:1]
+    assert reciprocal_rank_fusion([]) == []
+
+
+class ScriptedEmbedder(ProductEmbedder):
+    """Row-numbered vectors instead of a model; optionally fails on the n-th chunk."""
+
+    def __init__(self, fail_at_chunk=None):
+        super().__init__()
+        self.fail_at_chunk = fail_at_chunk
+        self.encoded = []
+
+    def encode_with_cache(self, texts):
+        if self.fail_at_chunk is not None and len(self.encoded) == self.fail_at_chunk:
+            raise RuntimeError("simulated crash")
+        self.encoded.append(list(texts))
+        return np.array([[float(text.split()[-1]), 1.0] for text in texts], dtype="float32")
+
+
+def catalog(n):
+    texts = [f"slide {i}" for i in range(n)]
+    metadata = [{"product_id": str(i), "sku": f"DZ{i}", "name": text, "content_hash": content_hash(text)}
+                for i, text in enumerate(texts)]
+    return texts, metadata
+
+
+@pytest.fixture
+def embedding_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(embedder_module, "resolved_revision", lambda model_name: "c0ffee")
+    OUTPUT_FILE.parent.mkdir(parents=True)
+
+
+def test_write_embeddings_resumes_after_last_checkpoint(embedding_dir):
+    texts, metadata = catalog(7)
+    with pytest.raises(RuntimeError):
+        ScriptedEmbedder(fail_at_chunk=2).write_embeddings(texts, metadata, chunk_size=3)
+    assert json.loads(CHECKPOINT_FILE.read_text())["rows_done"] == 6
+    assert not OUTPUT_FILE.exists()
+
+    embedder = ScriptedEmbedder()
+    embedder.write_embeddings(texts, metadata, chunk_size=3)
+
+    assert embedder.encoded == [["slide 6"]]  # only the chunk after the checkpoint
+    assert np.load(OUTPUT_FILE)[:, 0].tolist() == list(range(7))
+    assert json.loads(META_FILE.read_text()) == metadata
+    assert not CHECKPOINT_FILE.exists()
+
+
+def test_write_embeddings_restarts_for_another_catalog(embedding_dir):
+    texts, metadata = catalog(5)
+    with pytest.raises(RuntimeError):
+        ScriptedEmbedder(fail_at_chunk=1).write_embeddings(texts, metadata, chunk_size=2)
+
+    texts, metadata = catalog(4)
+    embedder = ScriptedEmbedder()
+    embedder.write_embeddings(texts, metadata, chunk_size=2)
+
+    assert len(embedder.encoded) == 2
+    assert np.load(OUTPUT_FILE).shape == (4, 2)
+    assert json.loads(META_FILE.read_text()) == metadata
+
+
+def test_write_embeddings_restarts_for_new_model_weights(embedding_dir, monkeypatch):
+    texts, metadata = catalog(5)
+    with pytest.raises(RuntimeError):
+        ScriptedEmbedder(fail_at_chunk=1).write_embeddings(texts, metadata, chunk_size=2)
+
+    # Same revision name, new commit behind it: the checkpoint belongs to other weights
+    monkeypatch.setattr(embedder_module, "resolved_revision", lambda model_name: "decaf0")
+    embedder = ScriptedEmbedder()
+    embedder.write_embeddings(texts, metadata, chunk_size=2)
+    assert len(embedder.encoded) == 3
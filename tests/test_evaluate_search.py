@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from src.search.evaluate_search import codes_for, ranking_metrics, relevance_matrix, sku_codes
+
+
+def test_ranking_metrics():
+    hits = np.array([
+        [False, True, False, True, False],   # two of two relevant, first at rank 2
+        [True, False, False, False, False],  # one of three relevant, at rank 1
+        [False, False, False, False, False],
+    ])
+    metrics = ranking_metrics(hits, np.array([2, 3, 1]), k_values=(1, 5, 10))
+
+    np.testing.assert_allclose(metrics["mrr"], [0.5, 1.0, 0.0])
+    np.testing.assert_allclose(metrics["precision@1"], [0, 1, 0])
+    np.testing.assert_allclose(metrics["precision@5"], [0.4, 0.2, 0])
+    np.testing.assert_allclose(metrics["recall@5"], [1.0, 1 / 3, 0])
+    assert "precision@10" not in metrics  # deeper than the retrieved rows
+
+    ideal_two = 1 + 1 / np.log2(3)
+    assert metrics["ndcg@5"][0] == pytest.approx((1 / np.log2(3) + 1 / np.log2(5)) / ideal_two)
+    assert metrics["ndcg@5"][1] == pytest.approx(1 / (ideal_two + 1 / np.log2(4)))
+    assert metrics["ndcg@1"].tolist() == [0, 1, 0]
+
+
+def test_relevance_matrix_normalizes_skus():
+    vocab = {"DZ4501": 0, "DB9000": 1, "DS4180080": 2}
+    retrieved = np.array([[2, 0, -1], [1, -1, -1]])
+    hits, n_relevant = relevance_matrix(retrieved, [["dz4501", "DS4180-080"], ["MISSING"]], vocab)
+    assert hits.tolist() == [[True, True, False], [False, False, False]]
+    assert n_relevant.tolist() == [2, 1]
+
+
+def test_sku_codes_and_codes_for():
+    vocab = {}
+    ids, codes = sku_codes([{"sku": "DZ4501"}, {"sku": "dz-4501"}, {"sku": "DB9000"}], vocab)
+    assert ids.tolist() == [0, 1, 2]
+    assert codes.tolist() == [0, 0, 1] and vocab == {"DZ4501": 0, "DB9000": 1}
+    assert codes_for(np.array([[2, -1, 7]]), ids, codes).tolist() == [[1, -1, -1]]
@@ -0,0 +1,131 @@
+import itertools
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from src.embeddings.ranker import BM25Index
+from src.search import index_bundle
+from src.search.attribute_store import AttributeStore
+from src.search.index_bundle import (
+    CURRENT_NAME, KEEP_VERSIONS, VERSIONS_DIR, bundle_exists, current_version, load_bundle,
+    read_manifest, resolve_bundle, update_manifest, write_bundle,
+)
+from src.search.sku_index import SkuIndex
+from src.search.vector_segments import VECTORS_NAME, VectorSegments
+
+DIM = 4
+METADATA = [
+    {"product_id": "p1", "sku": "DZ1", "name": "Slide one", "content_hash": "a"},
+    {"product_id": "p2", "sku": "DZ2", "name": "Slide twö", "content_hash": "b"},
+    {"product_id": "p3", "sku": "DZ3", "name": "", "content_hash": "c"},
+]
+IDS = np.array([3, 8, 20], dtype="int64")
+
+
+@pytest.fixture(autouse=True)
+def ordered_versions(monkeypatch):
+    """Deterministic, strictly increasing version names (real ones can share a second)."""
+    counter = itertools.count(1)
+    monkeypatch.setattr(index_bundle, "new_index_version", lambda: f"v{next(counter):03d}")
+
+
+def make_index():
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(DIM))
+    index.add_with_ids(np.eye(len(IDS), DIM, dtype="float32"), IDS)
+    return index
+
+
+def publish(bundle_dir, **kwargs):
+    return write_bundle(make_index(), METADATA, bundle_dir, ids=IDS, **kwargs)
+
+
+def test_write_publishes_a_version(tmp_path):
+    bundle_dir = tmp_path / "bundle"
+    assert not bundle_exists(bundle_dir)
+    assert current_version(bundle_dir) is None
+
+    manifest = publish(bundle_dir, extra_manifest={"next_id": 21})
+    assert manifest["index_version"] == "v001"
+    assert current_version(bundle_dir) == "v001"
+    assert resolve_bundle(bundle_dir) == bundle_dir / VERSIONS_DIR / "v001"
+    assert read_manifest(bundle_dir)["next_id"] == 21
+    assert not list((bundle_dir / VERSIONS_DIR).glob(".*"))  # no staging left behind
+
+    bundle = load_bundle(bundle_dir)
+    assert bundle.path == bundle_dir / VERSIONS_DIR / "v001"
+    assert bundle.product_ids().tolist() == [3, 8, 20]
+    assert bundle.metadata.get_by_id(8)["name"] == "Slide twö"
+    assert [row and row["sku"] for row in bundle.metadata.get_many([20, 4, 3])] == ["DZ3", None, "DZ1"]
+
+
+def test_rejects_index_metadata_mismatch(tmp_path):
+    with pytest.raises(ValueError):
+        write_bundle(make_index(), METADATA[:2], tmp_path / "bundle", ids=IDS[:2])
+    assert current_version(tmp_path / "bundle") is None
+
+
+def test_prune_keeps_newest_versions(tmp_path):
+    bundle_dir = tmp_path / "bundle"
+    for _ in range(KEEP_VERSIONS + 2):
+        publish(bundle_dir)
+
+    published = sorted(path.name for path in (bundle_dir / VERSIONS_DIR).iterdir())
+    assert published == [f"v{i:03d}" for i in range(3, KEEP_VERSIONS + 3)]
+    assert (bundle_dir / CURRENT_NAME).read_text() == f"v{KEEP_VERSIONS + 2:03d}"
+
+
+def test_open_version_survives_newer_publishes(tmp_path):
+    bundle_dir = tmp_path / "bundle"
+    publish(bundle_dir)
+    old = load_bundle(bundle_dir)
+    publish(bundle_dir)
+
+    assert current_version(bundle_dir) == "v002"
+    assert old.manifest["index_version"] == "v001"
+    assert old.metadata.get_by_id(3)["sku"] == "DZ1"
+
+
+def test_update_manifest_links_files_into_a_new_version(tmp_path):
+    bundle_dir = tmp_path / "bundle"
+    vectors_file = tmp_path / "product_embeddings.npy"
+    np.save(vectors_file, np.ones((21, DIM), dtype="float32"))
+    publish(bundle_dir, vectors=VectorSegments(vectors_file), extra_manifest={"rerank_factor": 4})
+
+    manifest = update_manifest(bundle_dir, {"tuned_at": "2026-10-18"})
+    assert manifest["index_version"] == "v002"
+    assert read_manifest(bundle_dir)["tuned_at"] == "2026-10-18"
+    assert read_manifest(bundle_dir)["vectors_file"] == VECTORS_NAME
+
+    old, new = bundle_dir / VERSIONS_DIR / "v001", bundle_dir / VERSIONS_DIR / "v002"
+    for name in (VECTORS_NAME, "index.faiss", "metadata.bin"):
+        assert os.stat(old / name).st_ino == os.stat(new / name).st_ino
+    assert os.stat(vectors_file).st_ino == os.stat(new / VECTORS_NAME).st_ino
+    assert load_bundle(bundle_dir).metadata.ids.tolist() == [3, 8, 20]
+
+
+def test_unversioned_directory_is_read_in_place(tmp_path):
+    bundle_dir = tmp_path / "bundle"
+    publish(bundle_dir)
+    (bundle_dir / CURRENT_NAME).unlink()
+    assert resolve_bundle(bundle_dir) == bundle_dir
+    assert not bundle_exists(bundle_dir)
+
+
+def test_parts_are_memory_mapped_and_linked_forward(tmp_path):
+    bundle_dir = tmp_path / "bundle"
+    skus = [row["sku"] for row in METADATA]
+    publish(bundle_dir, lexical=BM25Index.build([row["name"] for row in METADATA], IDS), sku_index=SkuIndex.build(skus, IDS),
+            attributes=AttributeStore.build([{"material": "steel"}] * len(IDS), IDS))
+    update_manifest(bundle_dir, {"tuned_at": "2026-10-18"})
+
+    bundle = load_bundle(bundle_dir)
+    for array in (bundle.lexical.indptr, bundle.lexical.vocab.terms, bundle.sku_index.keys, bundle.attributes.live):
+        assert isinstance(array, np.memmap)
+    assert bundle.lexical.search("one", top_k=5)[0].tolist() == [3]
+    assert bundle.sku_index.lookup("DZ2") == [(8, "exact")]
+    assert bundle.attributes.compile({"material": "steel"}).ids().tolist() == [3, 8, 20]
+
+    old, new = bundle_dir / VERSIONS_DIR / "v001", bundle_dir / VERSIONS_DIR / "v002"
+    assert os.stat(old / "skus" / "keys.npy").st_ino == os.stat(new / "skus" / "keys.npy").st_ino
@@ -0,0 +1,126 @@
+import json
+
+import faiss
+import numpy as np
+import pytest
+
+from src.embeddings.embedder import build_product_text, content_hash
+from src.search import faiss_index_refresh
+from src.search.build_faiss_index import PRODUCTS_FILE
+from src.search.faiss_index_refresh import EMBED_FILE, diff_catalog, refresh_faiss_index
+from src.search.index_bundle import load_bundle, read_manifest, write_bundle
+
+DIM = 8
+
+
+def product(sku, name):
+    return {"sku": sku, "name": name, "description": f"{name} drawer slide"}
+
+
+def row(faiss_id, p):
+    return {"id": faiss_id, "product_id": p["sku"], "sku": p["sku"], "name": p["name"],
+            "content_hash": content_hash(build_product_text(p))}
+
+
+class FakeEncoder:
+    """Deterministic vectors per text, so the test needs no model."""
+
+    def encode(self, texts, convert_to_tensor=False):
+        return np.stack([np.random.default_rng(len(text)).random(DIM, dtype="float32") for text in texts])
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    """A published three-product bundle in a scratch data/ directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(faiss_index_refresh, "get_encoder", lambda model_name: FakeEncoder())
+
+    products = [product("DZ1", "Slide one"), product("DZ2", "Slide two"), product("DZ3", "Slide three")]
+    vectors = FakeEncoder().encode([build_product_text(p) for p in products])
+    EMBED_FILE.parent.mkdir(parents=True)
+    np.save(EMBED_FILE, vectors)
+
+    ids = np.arange(3, dtype="int64")
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(DIM))
+    index.add_with_ids(vectors, ids)
+
+    def publish(extra_manifest):
+        write_bundle(index, [row(i, p) for i, p in enumerate(products)], ids=ids, extra_manifest=extra_manifest)
+
+    def write_catalog(latest):
+        PRODUCTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        PRODUCTS_FILE.write_text(json.dumps(latest))
+
+    return products, publish, write_catalog
+
+
+def test_diff_catalog():
+    old = [product("A", "Alpha"), product("B", "Beta"), product("C", "Gamma")]
+    rows = [row(0, old[0]), row(1, old[1]), row(2, old[2])]
+    latest = [old[0], product("B", "Beta v2"), product("D", "Delta")]
+
+    new, changed, deleted, unchanged = diff_catalog(rows, latest)
+    assert [p["sku"] for p, _, _ in new] == ["D"]
+    assert [(p["sku"], faiss_id) for p, _, _, faiss_id in changed] == [("B", 1)]
+    assert [r["id"] for r in deleted] == [2]
+    assert [(p["sku"], faiss_id) for p, faiss_id in unchanged] == [("A", 0)]
+
+
+def test_diff_catalog_matches_repeated_skus_in_order():
+    # The catalog repeats variants; the build gave each repeat its own id
+    first, second = product("A", "Alpha"), product("A", "Alpha long")
+    rows = [row(0, first), row(1, product("B", "Beta")), row(2, second)]
+
+    new, changed, deleted, unchanged = diff_catalog(rows, [first, product("B", "Beta"), second])
+    assert (new, changed, deleted) == ([], [], [])
+    assert [faiss_id for _, faiss_id in unchanged] == [0, 1, 2]
+
+    new, changed, deleted, _ = diff_catalog(rows, [first, product("B", "Beta")])
+    assert (new, changed, [r["id"] for r in deleted]) == ([], [], [2])
+
+    new, _, _, _ = diff_catalog(rows, [first, product("B", "Beta"), second, second])
+    assert [p["name"] for p, _, _ in new] == ["Alpha long"]
+
+
+def test_refresh_keeps_ids_and_continues_after_next_id(catalog):
+    products, publish, write_catalog = catalog
+    publish({"next_id": 3})
+    changed = dict(products[1], name="Slide two v2")
+    write_catalog([products[0], changed, product("DZ4", "Slide four")])
+
+    refresh_faiss_index()
+
+    bundle = load_bundle()
+    assert bundle.metadata.ids.tolist() == [0, 1, 3]
+    assert [r["sku"] for r in bundle.metadata] == ["DZ1", "DZ2", "DZ4"]
+    assert bundle.metadata.get_by_id(1)["name"] == "Slide two v2"
+    assert bundle.manifest["next_id"] == 4
+    assert sorted(faiss.vector_to_array(bundle.index.id_map).tolist()) == [0, 1, 3]
+
+    # The embedded rows became a segment of the new version; the embedder's file is not rewritten
+    assert bundle.manifest["vector_segments"] == ["vectors.0"]
+    assert bundle.vectors.shape == (4, DIM) and np.load(EMBED_FILE).shape == (3, DIM)
+    expected = FakeEncoder().encode([build_product_text(p) for p in (products[0], changed, product("DZ4", "Slide four"))])
+    np.testing.assert_allclose(bundle.vectors[[0, 1, 3]], expected)
+
+
+def test_refresh_without_next_id_continues_after_highest_id(catalog):
+    products, publish, write_catalog = catalog
+    publish({})
+    write_catalog(products + [product("DZ5", "Slide five")])
+
+    refresh_faiss_index()
+
+    assert load_bundle().metadata.ids.tolist() == [0, 1, 2, 3]
+    assert read_manifest()["next_id"] == 4
+
+
+def test_refresh_without_changes_publishes_nothing(catalog):
+    products, publish, write_catalog = catalog
+    publish({"next_id": 3})
+    version = read_manifest()["index_version"]
+    write_catalog(products)
+
+    refresh_faiss_index()
+
+    assert read_manifest()["index_version"] == version
@@ -0,0 +1,19 @@
+from src.search import build_faiss_index
+from src.search.build_faiss_index import build_language_bundle
+
+
+def test_language_without_spec_coverage_gets_no_bundle(tmp_path, monkeypatch):
+    stale = tmp_path / "search_bundle_fr"
+    (stale / "versions").mkdir(parents=True)
+    monkeypatch.setattr(build_faiss_index, "language_bundle_dir", lambda language: stale)
+    monkeypatch.setattr(build_faiss_index, "load_specs", lambda language: {"DZ1": "Glissière à billes"})
+    monkeypatch.setattr(build_faiss_index, "LANGUAGE_BUNDLE_MIN_COVERAGE", 0.5)
+
+    def no_model(*args, **kwargs):
+        raise AssertionError("a skipped bundle embeds nothing")
+
+    monkeypatch.setattr(build_faiss_index, "ProductEmbedder", no_model)
+    products = [{"sku": f"DZ{i}", "name": f"Slide {i}"} for i in range(1, 4)]
+
+    assert build_language_bundle("fr", products) is None
+    assert not stale.exists()
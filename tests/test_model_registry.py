@@ -0,0 +1,49 @@
+import threading
+import time
+
+from src.core.model_registry import ModelRegistry
+from src.embeddings import onnx_encoder
+
+
+class FakeEncoder:
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def encode(self, sentences, **kwargs):
+        return [len(s) for s in sentences]
+
+
+def test_concurrent_first_requests_load_once(monkeypatch):
+    loads = []
+
+    def slow_load(model_name, backend, device):
+        loads.append(model_name)
+        time.sleep(0.05)  # long enough for every thread to arrive mid-load
+        return FakeEncoder(model_name)
+
+    monkeypatch.setattr(onnx_encoder, "load_encoder", slow_load)
+    registry = ModelRegistry()
+    got = []
+    threads = [threading.Thread(target=lambda: got.append(registry.get("m", "torch", "cpu"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ["m"]
+    assert len(got) == 8 and all(shared is got[0] for shared in got)
+
+
+def test_models_are_keyed_by_name_backend_and_device(monkeypatch):
+    monkeypatch.setattr(onnx_encoder, "load_encoder", lambda model_name, backend, device: FakeEncoder(model_name))
+    registry = ModelRegistry()
+    shared = registry.get("m", "torch", "cpu")
+
+    assert registry.get("m", "torch", "cpu") is shared
+    assert registry.get("m", "onnx", "cpu") is not shared
+    assert registry.get("other", "torch", "cpu").model_name == "other"  # attributes pass through
+
+    shared.encode(["ab", "c"])
+    stats = {(m["model"], m["backend"]): m for m in registry.stats()["models"]}
+    assert registry.stats()["loaded"] == 3
+    assert stats[("m", "torch")]["calls"] == 1 and stats[("m", "torch")]["texts"] == 2
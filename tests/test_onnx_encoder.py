@@ -0,0 +1,60 @@
+import numpy as np
+import onnx
+import pytest
+from onnx import TensorProto, helper, numpy_helper
+from tokenizers import Tokenizer, models, pre_tokenizers
+
+from src.embeddings.onnx_encoder import FP32_FILE, TOKENIZER_FILE, OnnxEncoder
+
+VOCAB = {"[PAD]": 0, "[UNK]": 1, "drawer": 2, "slide": 3, "steel": 4}
+# One row per token id; padding gets a huge row, so pooling over it would show
+TABLE = np.array([[100, 100, 100], [0, 0, 0], [0, 1, 0], [1, 0, 0], [0, 0, 2]], dtype="float32")
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """An ONNX graph whose last_hidden_state is the token's row of TABLE, plus a word-level tokenizer."""
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"])],
+        "lookup",
+        [helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "sequence"])],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "sequence", 3])],
+        initializer=[numpy_helper.from_array(TABLE, "table")],
+    )
+    # IR version 8 loads in every supported onnxruntime
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8)
+    onnx.save(model, tmp_path / FP32_FILE)
+
+    tokenizer = Tokenizer(models.WordLevel(VOCAB, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.save(str(tmp_path / TOKENIZER_FILE))
+    return tmp_path
+
+
+def make_encoder(model_dir, pooling="mean", normalize=False):
+    config = {"pooling": pooling, "normalize": normalize, "max_seq_length": 8, "pad_token": "[PAD]", "pad_token_id": 0, "dim": 3}
+    return OnnxEncoder(model_dir, quantized=False, config=config)
+
+
+def test_mean_pooling_skips_padding(model_dir):
+    vectors = make_encoder(model_dir).encode(["drawer slide", "slide"])
+    np.testing.assert_allclose(vectors, [[0.5, 0.5, 0], [1, 0, 0]])
+
+
+def test_cls_pooling_takes_the_first_token(model_dir):
+    vectors = make_encoder(model_dir, pooling="cls").encode(["drawer slide", "steel slide"])
+    np.testing.assert_allclose(vectors, [[0, 1, 0], [0, 0, 2]])
+
+
+def test_length_sorted_batches_come_back_in_input_order(model_dir):
+    texts = ["slide", "steel drawer slide", "drawer"]
+    encoder = make_encoder(model_dir)
+    np.testing.assert_allclose(encoder.encode(texts, batch_size=1), encoder.encode(texts, batch_size=8))
+    np.testing.assert_allclose(encoder.encode(texts, batch_size=1)[2], [0, 1, 0])
+
+
+def test_normalization_and_single_text(model_dir):
+    vector = make_encoder(model_dir, normalize=True).encode("steel")
+    assert vector.shape == (3,)
+    np.testing.assert_allclose(vector, [0, 0, 1])
+    assert make_encoder(model_dir).encode([]).shape == (0, 3)
@@ -0,0 +1,97 @@
+import types
+
+import numpy as np
+import pytest
+
+from src.search import query_cache
+from src.search.query_cache import QueryEmbeddingCache
+from src.storage import redis_cache
+from src.storage.redis_cache import InMemoryRedis
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(redis_cache, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError("redis went away")
+
+    def set(self, key, value, ex=None):
+        raise ConnectionError("redis went away")
+
+
+def vector(value):
+    return np.full((1, 4), value, dtype="float32")
+
+
+def test_in_memory_redis_evicts_least_recently_used(clock):
+    store = InMemoryRedis(maxsize=2)
+    store.set("a", b"1")
+    store.set("b", b"2")
+    store.get("a")
+    store.set("c", b"3")
+    assert len(store) == 2
+    assert store.get("b") is None and store.get("a") == b"1" and store.get("c") == b"3"
+
+
+def test_in_memory_redis_expires_and_purges_on_write(clock):
+    store = InMemoryRedis(maxsize=10)
+    store.set("short", "x", ex=5)
+    store.set("kept", "y")
+    assert store.get("short") == b"x"
+
+    clock.now += 6
+    assert store.get("short") is None
+
+    store.set("other", "z", ex=5)
+    clock.now += InMemoryRedis.PURGE_INTERVAL
+    store.set("new", "w")  # purges "other" although nobody reads it again
+    assert len(store) == 2 and store.get("kept") == b"y"
+
+
+def test_query_cache_tiers(clock):
+    redis = InMemoryRedis()
+    cache = QueryEmbeddingCache("model", "c0ffee", redis_client=redis, lru_size=4)
+    cache.put("Drawer  Slide", vector(1))
+
+    assert cache.get("drawer slide").tolist() == vector(1).tolist()  # normalized text, LRU tier
+    cold = QueryEmbeddingCache("model", "c0ffee", redis_client=redis, lru_size=4)
+    assert cold.get("drawer slide").tolist() == vector(1).tolist()   # Redis tier
+    assert cold.get("hinge") is None
+    assert cold.stats()["redis_hits"] == 1 and cold.stats()["misses"] == 1
+
+
+def test_query_cache_keys_on_model_commit():
+    redis = InMemoryRedis()
+    QueryEmbeddingCache("model", "c0ffee", redis_client=redis).put("slide", vector(1))
+    assert QueryEmbeddingCache("model", "decaf0", redis_client=redis).get("slide") is None
+
+
+def test_cached_vector_is_a_read_only_copy():
+    cache = QueryEmbeddingCache("model", "c0ffee", redis_client=InMemoryRedis())
+    vec = vector(1)
+    cache.put("slide", vec)
+    vec[0, 0] = 9  # the caller's array stays writable and doesn't change the cache
+    cached = cache.get("slide")
+    assert cached[0, 0] == 1 and not cached.flags.writeable
+
+
+def test_redis_errors_count_as_misses(monkeypatch):
+    monkeypatch.setattr(query_cache, "REDIS_ERRORS", (ConnectionError,))
+    cache = QueryEmbeddingCache("model", "c0ffee", redis_client=BrokenRedis())
+    cache.put("slide", vector(1))                # LRU still written
+    assert cache.get("slide") is not None
+    assert cache.get("hinge") is None
+    assert cache.stats()["redis_errors"] == 2
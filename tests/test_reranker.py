@@ -0,0 +1,79 @@
+import sys
+import time
+import types
+
+import pytest
+
+from src.embeddings.ranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the number in its passage name, so the expected order is known."""
+
+    def __init__(self, model_name, delay=0.0):
+        self.delay = delay
+        self.pairs = []
+
+    def predict(self, pairs, batch_size=32):
+        time.sleep(self.delay)
+        self.pairs.extend(pairs)
+        return [float(passage.split()[1]) if passage.startswith("Slide") else 0.0 for _, passage in pairs]
+
+
+@pytest.fixture(autouse=True)
+def fake_cross_encoder(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(CrossEncoder=FakeCrossEncoder))
+
+
+def results(*numbers):
+    return [{"rank": i + 1, "sku": f"DZ{n}", "name": f"Slide {n}"} for i, n in enumerate(numbers)]
+
+
+def make_reranker(**kwargs):
+    reranker = CrossEncoderReranker("fake-cross-encoder", **kwargs)
+    reranker.model.pairs.clear()  # drop the warm-up pair
+    return reranker
+
+
+def test_rerank_orders_the_head_and_keeps_the_tail():
+    reranked = make_reranker(max_candidates=3).rerank("slide", results(1, 3, 2, 0))
+    assert [r["sku"] for r in reranked] == ["DZ3", "DZ2", "DZ1", "DZ0"]
+    assert [r["rank"] for r in reranked] == [1, 2, 3, 4]
+    assert reranked[0]["rerank_score"] == 3.0 and "rerank_score" not in reranked[3]
+
+
+def test_repeated_query_is_served_from_the_cache():
+    reranker = make_reranker()
+    reranker.rerank("Drawer  slide", results(1, 2))
+    reranker.rerank("drawer slide", results(1, 2))  # same normalized query
+    assert len(reranker.model.pairs) == 2
+    assert reranker.stats()["cache_hits"] == 2 and reranker.stats()["reranked"] == 2
+
+
+def test_estimated_cost_over_budget_returns_first_stage_order():
+    reranker = make_reranker(budget_ms=40)
+    reranker.sec_per_pair = 1.0  # measured earlier: two pairs can't fit in 40 ms
+    reranked = reranker.rerank("slide", results(1, 2))
+    assert [r["sku"] for r in reranked] == ["DZ1", "DZ2"]
+    assert all(r["rerank_score"] is None for r in reranked)
+    assert reranker.model.pairs == [] and reranker.over_budget == 1
+
+
+def test_deadline_mid_way_keeps_the_scored_pairs():
+    reranker = make_reranker(batch_size=1, budget_ms=5)
+    reranker.model.delay = 0.02
+    reranked = reranker.rerank("slide", results(1, 2, 3))
+    assert [r["sku"] for r in reranked] == ["DZ1", "DZ2", "DZ3"] and reranked[0]["rerank_score"] is None
+    assert len(reranker.model.pairs) == 1
+
+    # The pair scored before the deadline is cached for the next request
+    reranker.model.delay = 0
+    reranker.sec_per_pair = None
+    reranker.rerank("slide", results(1, 2, 3), budget_ms=1000)
+    assert len(reranker.model.pairs) == 3
+
+
+def test_single_candidate_is_returned_as_is():
+    reranker = make_reranker()
+    assert reranker.rerank("slide", results(1)) == results(1)
+    assert reranker.model.pairs == []
@@ -0,0 +1,62 @@
+import json
+
+from src.search import result_cache
+from src.search.result_cache import SearchResultCache, render_response
+from src.storage.redis_cache import InMemoryRedis
+
+RESULTS = [{"rank": 1, "score": 0.9, "sku": "DZ1", "name": "Slide one"}]
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError("redis went away")
+
+    def set(self, key, value, ex=None):
+        raise ConnectionError("redis went away")
+
+
+def test_keys_follow_index_version_and_normalized_query():
+    cache = SearchResultCache("model@c0ffee", redis_client=InMemoryRedis())
+    key = cache.key("v1", "Drawer  Slide", {"material": "steel"}, 10, "en")
+    assert key == cache.key("v1", "drawer slide", {"material": "steel"}, 10, "en")
+    assert key.startswith("qres:v1:")
+    assert key != cache.key("v2", "drawer slide", {"material": "steel"}, 10, "en")
+    assert key != cache.key("v1", "drawer slide", None, 10, "en")
+    assert key != SearchResultCache("model@decaf0", redis_client=InMemoryRedis()).key("v1", "drawer slide", {"material": "steel"}, 10, "en")
+
+
+def test_results_are_served_from_both_tiers():
+    redis = InMemoryRedis()
+    cache = SearchResultCache(redis_client=redis)
+    key = cache.key("v1", "slide")
+    raw = cache.put(key, RESULTS)
+
+    assert cache.get(key) == raw
+    cold = SearchResultCache(redis_client=redis)
+    assert json.loads(cold.get(key)) == RESULTS
+    assert cold.get(cold.key("v1", "hinge")) is None
+    assert cold.stats()["redis_hits"] == 1 and cold.stats()["misses"] == 1
+
+
+def test_over_budget_results_are_not_cached():
+    cache = SearchResultCache(redis_client=InMemoryRedis())
+    key = cache.key("v1", "slide")
+    raw = cache.put(key, [dict(RESULTS[0], rerank_score=None)])
+    assert json.loads(raw)[0]["sku"] == "DZ1"
+    assert cache.get(key) is None
+
+
+def test_redis_errors_count_as_misses(monkeypatch):
+    monkeypatch.setattr(result_cache, "REDIS_ERRORS", (ConnectionError,))
+    cache = SearchResultCache(redis_client=BrokenRedis())
+    key = cache.key("v1", "slide")
+    cache.put(key, RESULTS)
+    assert cache.get(key) is not None  # the LRU tier still holds it
+    assert cache.get(cache.key("v1", "hinge")) is None
+    assert cache.stats()["redis_errors"] == 2
+
+
+def test_render_response_splices_cached_bytes():
+    raw = SearchResultCache(redis_client=InMemoryRedis()).put("k", RESULTS)
+    assert json.loads(render_response({"query": "slide"}, "results", raw)) == {"query": "slide", "results": RESULTS}
+    assert json.loads(render_response({}, "results", raw)) == {"results": RESULTS}
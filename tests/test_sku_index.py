@@ -0,0 +1,63 @@
+import numpy as np
+
+from src.search.attribute_store import IdFilter
+from src.search.sku_index import SkuIndex, looks_like_sku, normalize_sku
+
+SKUS = ["DZ4501", "DZ4501-0070", "DZ4501-0080", "DZ4510-0300", "DS4180-080", "DB9000"]
+PARENTS = [None, "DZ4501", "DZ4501", None, None, None]
+IDS = [10, 11, 12, 13, 14, 15]
+
+
+def make_index():
+    return SkuIndex.build(SKUS, IDS, PARENTS)
+
+
+def id_filter(admitted, n_ids=16):
+    mask = np.zeros(n_ids, dtype=bool)
+    mask[admitted] = True
+    return IdFilter(np.packbits(mask, bitorder="little"), n_ids)
+
+
+def test_normalize_and_detect():
+    assert normalize_sku("dz4180 060") == normalize_sku("DZ4180-060") == "DZ4180060"
+    assert looks_like_sku("DZ4501-0070")
+    assert not looks_like_sku("drawer slide 400mm")
+
+
+def test_exact_then_variants_then_prefix():
+    hits = make_index().lookup("DZ4501")
+    assert hits[0] == (10, "exact")
+    assert hits[1:3] == [(11, "variant"), (12, "variant")]
+    # The variants also match the prefix but are only listed once
+    assert [faiss_id for faiss_id, _ in hits] == [10, 11, 12]
+
+
+def test_prefix_spans_several_products():
+    assert make_index().lookup("DZ45") == [(10, "prefix"), (11, "prefix"), (12, "prefix"), (13, "prefix")]
+
+
+def test_separators_are_ignored():
+    assert make_index().lookup("dz4501 0070") == [(11, "exact")]
+
+
+def test_limit_bounds_the_prefix_scan():
+    index = make_index()
+    assert index.lookup("DZ45", limit=2) == [(10, "prefix"), (11, "prefix")]
+    assert len(index.lookup("D", limit=None)) == len(SKUS)
+
+
+def test_filtered_lookup_keeps_order():
+    index = make_index()
+    assert index.lookup("DZ45", limit=2, id_filter=id_filter([11, 13])) == [(11, "prefix"), (13, "prefix")]
+    assert index.lookup("DZ4501", id_filter=id_filter([12])) == [(12, "variant")]
+
+
+def test_unknown_sku():
+    assert make_index().lookup("XX1234") == []
+    assert make_index().lookup("--") == []
+
+
+def test_save_load_roundtrip(tmp_path):
+    path = tmp_path / "skus"
+    make_index().save(path)
+    assert SkuIndex.load(path).lookup("DZ4501") == make_index().lookup("DZ4501")
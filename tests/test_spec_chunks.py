@@ -0,0 +1,95 @@
+import numpy as np
+
+from src.search.spec_chunks import (
+    CHUNK_ID_BASE, ChunkMap, aggregate_hit_matrix, aggregate_hits, manual_bullet_chunks, product_family, representative_row,
+    spec_section_chunks,
+)
+
+DIM = 4
+
+
+def make_chunks():
+    # Chunks 0 and 1 belong to product 7, chunk 2 to product 3
+    chunks = [(7, "load_rating", "Load rating: 45 kg"), (7, "mounting", "Mounting: side"), (3, "finish", "Finish: zinc")]
+    return ChunkMap.build(chunks, np.ones((len(chunks), DIM), dtype="float32"))
+
+
+def test_product_family():
+    assert product_family("DB4501-0020TR") == "DB4501"
+    assert product_family("slide") is None
+
+
+def test_spec_section_chunks_follow_the_language_tag():
+    spec = {"product_id": "DZ4501", "language": "en", "load_rating": "622  kg", "sizes": [300, 400], "x": "-"}
+    assert spec_section_chunks(spec) == [("load_rating", "Load rating: 622 kg")]
+    assert spec_section_chunks(dict(spec, language="de")) == []
+    # Untagged records are taken as the requested language
+    assert spec_section_chunks({"product_id": "DZ4501", "finish": "Zinc plated"}) == [("finish", "Finish: Zinc plated")]
+
+
+def test_manual_bullet_chunks_rejoin_wrapped_lines():
+    text = "Features\n• Soft close with\n  integrated damper\n• Short\n• Load rating 45 kg per pair"
+    assert manual_bullet_chunks(text) == [
+        ("manual", "Soft close with integrated damper"),
+        ("manual", "Load rating 45 kg per pair"),
+    ]
+    assert manual_bullet_chunks(None) == []
+
+
+def test_representative_row():
+    products = [{"sku": "DZ4501-0070"}, {"sku": "DZ4501"}, {"sku": "DB9000"}]
+    assert representative_row(products, "DB9000") == 2
+    assert representative_row(products, "DZ4501-0400") == 1  # the family's parent
+    assert representative_row(products[:1], "DZ4501") == 0   # else its first variant
+    assert representative_row(products, "XX1") is None
+
+
+def test_aggregate_hits_keeps_best_hit_per_product():
+    chunks = make_chunks()
+    ids = [CHUNK_ID_BASE + 1, 3, 7, CHUNK_ID_BASE + 2, 5]
+    scores = [0.9, 0.8, 0.7, 0.6, 0.5]
+
+    products, best, highlights = aggregate_hits(ids, scores, chunks)
+    assert products.tolist() == [7, 3, 5]
+    np.testing.assert_allclose(best, [0.9, 0.8, 0.5])
+    assert highlights == {7: "Mounting: side", 3: "Finish: zinc"}
+
+    products, _, highlights = aggregate_hits(ids, scores, chunks, top_k=1)
+    assert products.tolist() == [7] and highlights == {7: "Mounting: side"}
+
+
+def test_aggregate_hits_without_chunks():
+    products, scores, highlights = aggregate_hits([4, 2, 9], [0.3, 0.2, 0.1], None, top_k=2)
+    assert products.tolist() == [4, 2] and highlights == {}
+
+
+def test_aggregate_hit_matrix_matches_aggregate_hits():
+    chunks = make_chunks()
+    ids = np.array([
+        [CHUNK_ID_BASE + 1, 3, 7, CHUNK_ID_BASE + 2, 5],
+        [7, 7, -1, -1, -1],
+        [4, CHUNK_ID_BASE + 0, 9, 3, CHUNK_ID_BASE + 1],
+    ])
+    products = aggregate_hit_matrix(ids, chunks, top_k=3)
+    assert products.tolist() == [[7, 3, 5], [7, -1, -1], [4, 7, 9]]
+
+    for row, expected in zip(ids, products):
+        found = row[row != -1]
+        ranked, _, _ = aggregate_hits(found, np.zeros(len(found)), chunks, top_k=3)
+        assert ranked.tolist() == [i for i in expected.tolist() if i != -1]
+
+
+def test_aggregate_hit_matrix_without_chunks():
+    assert aggregate_hit_matrix(np.array([[2, 2, 5]]), None, top_k=2).tolist() == [[2, 5]]
+
+
+def test_chunk_map_subset_and_roundtrip(tmp_path):
+    chunks = make_chunks()
+    kept = chunks.subset(chunks.product_ids != 7)
+    assert kept.ids.tolist() == [CHUNK_ID_BASE + 2]
+    assert kept.rows([CHUNK_ID_BASE + 2]).tolist() == [0]
+
+    path = tmp_path / "chunks"
+    chunks.save(path)
+    loaded = ChunkMap.load(path)
+    assert loaded.texts.tolist() == chunks.texts.tolist() and loaded.product_ids.tolist() == [7, 7, 3]
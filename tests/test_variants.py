@@ -0,0 +1,68 @@
+import numpy as np
+
+from src.search.attribute_store import IdFilter
+from src.search.variants import GroupFilter, VariantTable, variant_groups
+
+PRODUCTS = [
+    {"sku": "DZ2807"},                                 # 0 parent
+    {"sku": "DZ2807-0024", "parent_sku": "DZ2807"},    # 1
+    {"sku": "DZ2807-0030", "parent_sku": "DZ2807"},    # 2
+    {"sku": "DZ2807-0030", "parent_sku": "DZ2807"},    # 3 repeats a SKU
+    {"sku": "DS4180-080-035-0050U"},                   # 4 no parent row
+    {"sku": "DS4180-080-035-0060U"},                   # 5 same text as 4
+    {"sku": "DB9000"},                                 # 6 lone product
+]
+IDS = [0, 1, 2, 3, 4, 5, 6]
+TEXTS = ["drawer slide", "drawer slide 240", "drawer slide 300", "drawer slide 300", "runner", "runner", "hinge"]
+
+
+def make_table():
+    return VariantTable.build(variant_groups(PRODUCTS, IDS, TEXTS))
+
+
+def id_filter(admitted, n_ids=7):
+    mask = np.zeros(n_ids, dtype=bool)
+    mask[admitted] = True
+    return IdFilter(np.packbits(mask, bitorder="little"), n_ids)
+
+
+def test_variant_groups():
+    assert variant_groups(PRODUCTS, IDS, TEXTS) == [
+        (0, [1, 2], [0, 1, 2, 3]),
+        (4, [4, 5], [4, 5]),
+        (6, [], [6]),
+    ]
+
+
+def test_variants_without_parent_collapse_only_on_identical_text():
+    # Same SKU stem, different embedded text: two products, not one group
+    texts = TEXTS[:5] + ["runner 600 mm", "hinge"]
+    assert variant_groups(PRODUCTS, IDS, texts)[1:] == [(4, [], [4]), (5, [], [5]), (6, [], [6])]
+
+
+def test_table_members_and_representatives():
+    table = make_table()
+    assert len(table) == 3
+    assert table.rep_ids.tolist() == [0, 4, 6]
+    assert table.members(0).tolist() == [1, 2]
+    assert table.members(4).tolist() == [4, 5]
+    assert table.members(6).tolist() == []
+    assert table.members(3).tolist() == []  # not a representative
+    assert table.representatives([3, 5, 6]).tolist() == [0, 4, 6]
+
+
+def test_group_filter_admits_groups_with_a_passing_member():
+    member_filter = id_filter([2, 6])
+    groups = make_table().group_filter(member_filter)
+    assert isinstance(groups, GroupFilter)
+    assert groups.ids().tolist() == [0, 6]
+    assert groups.member_filter is member_filter
+    assert groups.contains([0, 2, 4, 6]).tolist() == [True, False, False, True]
+
+
+def test_save_load_roundtrip(tmp_path):
+    path = tmp_path / "variants"
+    make_table().save(path)
+    loaded = VariantTable.load(path)
+    assert loaded.members(0).tolist() == [1, 2]
+    assert loaded.owners.tolist() == make_table().owners.tolist()
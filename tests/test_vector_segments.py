@@ -0,0 +1,68 @@
+import itertools
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from src.search import index_bundle, vector_segments
+from src.search.index_bundle import VERSIONS_DIR, load_bundle, write_bundle
+from src.search.vector_segments import VECTORS_NAME, VectorSegments
+
+DIM = 4
+
+
+@pytest.fixture
+def base(tmp_path):
+    path = tmp_path / "product_embeddings.npy"
+    np.save(path, np.arange(3 * DIM, dtype="float32").reshape(3, DIM))
+    return path
+
+
+def rows(value, n=1):
+    return np.full((n, DIM), value, dtype="float32")
+
+
+def test_newest_segment_wins(base):
+    vectors = VectorSegments(base).with_rows([1, 4], np.vstack([rows(7), rows(8)])).with_rows([4], rows(9))
+
+    assert vectors.shape == (5, DIM)
+    assert vectors[[4, 1, 0]].tolist() == [[9] * DIM, [7] * DIM, list(range(DIM))]
+    with pytest.raises(KeyError):
+        vectors[[3]]
+    # The base file is never written
+    assert np.load(base)[1].tolist() == [4, 5, 6, 7]
+
+
+def test_segments_merge_past_the_limit(base, monkeypatch):
+    monkeypatch.setattr(vector_segments, "MAX_SEGMENTS", 2)
+    vectors = VectorSegments(base)
+    for value, ids in ((1, [5, 3]), (2, [3]), (3, [6])):
+        vectors = vectors.with_rows(ids, rows(value, len(ids)))
+
+    assert len(vectors.segments) == 1
+    assert vectors.segments[0][0].tolist() == [3, 5, 6]
+    assert vectors[[3, 5, 6]][:, 0].tolist() == [2, 1, 3]
+
+
+def test_versions_link_the_base_and_earlier_segments(base, tmp_path, monkeypatch):
+    counter = itertools.count(1)
+    monkeypatch.setattr(index_bundle, "new_index_version", lambda: f"v{next(counter):03d}")
+    bundle_dir = tmp_path / "bundle"
+    ids = np.arange(3, dtype="int64")
+    metadata = [{"product_id": str(i), "sku": f"DZ{i}", "name": "", "content_hash": ""} for i in ids]
+
+    def publish(vectors):
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(DIM))
+        index.add_with_ids(rows(1, len(ids)), ids)
+        write_bundle(index, metadata, bundle_dir, ids=ids, vectors=vectors)
+        return load_bundle(bundle_dir)
+
+    first = publish(VectorSegments(base).with_rows([0], rows(5)))
+    second = publish(first.vectors.with_rows([2], rows(6)))
+
+    assert second.manifest["vector_segments"] == ["vectors.0", "vectors.1"]
+    assert second.vectors[[0, 1, 2]][:, 0].tolist() == [5, 4, 6]
+    old, new = bundle_dir / VERSIONS_DIR / "v001", bundle_dir / VERSIONS_DIR / "v002"
+    assert os.stat(base).st_ino == os.stat(new / VECTORS_NAME).st_ino
+    assert os.stat(old / "vectors.0" / "vectors.npy").st_ino == os.stat(new / "vectors.0" / "vectors.npy").st_ino
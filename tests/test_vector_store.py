@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.embeddings.faiss_indexer import FaissVectorStore
+from src.embeddings.vector_store import filter_values
+
+DIM = 4
+IDS = np.array([3, 8, 20, 21], dtype="int64")
+VECTORS = np.eye(len(IDS), DIM, dtype="float32")
+PAYLOADS = [
+    {"sku": "DZ1", "parent_sku": None, "category_id": "slides", "material": "steel"},
+    {"sku": "DZ2", "parent_sku": None, "category_id": "slides", "material": "aluminium"},
+    {"sku": "DZ3", "parent_sku": "DZ", "category_id": "hinges", "material": "steel"},
+    {"sku": "DZ4", "parent_sku": "DZ", "category_id": "slides", "material": "steel"},
+]
+QUERY = np.ones((1, DIM), dtype="float32")
+
+
+def faiss_store():
+    store = FaissVectorStore.create(DIM)
+    store.upsert(IDS, VECTORS, PAYLOADS)
+    return store
+
+
+def found(result):
+    _, ids = result
+    return sorted(i for i in ids[0].tolist() if i != -1)
+
+
+def test_filter_values_fold_case_where_the_payload_does():
+    assert filter_values({"material": " Steel ", "sku": ["DZ1", "DZ2"]}) == {"material": ["steel"], "sku": ["DZ1", "DZ2"]}
+    assert filter_values(None) == {}
+    with pytest.raises(ValueError):
+        filter_values({"length_mm": 400})
+
+
+def test_faiss_filters_and_id_sets_intersect():
+    store = faiss_store()
+    assert store.allowed_ids() is None
+    assert store.allowed_ids({"material": "steel", "category_id": "slides"}).tolist() == [3, 21]
+    assert store.allowed_ids({"material": ["steel", "aluminium"]}, ids=[8, 20, 99]).tolist() == [8, 20]
+
+    assert found(store.search(QUERY, 10, {"material": "STEEL"})) == [3, 20, 21]
+    assert found(store.search(QUERY, 10, {"parent_sku": "DZ"}, ids=[20])) == [20]
+    assert found(store.search(QUERY, 10, {"sku": "missing"})) == []
+
+
+def test_faiss_upsert_moves_postings():
+    store = faiss_store()
+    store.upsert([8], VECTORS[1:2], [dict(PAYLOADS[1], material="steel")])
+    assert found(store.search(QUERY, 10, {"material": "aluminium"})) == []
+    assert found(store.search(QUERY, 10, {"material": "steel"})) == [3, 8, 20, 21]
+
+    store.delete([3])
+    assert found(store.search(QUERY, 10, {"material": "steel"})) == [8, 20, 21]
+
+
+@pytest.mark.parametrize("filters, ids", [
+    ({"material": "steel"}, None),
+    ({"material": "steel", "category_id": "slides"}, None),
+    ({"sku": ["DZ2", "DZ3"]}, None),
+    ({"parent_sku": "DZ"}, [20, 3]),
+    (None, [8, 21]),
+])
+def test_qdrant_filters_match_faiss(tmp_path, filters, ids):
+    pytest.importorskip("qdrant_client")
+    from src.embeddings.qdrant_indexer import QdrantVectorStore
+
+    qdrant = QdrantVectorStore(path=tmp_path / "qdrant", collection="test", dim=DIM, url="")
+    qdrant.upsert(IDS, VECTORS, PAYLOADS)
+    try:
+        assert found(qdrant.search(QUERY, 10, filters, ids)) == found(faiss_store().search(QUERY, 10, filters, ids))
+    finally:
+        qdrant.client.close()